@@ -8,7 +8,7 @@ from sqlalchemy.ext.asyncio import async_engine_from_config
 from alembic import context
 from app.core.config import settings
 from app.models.user import User
-from app.models.chat import Chat, Conversation
+from app.models.chat import BranchEdge, Chat, Conversation
 from sqlmodel import SQLModel
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,99 @@
+"""create tables and hot path indexes
+
+Revision ID: 3c9a1f2b7d41
+Revises: 505ff61055fa
+Create Date: 2025-06-02 10:12:31.482913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9a1f2b7d41'
+down_revision = '505ff61055fa'
+branch_labels = None
+depends_on = None
+
+
+def _existing_tables() -> set:
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def _existing_indexes(table: str) -> set:
+    return {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade() -> None:
+    # Databases bootstrapped by SQLModel.metadata.create_all already have the
+    # tables, so only create what is missing.
+    tables = _existing_tables()
+
+    if "users" not in tables:
+        op.create_table(
+            "users",
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("id", sa.Uuid(), nullable=False),
+            sa.Column("email", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column("username", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column("is_active", sa.Boolean(), nullable=False),
+            sa.Column("is_superuser", sa.Boolean(), nullable=False),
+            sa.Column("hashed_password", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+        op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    if "chats" not in tables:
+        op.create_table(
+            "chats",
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("id", sa.Uuid(), nullable=False),
+            sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column("chat_type", sa.Enum("PERSONAL", "BRANCH", name="chattype"), nullable=False),
+            sa.Column("active", sa.Boolean(), nullable=False),
+            sa.Column("account_id", sa.Uuid(), nullable=False),
+            sa.ForeignKeyConstraint(["account_id"], ["users.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_chats_id", "chats", ["id"])
+        op.create_index("ix_chats_account_id", "chats", ["account_id"])
+
+    if "conversations" not in tables:
+        op.create_table(
+            "conversations",
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("id", sa.Uuid(), nullable=False),
+            sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column("deleted", sa.Boolean(), nullable=False),
+            sa.Column("chat_id", sa.Uuid(), nullable=False),
+            sa.Column("account_id", sa.Uuid(), nullable=False),
+            sa.Column("parent_id", sa.Uuid(), nullable=True),
+            sa.ForeignKeyConstraint(["account_id"], ["users.id"]),
+            sa.ForeignKeyConstraint(["chat_id"], ["chats.id"]),
+            sa.ForeignKeyConstraint(["parent_id"], ["conversations.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_conversations_id", "conversations", ["id"])
+        op.create_index("ix_conversations_chat_id", "conversations", ["chat_id"])
+        op.create_index("ix_conversations_account_id", "conversations", ["account_id"])
+
+    # Hot path indexes: a user's chats by recency, and child conversation lookups
+    if "ix_chats_account_id_updated_at" not in _existing_indexes("chats"):
+        op.create_index("ix_chats_account_id_updated_at", "chats", ["account_id", "updated_at"])
+    if "ix_conversations_parent_id" not in _existing_indexes("conversations"):
+        op.create_index("ix_conversations_parent_id", "conversations", ["parent_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_conversations_parent_id", table_name="conversations")
+    op.drop_index("ix_chats_account_id_updated_at", table_name="chats")
+    op.drop_table("conversations")
+    op.drop_table("chats")
+    op.drop_table("users")
+    sa.Enum(name="chattype").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,32 @@
+"""add chats.ai_cache_enabled
+
+Revision ID: 8d2e4b6a1c93
+Revises: 3c9a1f2b7d41
+Create Date: 2025-06-09 14:03:12.617204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2e4b6a1c93'
+down_revision = '3c9a1f2b7d41'
+branch_labels = None
+depends_on = None
+
+
+def _existing_columns(table: str) -> set:
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade() -> None:
+    if "ai_cache_enabled" not in _existing_columns("chats"):
+        op.add_column(
+            "chats",
+            sa.Column("ai_cache_enabled", sa.Boolean(), server_default=sa.true(), nullable=False),
+        )
+
+
+def downgrade() -> None:
+    op.drop_column("chats", "ai_cache_enabled")
@@ -0,0 +1,41 @@
+"""add chat statistics counters
+
+Revision ID: b47f0c2d9e15
+Revises: 8d2e4b6a1c93
+Create Date: 2025-06-11 09:41:55.208317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b47f0c2d9e15'
+down_revision = '8d2e4b6a1c93'
+branch_labels = None
+depends_on = None
+
+
+def _existing_columns(table: str) -> set:
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade() -> None:
+    # Counters start at zero; fill them for existing chats with
+    # `python -m app.db.backfill_chat_stats`
+    columns = _existing_columns("chats")
+    if "message_count" not in columns:
+        op.add_column("chats", sa.Column("message_count", sa.Integer(), server_default="0", nullable=False))
+    if "branch_count" not in columns:
+        op.add_column("chats", sa.Column("branch_count", sa.Integer(), server_default="0", nullable=False))
+    if "bytes_stored" not in columns:
+        op.add_column("chats", sa.Column("bytes_stored", sa.BigInteger(), server_default="0", nullable=False))
+    if "last_message_at" not in columns:
+        op.add_column("chats", sa.Column("last_message_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("chats", "last_message_at")
+    op.drop_column("chats", "bytes_stored")
+    op.drop_column("chats", "branch_count")
+    op.drop_column("chats", "message_count")
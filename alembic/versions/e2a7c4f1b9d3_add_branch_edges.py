@@ -0,0 +1,41 @@
+"""add branch edges
+
+Revision ID: e2a7c4f1b9d3
+Revises: b47f0c2d9e15
+Create Date: 2025-06-18 14:03:12.517406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a7c4f1b9d3'
+down_revision = 'b47f0c2d9e15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Starts empty; fill it for existing branches with
+    # `python -m app.db.backfill_branch_edges`. Until then get-branches and
+    # set-active-branch add a chat's missing edges from its content
+    if "branch_edges" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "branch_edges",
+        sa.Column("branch_chat_id", sa.Uuid(), nullable=False),
+        sa.Column("parent_chat_id", sa.Uuid(), nullable=False),
+        sa.Column("response_id", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("branch_chat_id"),
+    )
+    op.create_index(
+        "ix_branch_edges_parent_chat_id_created_at", "branch_edges", ["parent_chat_id", "created_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_branch_edges_parent_chat_id_created_at", table_name="branch_edges")
+    op.drop_table("branch_edges")
@@ -0,0 +1,42 @@
+"""add users.retention_days and chats last activity index
+
+Revision ID: f61d3b8e2a57
+Revises: e2a7c4f1b9d3
+Create Date: 2025-06-20 11:27:45.903118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f61d3b8e2a57'
+down_revision = 'e2a7c4f1b9d3'
+branch_labels = None
+depends_on = None
+
+
+def _existing_columns(table: str) -> set:
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _existing_indexes(table: str) -> set:
+    return {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade() -> None:
+    if "retention_days" not in _existing_columns("users"):
+        op.add_column("users", sa.Column("retention_days", sa.Integer(), nullable=True))
+    # Lets the retention purge find expired chats a small batch at a time.
+    # Built concurrently so chats stays writable meanwhile
+    if "ix_chats_last_activity_at" not in _existing_indexes("chats"):
+        with op.get_context().autocommit_block():
+            op.create_index(
+                "ix_chats_last_activity_at", "chats", [sa.text("coalesce(last_message_at, created_at)")],
+                postgresql_concurrently=True
+            )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_chats_last_activity_at", table_name="chats")
+    op.drop_column("users", "retention_days")
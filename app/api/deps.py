@@ -3,17 +3,15 @@ from uuid import UUID
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from jose import JWTError
 from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.security import verify_password
+from app.core.security import ACCESS_TOKEN_TYPE, decode_token, is_token_revoked
 from app.db.mongodb import get_mongodb
-from app.db.postgres import get_session
-from app.models.user import User
-from app.schemas.user import TokenPayload
-from app.services.user_service import UserService
+from app.db.postgres import get_read_session, get_session, pin_to_primary
+from app.schemas.user import CurrentUser, TokenPayload
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
@@ -33,16 +31,12 @@ async def get_mongodb_db():
     return await get_mongodb()
 
 
-async def get_current_user(
-    db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)
-) -> User:
+async def get_token_payload(token: str = Depends(oauth2_scheme)) -> TokenPayload:
     """
-    Dependency for getting current authenticated user
+    Dependency for getting the validated claims of the bearer access token
     """
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+        payload = decode_token(token)
         token_data = TokenPayload(**payload)
     except (JWTError, ValidationError):
         raise HTTPException(
@@ -50,28 +44,46 @@ async def get_current_user(
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-        
-    user_service = UserService(db)
-    user = await user_service.get_by_id(UUID(token_data.sub))
-    
-    if not user:
+    if token_data.type != ACCESS_TOKEN_TYPE or not token_data.sub or not token_data.jti:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
+            detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    if not user.is_active:
+    if await is_token_revoked(token_data.jti):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return token_data
+
+
+async def get_current_user(
+    token_data: TokenPayload = Depends(get_token_payload)
+) -> CurrentUser:
+    """
+    Dependency for getting current authenticated user
+
+    Served from the access token claims without a database lookup; the
+    claims are re-checked against the database when the token is refreshed.
+    """
+    if not token_data.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Inactive user",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return user
+    return CurrentUser(
+        id=UUID(token_data.sub),
+        is_active=token_data.is_active,
+        is_superuser=token_data.is_superuser,
+    )
 
 
 async def get_current_active_superuser(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: CurrentUser = Depends(get_current_user),
+) -> CurrentUser:
     """
     Dependency for getting current authenticated superuser
     """
@@ -80,4 +92,23 @@ async def get_current_active_superuser(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
         )
-    return current_user 
\ No newline at end of file
+    return current_user
+
+
+async def get_read_db(token_data: TokenPayload = Depends(get_token_payload)) -> AsyncSession:
+    """
+    Dependency for read-only endpoints: a replica session when replicas are
+    configured, unless the user wrote recently (read-your-writes)
+    """
+    async for session in get_read_session(UUID(token_data.sub)):
+        yield session
+
+
+async def get_write_db(current_user: CurrentUser = Depends(get_current_user)) -> AsyncSession:
+    """
+    Dependency for endpoints that write: a primary session, after pinning the
+    user's reads to the primary for the read-your-writes window
+    """
+    await pin_to_primary(current_user.id)
+    async for session in get_session():
+        yield session
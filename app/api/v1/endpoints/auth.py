@@ -1,17 +1,35 @@
-from datetime import timedelta
 from typing import Any
+from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from jose import JWTError
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_db
+from app.api.deps import get_db, get_token_payload
 from app.core.config import settings
-from app.core.security import create_access_token
-from app.schemas.user import Token, UserCreate, UserResponse
+from app.core.security import (
+    REFRESH_TOKEN_TYPE,
+    create_access_token,
+    create_refresh_token,
+    decode_token,
+    is_token_revoked,
+    revoke_token,
+)
+from app.core.timing import TimedRoute
+from app.models.user import User
+from app.schemas.user import (
+    LogoutRequest,
+    RefreshRequest,
+    Token,
+    TokenPayload,
+    UserCreate,
+    UserResponse,
+)
 from app.services.user_service import UserService
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.post("/register", response_model=UserResponse)
@@ -63,10 +81,91 @@ async def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
         
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return _issue_tokens(user)
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh(
+    refresh_in: RefreshRequest,
+    db: AsyncSession = Depends(get_db)
+) -> Any:
+    """
+    Exchange a refresh token for a new access and refresh token pair.
+
+    The user is re-loaded here, so a deactivated account stops getting access
+    tokens at the next refresh. Refresh tokens are single use.
+    """
+    token_data = await _get_refresh_token_payload(refresh_in.refresh_token)
+
+    user_service = UserService(db)
+    user = await user_service.get_by_id(UUID(token_data.sub))
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Inactive user",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if not await revoke_token(token_data.jti, token_data.exp):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return _issue_tokens(user)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    logout_in: LogoutRequest = None,
+    token_data: TokenPayload = Depends(get_token_payload)
+) -> None:
+    """
+    Revoke the current access token and, if given, the refresh token.
+    """
+    await revoke_token(token_data.jti, token_data.exp)
+    if logout_in and logout_in.refresh_token:
+        refresh_data = await _get_refresh_token_payload(logout_in.refresh_token)
+        if refresh_data.sub != token_data.sub:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions",
+            )
+        await revoke_token(refresh_data.jti, refresh_data.exp)
+
+
+def _issue_tokens(user: User) -> dict:
     return {
         "access_token": create_access_token(
-            user.id, expires_delta=access_token_expires
+            user.id, is_active=user.is_active, is_superuser=user.is_superuser
         ),
+        "refresh_token": create_refresh_token(user.id),
         "token_type": "bearer",
-    } 
\ No newline at end of file
+        "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+
+async def _get_refresh_token_payload(token: str) -> TokenPayload:
+    try:
+        token_data = TokenPayload(**decode_token(token))
+    except (JWTError, ValidationError):
+        token_data = None
+    if (
+        token_data is None
+        or token_data.type != REFRESH_TOKEN_TYPE
+        or not token_data.sub
+        or not token_data.jti
+        or await is_token_revoked(token_data.jti)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return token_data
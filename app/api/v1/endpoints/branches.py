@@ -4,19 +4,23 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_user, get_db
-from app.models.user import User
-from app.schemas.message import BranchCreate, BranchResponse, BranchTreeResponse
+from app.api.deps import get_current_user, get_read_db, get_write_db
+from app.core.timing import TimedRoute
+from app.schemas.user import CurrentUser
+from app.schemas.message import (
+    BranchBatchCreate, BranchCreate, BranchDiffResponse, BranchResponse, BranchTreeResponse
+)
+from app.services.branch_diff_service import BranchDiffService
 from app.services.chat_service import ChatService
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.post("/create-branch", response_model=BranchResponse)
 async def create_branch(
     branch: BranchCreate,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_write_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Create a branch from a specific message.
@@ -44,11 +48,48 @@ async def create_branch(
     )
 
 
+@router.post("/create-branches", response_model=List[BranchResponse])
+async def create_branches(
+    batch: BranchBatchCreate,
+    db: AsyncSession = Depends(get_write_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Create branches from many messages of a chat at once.
+
+    Nothing is created if any of the responses is not found.
+    """
+    chat_service = ChatService(db)
+
+    # Check if the chat exists and user has access
+    chat = await chat_service.get_chat(batch.chat_id)
+    if chat.account_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to create branches from this chat")
+
+    results = await chat_service.create_branches(
+        chat_id=batch.chat_id,
+        branches=[branch.model_dump() for branch in batch.branches],
+        account_id=current_user.id,
+        parent_chat=chat
+    )
+
+    return [
+        BranchResponse(
+            id=result["branch_id"],
+            name=result["name"],
+            parent_chat_id=result["parent_chat_id"],
+            parent_response_id=result["parent_response_id"],
+            created_at=result["created_at"]
+        )
+        for result in results
+    ]
+
+
 @router.get("/get-branches", response_model=List[BranchResponse])
 async def get_branches(
     chat_id: UUID,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Get all branches for a chat.
@@ -64,11 +105,11 @@ async def get_branches(
     
     return [
         BranchResponse(
-            id=branch.id,
-            name=branch.name,
-            parent_chat_id=chat_id,
-            parent_response_id="",  
-            created_at=branch.created_at
+            id=branch["branch_id"],
+            name=branch["name"],
+            parent_chat_id=branch["parent_chat_id"],
+            parent_response_id=branch["parent_response_id"],
+            created_at=branch["created_at"]
         )
         for branch in branches
     ]
@@ -77,8 +118,8 @@ async def get_branches(
 @router.get("/get-branch-tree", response_model=BranchTreeResponse)
 async def get_branch_tree(
     chat_id: UUID,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Get a complete tree of all branches for a conversation.
@@ -98,12 +139,36 @@ async def get_branch_tree(
     )
 
 
+@router.get("/diff-branches", response_model=BranchDiffResponse)
+async def diff_branches(
+    chat_id: UUID,
+    other_chat_id: UUID,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Compare two chats of a branch tree.
+
+    Returns where they fork and only the turns each has after the fork point;
+    the shared history is not sent.
+    """
+    chat_service = ChatService(db)
+
+    # Check if both chats exist and user has access
+    for compared_chat_id in (chat_id, other_chat_id):
+        chat = await chat_service.get_chat(compared_chat_id)
+        if chat.account_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Not authorized to view this chat")
+
+    return await BranchDiffService().diff(chat_id, other_chat_id)
+
+
 @router.put("/set-active-branch", status_code=status.HTTP_200_OK)
 async def set_active_branch(
     chat_id: UUID,
     branch_id: UUID,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_write_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """
     Set a specific branch as active.
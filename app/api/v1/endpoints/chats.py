@@ -1,21 +1,34 @@
+from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_user, get_db
-from app.models.user import User
-from app.schemas.chat import ChatContent, ChatCreate, ChatUpdate, ChatResponse
+from app.api.deps import get_current_user, get_read_db, get_write_db
+from app.core.responses import ORJSONResponse
+from app.core.timing import TimedRoute
+from app.schemas.user import CurrentUser
+from app.schemas.chat import (
+    ChatContent,
+    ChatCreate,
+    ChatListItem,
+    ChatResponse,
+    ChatStatsResponse,
+    ChatSyncResponse,
+    ChatUpdate,
+)
+from app.services.chat_events import chat_event_bus
 from app.services.chat_service import ChatService
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.post("/create-chat", response_model=ChatResponse, status_code=status.HTTP_201_CREATED)
 async def create_chat(
     chat: ChatCreate,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_write_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Create a new chat.
@@ -32,27 +45,132 @@ async def create_chat(
 @router.get("/get-chat", response_model=ChatContent, status_code=status.HTTP_200_OK)
 async def get_chat(
     chat_id: UUID,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Get chat details and messages.
+
+    Responses carry a weak ETag; a request whose If-None-Match still matches
+    gets 304 Not Modified without the content being read from MongoDB.
     """
+    from app.services.chat_versions import chat_versions, etag_matches, make_etag
+
     chat_service = ChatService(db)
-    chat_data = await chat_service.get_chat_with_content(chat_id)
-    
+    chat = await chat_service.get_chat(chat_id)
+
+    # Check if user has access to this chat
+    if chat.account_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to access this chat")
+
+    version = await chat_versions.current(chat_id)
+    headers = {"Cache-Control": "private, no-cache"}
+    if version is not None:
+        headers["ETag"] = make_etag(version, chat.updated_at)
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    chat_data = await chat_service.get_chat_with_content(chat_id, chat=chat)
+
+    # Content comes straight from ChatContentRepository, already projected to
+    # the ChatContent shape, so skip re-validating every QAPair
+    chat_data["chat"] = chat_data["chat"].model_dump(include=set(ChatResponse.model_fields))
+    return ORJSONResponse(chat_data, headers=headers)
+
+
+@router.get("/sync-chat", response_model=ChatSyncResponse, status_code=status.HTTP_200_OK)
+async def sync_chat(
+    chat_id: UUID,
+    cursor: Optional[str] = Query(None, description="Cursor from the previous sync; omit for everything"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Get the messages and branches added to a chat since a previous sync.
+    """
+    chat_service = ChatService(db)
+    chat = await chat_service.get_chat(chat_id)
+
+    # Check if user has access to this chat
+    if chat.account_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to access this chat")
+
+    return await chat_service.sync_chat(chat_id, cursor, limit)
+
+
+@router.get("/chat-events", response_class=StreamingResponse, status_code=status.HTTP_200_OK)
+async def chat_events(
+    chat_id: UUID,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Stream a chat's events (message added, branch created, active branch
+    changed) as server-sent events, whichever worker handled the write.
+    """
+    chat_service = ChatService(db)
+    chat = await chat_service.get_chat(chat_id)
+
+    # Check if user has access to this chat
+    if chat.account_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to access this chat")
+
+    # The stream may stay open for hours; don't hold a database connection for it
+    await db.close()
+    return StreamingResponse(
+        chat_event_bus.stream(chat_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/list-chats", response_model=List[ChatListItem], status_code=status.HTTP_200_OK)
+async def list_chats(
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    List the current user's chats, most recently active first, with their statistics.
+    """
+    chat_service = ChatService(db)
+    return await chat_service.get_user_chats(current_user.id, limit=limit, offset=offset)
+
+
+@router.get("/get-chat-stats", response_model=ChatStatsResponse, status_code=status.HTTP_200_OK)
+async def get_chat_stats(
+    chat_id: UUID,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Get message count, branch count, bytes stored and last activity of a chat.
+    """
+    chat_service = ChatService(db)
+    chat = await chat_service.get_chat(chat_id)
+
     # Check if user has access to this chat
-    if chat_data["chat"].account_id != current_user.id:
+    if chat.account_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to access this chat")
-    return chat_data
+
+    return ChatStatsResponse(
+        chat_id=chat.id,
+        message_count=chat.message_count,
+        branch_count=chat.branch_count,
+        bytes_stored=chat.bytes_stored,
+        last_message_at=chat.last_message_at,
+    )
 
 
 @router.put("/update-chat", response_model=ChatResponse)
 async def update_chat(
     chat_id: UUID,
     chat_update: ChatUpdate,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_write_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Update chat metadata.
@@ -73,8 +191,8 @@ async def update_chat(
 @router.delete("/delete-chat", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_chat(
     chat_id: UUID,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_write_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Delete a chat.
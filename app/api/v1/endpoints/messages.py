@@ -1,20 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_user, get_db
-from app.models.user import User
+from app.api.deps import get_current_user, get_write_db
+from app.core.config import settings
+from app.core.metrics import AI_CACHE_REQUESTS
+from app.core.timing import TimedRoute
+from app.schemas.user import CurrentUser
 from app.schemas.message import MessageCreate, MessageResponse
 from app.services.chat_service import ChatService
-from app.utils.mock_ai import generate_ai_response
+from app.services.context_service import ContextService
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.post("/add-message", response_model=MessageResponse, status_code=status.HTTP_201_CREATED)
 async def add_message(
     message: MessageCreate,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_write_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Add a message to a chat.
@@ -26,8 +30,17 @@ async def add_message(
     if chat.account_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to add messages to this chat")
     
-    # Call the mock AI service 
-    ai_result = await generate_ai_response(message.question)
+    # Call the mock AI service (imported on first use)
+    from app.services.ai_cache import ai_response_cache
+    from app.utils.mock_ai import generate_ai_response
+
+    context_service = ContextService()
+    context = await context_service.build_context(message.chat_id)
+    if settings.AI_CACHE_ENABLED and chat.ai_cache_enabled:
+        ai_result = await ai_response_cache.get_or_generate(message.question, context, generate_ai_response)
+    else:
+        AI_CACHE_REQUESTS.labels("bypass").inc()
+        ai_result = await generate_ai_response(message.question, context)
     ai_response = ai_result["response"]
     
     # Extract metadata from AI response for storage
@@ -43,6 +56,9 @@ async def add_message(
         response=ai_response,
         metadata=ai_metadata
     )
+    # Folding old turns into the summary is another AI call; the client
+    # doesn't wait for it
+    background_tasks.add_task(context_service.refresh_summary, message.chat_id)
     
     return MessageResponse(
         response_id=result["response_id"],
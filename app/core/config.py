@@ -1,5 +1,5 @@
 import os
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Literal, Optional, Union
 from pydantic import AnyHttpUrl, field_validator, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -8,8 +8,10 @@ class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
     ALGORITHM: str = "HS256"
+    # Access tokens carry the user's authorization claims, so keep them short-lived
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 15))
     # 60 minutes * 24 hours * 8 days = 8 days
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
+    REFRESH_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_MINUTES", 60 * 24 * 8))
     
     # BACKEND_CORS_ORIGINS is a comma-separated list of origins
     BACKEND_CORS_ORIGINS: List[str] = Field(default=["*"])
@@ -23,21 +25,158 @@ class Settings(BaseSettings):
             return v
         raise ValueError(v)
 
+    # Schema management at startup: "create" runs create_all and the MongoDB
+    # migrations on every boot (development); "skip" does no DDL and expects
+    # `alembic upgrade head` and `python -m app.db.mongo_migrations` to have run
+    DB_INIT_MODE: Literal["create", "skip"] = os.getenv("DB_INIT_MODE", "create")
+
     # PostgreSQL
     POSTGRES_SERVER: str = os.getenv("POSTGRES_SERVER", "localhost")
     POSTGRES_USER: str = os.getenv("POSTGRES_USER", "postgres")
     POSTGRES_PASSWORD: str = os.getenv("POSTGRES_PASSWORD", "password")
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "chat_app")
     SQLALCHEMY_DATABASE_URI: Optional[str] = None
+    # Connection pool size per worker process
+    POSTGRES_POOL_SIZE: int = int(os.getenv("POSTGRES_POOL_SIZE", 10))
+    POSTGRES_MAX_OVERFLOW: int = int(os.getenv("POSTGRES_MAX_OVERFLOW", 10))
+    # Read replicas: comma-separated SQLAlchemy URIs. Read-only endpoints use
+    # them when set, except for users who wrote in the last
+    # POSTGRES_READ_YOUR_WRITES_SECONDS, who are pinned to the primary
+    POSTGRES_REPLICA_URIS: str = os.getenv("POSTGRES_REPLICA_URIS", "")
+    POSTGRES_REPLICA_POOL_SIZE: int = int(os.getenv("POSTGRES_REPLICA_POOL_SIZE", 10))
+    # Replicas are checked this often and skipped while unreachable or lagging
+    POSTGRES_REPLICA_CHECK_INTERVAL_SECONDS: float = float(os.getenv("POSTGRES_REPLICA_CHECK_INTERVAL_SECONDS", 5))
+    POSTGRES_REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("POSTGRES_REPLICA_MAX_LAG_SECONDS", 10))
+    # A replica in use can be up to POSTGRES_REPLICA_MAX_LAG_SECONDS behind, so
+    # the pin must last at least that long; defaults to exactly that
+    POSTGRES_READ_YOUR_WRITES_SECONDS: Optional[float] = None
 
     # MongoDB
     MONGODB_URL: str = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
     MONGODB_DB: str = os.getenv("MONGODB_DB", "chat_content")
+    # Connection pool size per worker process
+    MONGODB_MAX_POOL_SIZE: int = int(os.getenv("MONGODB_MAX_POOL_SIZE", 100))
     
     # Redis
     REDIS_HOST: str = os.getenv("REDIS_HOST", "localhost")
     REDIS_PORT: int = int(os.getenv("REDIS_PORT", 6379))
 
+    # Server (python -m app.server)
+    SERVER_HOST: str = os.getenv("SERVER_HOST", "0.0.0.0")
+    SERVER_PORT: int = int(os.getenv("SERVER_PORT", 8000))
+    # Number of worker processes; defaults to the number of CPUs
+    WEB_CONCURRENCY: Optional[int] = None
+    # "auto" picks uvloop / httptools when installed
+    SERVER_LOOP: str = os.getenv("SERVER_LOOP", "auto")
+    SERVER_HTTP: str = os.getenv("SERVER_HTTP", "auto")
+    SERVER_BACKLOG: int = int(os.getenv("SERVER_BACKLOG", 2048))
+    SERVER_KEEPALIVE_TIMEOUT: int = int(os.getenv("SERVER_KEEPALIVE_TIMEOUT", 5))
+    # Restart a worker after this many requests to cap memory growth; 0 disables
+    SERVER_MAX_REQUESTS: int = int(os.getenv("SERVER_MAX_REQUESTS", 0))
+    SERVER_GRACEFUL_TIMEOUT: int = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", 30))
+    SERVER_ACCESS_LOG: bool = os.getenv("SERVER_ACCESS_LOG", "False").lower() in ("true", "1", "t")
+
+    # Message bodies at least this long (UTF-8 bytes) are stored zstd-compressed
+    # in MongoDB; 0 disables compression of new messages
+    CONTENT_COMPRESSION_MIN_BYTES: int = int(os.getenv("CONTENT_COMPRESSION_MIN_BYTES", 1024))
+    CONTENT_COMPRESSION_LEVEL: int = int(os.getenv("CONTENT_COMPRESSION_LEVEL", 3))
+
+    # HTTP response compression, negotiated from Accept-Encoding (br, gzip)
+    HTTP_COMPRESSION_ENABLED: bool = os.getenv("HTTP_COMPRESSION_ENABLED", "True").lower() in ("true", "1", "t")
+    HTTP_COMPRESSION_MIN_BYTES: int = int(os.getenv("HTTP_COMPRESSION_MIN_BYTES", 1024))
+    HTTP_COMPRESSION_GZIP_LEVEL: int = int(os.getenv("HTTP_COMPRESSION_GZIP_LEVEL", 6))
+    HTTP_COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("HTTP_COMPRESSION_BROTLI_QUALITY", 4))
+
+    # Idempotency-Key support on create-chat, add-message and create-branch
+    IDEMPOTENCY_ENABLED: bool = os.getenv("IDEMPOTENCY_ENABLED", "True").lower() in ("true", "1", "t")
+    # How long a finished response is replayed for retries
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 60 * 60 * 24))
+    # A claimed key is released after this long if its worker dies mid-request
+    IDEMPOTENCY_LOCK_SECONDS: int = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", 60))
+    # How long a concurrent duplicate waits for the original before a 409
+    IDEMPOTENCY_WAIT_SECONDS: int = int(os.getenv("IDEMPOTENCY_WAIT_SECONDS", 30))
+
+    # Content version counters behind get-chat ETags: "redis" is shared by all
+    # workers, "memory" is per process and only correct with a single worker
+    CHAT_VERSION_BACKEND: Literal["redis", "memory"] = os.getenv("CHAT_VERSION_BACKEND", "redis")
+    CHAT_VERSION_TTL_SECONDS: int = int(os.getenv("CHAT_VERSION_TTL_SECONDS", 60 * 60 * 24 * 7))
+    CHAT_VERSION_MAX_ENTRIES: int = int(os.getenv("CHAT_VERSION_MAX_ENTRIES", 100000))
+
+    # Live chat events over Redis pub/sub (chats/chat-events)
+    CHAT_EVENTS_ENABLED: bool = os.getenv("CHAT_EVENTS_ENABLED", "True").lower() in ("true", "1", "t")
+    # Events buffered per listener; a listener that falls further behind is cut off
+    CHAT_EVENTS_QUEUE_SIZE: int = int(os.getenv("CHAT_EVENTS_QUEUE_SIZE", 100))
+    CHAT_EVENTS_HEARTBEAT_SECONDS: float = float(os.getenv("CHAT_EVENTS_HEARTBEAT_SECONDS", 15))
+
+    # Retention: chat content expires this many days after its last message
+    # (MongoDB TTL index) and the chat rows are purged by
+    # python -m app.db.purge_expired_chats; 0 keeps everything
+    RETENTION_DAYS: int = int(os.getenv("RETENTION_DAYS", 0))
+    # Honour users.retention_days; costs a (cached) lookup per account on writes
+    RETENTION_ACCOUNT_OVERRIDES: bool = os.getenv("RETENTION_ACCOUNT_OVERRIDES", "False").lower() in ("true", "1", "t")
+    RETENTION_CACHE_SECONDS: int = int(os.getenv("RETENTION_CACHE_SECONDS", 300))
+
+    # Cold storage: chats idle this long are moved out of MongoDB into
+    # zstd-compressed append-only segment files under ARCHIVE_DIR
+    ARCHIVE_DIR: str = os.getenv("ARCHIVE_DIR", "archive")
+    ARCHIVE_IDLE_DAYS: int = int(os.getenv("ARCHIVE_IDLE_DAYS", 30))
+    ARCHIVE_SEGMENT_MAX_BYTES: int = int(os.getenv("ARCHIVE_SEGMENT_MAX_BYTES", 256 * 1024 ** 2))
+
+    # Audit event log: queued in memory and written in batches by a background
+    # task to a capped MongoDB collection (oldest events are overwritten)
+    AUDIT_LOG_ENABLED: bool = os.getenv("AUDIT_LOG_ENABLED", "True").lower() in ("true", "1", "t")
+    AUDIT_LOG_QUEUE_SIZE: int = int(os.getenv("AUDIT_LOG_QUEUE_SIZE", 10000))
+    AUDIT_LOG_BATCH_SIZE: int = int(os.getenv("AUDIT_LOG_BATCH_SIZE", 500))
+    AUDIT_LOG_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("AUDIT_LOG_FLUSH_INTERVAL_SECONDS", 1))
+    # How long a request waits for room in a full queue before its event is dropped
+    AUDIT_LOG_ENQUEUE_TIMEOUT_SECONDS: float = float(os.getenv("AUDIT_LOG_ENQUEUE_TIMEOUT_SECONDS", 1))
+    AUDIT_LOG_MAX_BYTES: int = int(os.getenv("AUDIT_LOG_MAX_BYTES", 1024 ** 3))
+
+    # Load shedding: past either limit, a worker answers low-priority routes
+    # (branch trees and diffs) with 503 + Retry-After
+    LOAD_SHEDDING_ENABLED: bool = os.getenv("LOAD_SHEDDING_ENABLED", "True").lower() in ("true", "1", "t")
+    # The loop lag limit only counts once every sample of the window is over it
+    LOAD_SHEDDING_MAX_LOOP_LAG_MS: int = int(os.getenv("LOAD_SHEDDING_MAX_LOOP_LAG_MS", 100))
+    LOAD_SHEDDING_LAG_WINDOW_MS: int = int(os.getenv("LOAD_SHEDDING_LAG_WINDOW_MS", 1000))
+    LOAD_SHEDDING_MAX_IN_FLIGHT: int = int(os.getenv("LOAD_SHEDDING_MAX_IN_FLIGHT", 200))
+    # Retry-After at the limits; it grows with the overload up to the maximum
+    LOAD_SHEDDING_RETRY_AFTER_SECONDS: int = int(os.getenv("LOAD_SHEDDING_RETRY_AFTER_SECONDS", 1))
+    LOAD_SHEDDING_MAX_RETRY_AFTER_SECONDS: int = int(os.getenv("LOAD_SHEDDING_MAX_RETRY_AFTER_SECONDS", 30))
+
+    # Observability
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "True").lower() in ("true", "1", "t")
+    SERVER_TIMING_ENABLED: bool = os.getenv("SERVER_TIMING_ENABLED", "True").lower() in ("true", "1", "t")
+    # Requests slower than this are logged with a per-store breakdown
+    SLOW_REQUEST_THRESHOLD_MS: int = int(os.getenv("SLOW_REQUEST_THRESHOLD_MS", 1000))
+    # Event loop lag is measured by a timer firing this often (used by load
+    # shedding and the loop watchdog)
+    LOOP_LAG_PROBE_INTERVAL_MS: int = int(os.getenv("LOOP_LAG_PROBE_INTERVAL_MS", 50))
+    # Loop watchdog: samples the loop thread's stack whenever the lag probe's
+    # timer has been overdue for longer than the threshold
+    LOOP_WATCHDOG_ENABLED: bool = os.getenv("LOOP_WATCHDOG_ENABLED", "False").lower() in ("true", "1", "t")
+    LOOP_WATCHDOG_THRESHOLD_MS: int = int(os.getenv("LOOP_WATCHDOG_THRESHOLD_MS", 100))
+    LOOP_WATCHDOG_STACK_DEPTH: int = int(os.getenv("LOOP_WATCHDOG_STACK_DEPTH", 20))
+
+    # Mock AI
+    MOCK_AI_LATENCY_MS: int = int(os.getenv("MOCK_AI_LATENCY_MS", 300))
+
+    # AI context: the latest turns (following branch ancestry) up to a token
+    # budget, plus a rolling summary of older turns
+    AI_CONTEXT_MAX_TURNS: int = int(os.getenv("AI_CONTEXT_MAX_TURNS", 10))
+    AI_CONTEXT_TOKEN_BUDGET: int = int(os.getenv("AI_CONTEXT_TOKEN_BUDGET", 2000))
+    # How many ancestor chats a branch may pull turns from
+    AI_CONTEXT_MAX_ANCESTORS: int = int(os.getenv("AI_CONTEXT_MAX_ANCESTORS", 3))
+    AI_SUMMARY_MAX_TOKENS: int = int(os.getenv("AI_SUMMARY_MAX_TOKENS", 256))
+    # Fold turns into the summary once this many have left the context window
+    AI_SUMMARY_BATCH_TURNS: int = int(os.getenv("AI_SUMMARY_BATCH_TURNS", 10))
+
+    # AI response cache: exact match on normalised question + context, kept in
+    # Redis (bounded LRU) with a small per-worker L1 in front
+    AI_CACHE_ENABLED: bool = os.getenv("AI_CACHE_ENABLED", "True").lower() in ("true", "1", "t")
+    AI_CACHE_TTL_SECONDS: int = int(os.getenv("AI_CACHE_TTL_SECONDS", 3600))
+    AI_CACHE_MAX_ENTRIES: int = int(os.getenv("AI_CACHE_MAX_ENTRIES", 10000))
+    AI_CACHE_L1_MAX_ENTRIES: int = int(os.getenv("AI_CACHE_L1_MAX_ENTRIES", 1024))
+
     # Project settings
     PROJECT_NAME: str = "Chat Application API"
     
@@ -52,6 +191,13 @@ class Settings(BaseSettings):
                 f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
                 f"@{self.POSTGRES_SERVER}/{self.POSTGRES_DB}"
             )
+        if self.POSTGRES_READ_YOUR_WRITES_SECONDS is None:
+            self.POSTGRES_READ_YOUR_WRITES_SECONDS = self.POSTGRES_REPLICA_MAX_LAG_SECONDS
+        elif self.POSTGRES_READ_YOUR_WRITES_SECONDS < self.POSTGRES_REPLICA_MAX_LAG_SECONDS:
+            raise ValueError(
+                "POSTGRES_READ_YOUR_WRITES_SECONDS must be at least POSTGRES_REPLICA_MAX_LAG_SECONDS, "
+                "or users may read their own writes from a replica that has not applied them yet"
+            )
 
 
 settings = Settings() 
\ No newline at end of file
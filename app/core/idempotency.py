@@ -0,0 +1,239 @@
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import IDEMPOTENCY_REQUESTS
+from app.core.security import ACCESS_TOKEN_TYPE, decode_token
+from app.db.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+HEADER = b"idempotency-key"
+KEY_PREFIX = "idempotency:"
+IN_PROGRESS = "in_progress"
+DONE = "done"
+# What waiting on a key yields when the original failed and released it
+RELEASED = {"state": "released"}
+# Response headers that describe this delivery rather than the result
+NOT_REPLAYED_HEADERS = {b"content-length", b"server-timing", b"date", b"server"}
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware honouring an ``Idempotency-Key`` header on selected POST
+    routes.
+
+    The first request with a key claims it in Redis (SET NX), runs, and
+    stores its response for ``IDEMPOTENCY_TTL_SECONDS``; retries get that
+    response back with ``Idempotent-Replayed: true`` instead of running
+    again. A duplicate that arrives while the first is still running waits
+    for its result, or runs itself if the first fails. Keys are scoped to the caller's account (the access
+    token's ``sub``, so a retry with a refreshed token still matches) and
+    the route, and reusing a key with a different body is rejected with 422.
+    Requests without a valid access token run without the key and get the
+    endpoint's 401. Server errors release the key so the client can retry.
+    """
+
+    def __init__(self, app: ASGIApp, paths: Iterable[str]):
+        # Starlette builds the middleware stack on the first request, so
+        # redis is still imported lazily
+        from jose import JWTError
+        from redis.exceptions import RedisError
+
+        self.app = app
+        self.paths = set(paths)
+        self.redis_errors = (RedisError, OSError)
+        self.token_errors = JWTError
+        # Requests in flight on this worker, so local duplicates don't poll Redis
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        idempotency_key = headers.get(HEADER)
+        account = self._account(headers.get(b"authorization", b""))
+        if not idempotency_key or account is None:
+            await self.app(scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        replay_receive = _replay(body, receive)
+        key = KEY_PREFIX + hashlib.sha256(
+            b"\0".join([account.encode(), scope["path"].encode(), idempotency_key])
+        ).hexdigest()
+        fingerprint = hashlib.sha256(body).hexdigest()
+
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            try:
+                claimed = await get_redis().set(
+                    key,
+                    json.dumps({"state": IN_PROGRESS, "fingerprint": fingerprint}),
+                    nx=True,
+                    ex=settings.IDEMPOTENCY_LOCK_SECONDS,
+                )
+            except self.redis_errors as exc:
+                logger.warning("Idempotency store unavailable, running request without it: %s", exc)
+                await self.app(scope, replay_receive, send)
+                return
+
+            if claimed:
+                await self._execute(key, fingerprint, scope, replay_receive, send)
+                return
+
+            record = await self._wait_for_result(key, deadline)
+            # The request we waited for failed; this one claims the key and
+            # runs in its place, as the client's own retry would
+            if record is not RELEASED:
+                break
+
+        if record is None:
+            IDEMPOTENCY_REQUESTS.labels("in_progress").inc()
+            await _send_error(send, 409, "A request with this Idempotency-Key is still in progress")
+        elif record["fingerprint"] != fingerprint:
+            IDEMPOTENCY_REQUESTS.labels("mismatch").inc()
+            await _send_error(send, 422, "Idempotency-Key was already used with a different request")
+        else:
+            IDEMPOTENCY_REQUESTS.labels("replayed").inc()
+            await _send_stored(send, record)
+
+    def _account(self, authorization: bytes) -> Optional[str]:
+        """The ``sub`` of a valid bearer access token, else None."""
+        scheme, _, token = authorization.decode("latin-1").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None
+        try:
+            payload = decode_token(token)
+        except self.token_errors:
+            return None
+        if payload.get("type") != ACCESS_TOKEN_TYPE:
+            return None
+        return payload.get("sub") or None
+
+    async def _execute(self, key: str, fingerprint: str, scope: Scope, receive: Receive, send: Send) -> None:
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        status_code = 500
+        response_headers: List[Tuple[bytes, bytes]] = []
+        chunks: List[bytes] = []
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_headers
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        record = None
+        try:
+            await self.app(scope, receive, send_wrapper)
+            if status_code < 500:
+                record = {
+                    "state": DONE,
+                    "fingerprint": fingerprint,
+                    "status": status_code,
+                    "headers": [
+                        [name.decode("latin-1"), value.decode("latin-1")]
+                        for name, value in response_headers
+                        if name.lower() not in NOT_REPLAYED_HEADERS
+                    ],
+                    "body": base64.b64encode(b"".join(chunks)).decode("ascii"),
+                }
+        finally:
+            self._in_flight.pop(key, None)
+            try:
+                if record is not None:
+                    await get_redis().set(key, json.dumps(record), ex=settings.IDEMPOTENCY_TTL_SECONDS)
+                    IDEMPOTENCY_REQUESTS.labels("stored").inc()
+                else:
+                    await get_redis().delete(key)
+            except self.redis_errors as exc:
+                logger.warning("Could not record idempotent response: %s", exc)
+            if not future.done():
+                future.set_result(record)
+
+    async def _wait_for_result(self, key: str, deadline: float) -> Optional[dict]:
+        """
+        The finished record for ``key``, ``RELEASED`` if the request holding
+        it failed, or None if it didn't finish before ``deadline``.
+        """
+        future = self._in_flight.get(key)
+        if future is not None:
+            try:
+                record = await asyncio.wait_for(asyncio.shield(future), max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                return None
+            return RELEASED if record is None else record
+
+        delay = 0.01
+        while True:
+            try:
+                raw = await get_redis().get(key)
+            except self.redis_errors:
+                return None
+            if raw is None:
+                return RELEASED
+            record = json.loads(raw)
+            if record["state"] == DONE:
+                return record
+            if time.monotonic() >= deadline:
+                return None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        more_body = message.get("more_body", False)
+    return b"".join(chunks)
+
+
+def _replay(body: bytes, receive: Receive) -> Receive:
+    """Hand the buffered body to the app, then defer to the real connection."""
+    sent = False
+
+    async def replay_receive() -> Message:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return replay_receive
+
+
+async def _send_stored(send: Send, record: dict) -> None:
+    body = base64.b64decode(record["body"])
+    headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in record["headers"]]
+    headers.append((b"content-length", str(len(body)).encode()))
+    headers.append((b"idempotent-replayed", b"true"))
+    await send({"type": "http.response.start", "status": record["status"], "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_error(send: Send, status_code: int, detail: str) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
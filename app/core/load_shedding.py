@@ -0,0 +1,77 @@
+import json
+import math
+from typing import Iterable
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.loop_monitor import LoopLagProbe
+from app.core.metrics import LOAD_SHED_REQUESTS
+
+
+class LoadSheddingMiddleware:
+    """
+    ASGI admission control for one worker.
+
+    While the event loop has lagged more than ``max_loop_lag`` seconds for
+    the probe's whole window, or
+    ``max_in_flight`` requests are being served, requests to
+    ``low_priority_paths`` are rejected with 503 and a ``Retry-After`` that
+    grows with the overload; everything else is still served. Requests to
+    ``untracked_paths`` (long-lived streams, health checks) are neither
+    counted nor shed.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        probe: LoopLagProbe,
+        low_priority_paths: Iterable[str],
+        untracked_paths: Iterable[str] = (),
+        max_loop_lag: float = 0.1,
+        max_in_flight: int = 100,
+        retry_after: int = 1,
+        max_retry_after: int = 30,
+    ):
+        self.app = app
+        self.probe = probe
+        self.low_priority_paths = set(low_priority_paths)
+        self.untracked_paths = set(untracked_paths)
+        self.max_loop_lag = max_loop_lag
+        self.max_in_flight = max_in_flight
+        self.retry_after = retry_after
+        self.max_retry_after = max_retry_after
+        self.in_flight = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.untracked_paths:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["path"] in self.low_priority_paths:
+            lag = self.probe.sustained_lag
+            overload = max(lag / self.max_loop_lag, (self.in_flight + 1) / self.max_in_flight)
+            if overload > 1:
+                LOAD_SHED_REQUESTS.labels("loop_lag" if lag > self.max_loop_lag else "in_flight").inc()
+                await _send_unavailable(send, min(self.max_retry_after, math.ceil(self.retry_after * overload)))
+                return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+
+async def _send_unavailable(send: Send, retry_after: int) -> None:
+    body = json.dumps({"detail": "Server is overloaded, retry later"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.metrics import EVENT_LOOP_BLOCKED_SAMPLES, EVENT_LOOP_LAG
+
+logger = logging.getLogger(__name__)
+
+# Each sample decays by this much per probe, so one slow callback keeps the
+# lag high for a few intervals instead of a single one
+LAG_DECAY = 0.8
+# Blocking frames are reported by the innermost frame in our own code
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_DIR = os.path.dirname(APP_DIR)
+
+
+class LoopLagProbe:
+    """
+    Measures event loop lag: how late a sleep of ``interval`` seconds wakes
+    up. When callbacks block the loop or it is saturated with work, every
+    await on it is delayed by about that much. Samples are recorded in
+    ``event_loop_lag_seconds``.
+
+    ``lag`` follows the latest samples; ``sustained_lag`` is the smallest
+    sample of the last ``window`` seconds, so it only rises when the loop has
+    been late for that whole time, not after one slow callback.
+    """
+
+    def __init__(self, interval: float, window: float = 1.0):
+        self.interval = interval
+        self.lag = 0.0
+        self.samples = deque(maxlen=max(1, round(window / interval)))
+        # perf_counter() of the last wakeup; the loop is blocked once this
+        # is more than ``interval`` ago
+        self.woke_at = time.perf_counter()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self.woke_at = time.perf_counter()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            woke_at = time.perf_counter()
+            lag = max(0.0, woke_at - self.woke_at - self.interval)
+            self.woke_at = woke_at
+            EVENT_LOOP_LAG.observe(lag)
+            self.observe(lag)
+
+    def observe(self, lag: float) -> None:
+        self.lag = max(lag, self.lag * LAG_DECAY)
+        self.samples.append(lag)
+
+    @property
+    def sustained_lag(self) -> float:
+        if len(self.samples) < self.samples.maxlen:
+            return 0.0
+        return min(self.samples)
+
+
+def blocking_frame(stack: List[traceback.FrameSummary]) -> str:
+    """``path:line function`` of the innermost frame in app code, else the innermost frame."""
+    frame = next((frame for frame in reversed(stack) if frame.filename.startswith(APP_DIR)), stack[-1])
+    return f"{os.path.relpath(frame.filename, PROJECT_DIR)}:{frame.lineno} {frame.name}"
+
+
+class LoopWatchdog:
+    """
+    Finds synchronous work that blocks the event loop.
+
+    A daemon thread checks every ``threshold / 2`` seconds whether the
+    probe's timer is overdue. Once it has been overdue for more than
+    ``threshold`` seconds, whether one long callback or many short ones
+    back to back kept it waiting, the loop thread's stack is sampled: the
+    first sample of each stall is logged with up to ``stack_depth`` frames,
+    and every sample is counted in ``event_loop_blocked_samples_total`` by
+    its innermost app frame. A sample only shows whatever was running at
+    that moment, so it is the counts across samples that approximate where
+    blocked time goes.
+    """
+
+    def __init__(self, probe: LoopLagProbe, threshold: float, stack_depth: int = 20):
+        self.probe = probe
+        self.threshold = threshold
+        self.stack_depth = stack_depth
+        self._loop_thread_id: Optional[int] = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Watch the running loop; call from the loop thread after starting the probe."""
+        if self._thread is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self) -> None:
+        reported_stall = None
+        while not self._stopped.wait(self.threshold / 2):
+            woke_at = self.probe.woke_at
+            blocked_for = time.perf_counter() - woke_at - self.probe.interval
+            if blocked_for > self.threshold:
+                self.sample(blocked_for, report=woke_at != reported_stall)
+                reported_stall = woke_at
+
+    def sample(self, blocked_for: float, report: bool = True) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        stack = traceback.extract_stack(frame, limit=self.stack_depth)
+        EVENT_LOOP_BLOCKED_SAMPLES.labels(blocking_frame(stack)).inc()
+        if report:
+            logger.warning(
+                "Event loop blocked for %.0f ms in:\n%s",
+                blocked_for * 1000, "".join(traceback.format_list(stack)).rstrip()
+            )
+
+
+loop_lag_probe = LoopLagProbe(
+    settings.LOOP_LAG_PROBE_INTERVAL_MS / 1000,
+    window=settings.LOAD_SHEDDING_LAG_WINDOW_MS / 1000,
+)
+loop_watchdog = LoopWatchdog(
+    loop_lag_probe,
+    threshold=settings.LOOP_WATCHDOG_THRESHOLD_MS / 1000,
+    stack_depth=settings.LOOP_WATCHDOG_STACK_DEPTH,
+)
@@ -0,0 +1,322 @@
+import os
+import time
+from functools import wraps
+from typing import Any, Callable, Dict
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from pymongo import monitoring
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import timing
+from app.core.config import settings
+
+# The datastore hooks feed both the Prometheus metrics and Server-Timing;
+# with both turned off they are not installed at all
+DATASTORE_HOOKS_ENABLED = settings.METRICS_ENABLED or settings.SERVER_TIMING_ENABLED
+
+# Buckets tuned for an API whose interesting range is 1ms - 10s
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+
+POSTGRES_STATEMENTS = Counter(
+    "postgres_statements_total",
+    "PostgreSQL statements executed",
+    ["operation", "outcome"],
+)
+POSTGRES_STATEMENT_DURATION = Histogram(
+    "postgres_statement_duration_seconds",
+    "PostgreSQL statement latency",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+POSTGRES_READS = Counter(
+    "postgres_read_sessions_total",
+    "Sessions opened for read-only endpoints, by where they were routed",
+    ["target"],
+)
+POSTGRES_REPLICA_HEALTHY = Gauge(
+    "postgres_replica_healthy",
+    "Whether a read replica passed its last health check",
+    ["replica"],
+    multiprocess_mode="livemin",
+)
+MONGO_COMMANDS = Counter(
+    "mongo_commands_total",
+    "MongoDB commands executed",
+    ["command", "outcome"],
+)
+MONGO_COMMAND_DURATION = Histogram(
+    "mongo_command_duration_seconds",
+    "MongoDB command latency",
+    ["command"],
+    buckets=LATENCY_BUCKETS,
+)
+
+REDIS_COMMANDS = Counter(
+    "redis_commands_total",
+    "Redis commands executed",
+    ["command", "outcome"],
+)
+REDIS_COMMAND_DURATION = Histogram(
+    "redis_command_duration_seconds",
+    "Redis command latency",
+    ["command"],
+    buckets=LATENCY_BUCKETS,
+)
+
+AI_CALLS = Counter(
+    "ai_provider_calls_total",
+    "AI provider calls",
+    ["provider", "outcome"],
+)
+AI_CALL_DURATION = Histogram(
+    "ai_provider_call_duration_seconds",
+    "AI provider call latency",
+    ["provider"],
+    buckets=LATENCY_BUCKETS,
+)
+
+AI_CACHE_REQUESTS = Counter(
+    "ai_cache_requests_total",
+    "AI response cache lookups",
+    ["result"],
+)
+
+CHAT_EVENTS = Counter(
+    "chat_events_total",
+    "Chat events published, delivered to local listeners or dropped for slow ones",
+    ["result"],
+)
+CHAT_EVENT_LISTENERS = Gauge(
+    "chat_event_listeners",
+    "Clients listening to chat events",
+    multiprocess_mode="livesum",
+)
+AUDIT_EVENTS = Counter(
+    "audit_events_total",
+    "Audit events queued, written, dropped on a full queue or lost to failed writes",
+    ["result"],
+)
+CHAT_ARCHIVE = Counter(
+    "chat_archive_total",
+    "Chats moved to cold storage segments or restored to MongoDB",
+    ["result"],
+)
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop ran a timer",
+    buckets=LATENCY_BUCKETS,
+)
+EVENT_LOOP_BLOCKED_SAMPLES = Counter(
+    "event_loop_blocked_samples_total",
+    "Stack samples of a blocked event loop, by the innermost app frame",
+    ["frame"],
+)
+LOAD_SHED_REQUESTS = Counter(
+    "load_shed_requests_total",
+    "Low-priority requests rejected with 503, by the limit that was exceeded",
+    ["reason"],
+)
+IDEMPOTENCY_REQUESTS = Counter(
+    "idempotency_requests_total",
+    "Requests carrying an Idempotency-Key, by outcome",
+    ["result"],
+)
+
+
+def route_template(scope: Scope) -> str:
+    """
+    Route template for a request, e.g. ``/api/v1/chats/get-chat``.
+
+    Unmatched paths are collapsed into a single label so arbitrary URLs cannot
+    blow up the metric cardinality.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    return getattr(route, "path_format", None) or getattr(route, "path", "unmatched")
+
+
+class PrometheusMiddleware:
+    """
+    ASGI middleware recording request latency by route template and status,
+    and the number of requests in flight.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            HTTP_REQUEST_DURATION.labels(method, route_template(scope), str(status_code)).observe(
+                time.perf_counter() - started
+            )
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # Several worker processes: aggregate the files they all write to
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+def _statement_operation(statement: str) -> str:
+    return statement.lstrip().split(" ", 1)[0].upper() or "UNKNOWN"
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Record every statement run through ``engine``."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_started"].pop()
+        operation = _statement_operation(statement)
+        POSTGRES_STATEMENT_DURATION.labels(operation).observe(elapsed)
+        POSTGRES_STATEMENTS.labels(operation, "success").inc()
+        timing.record("pg", elapsed)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("metrics_started"):
+            connection.info["metrics_started"].pop()
+        statement = exception_context.statement or ""
+        POSTGRES_STATEMENTS.labels(_statement_operation(statement), "error").inc()
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """PyMongo command monitoring listener; Motor shares PyMongo's events."""
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._observe(event, "success")
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._observe(event, "error")
+
+    @staticmethod
+    def _observe(event, outcome: str) -> None:
+        elapsed = event.duration_micros / 1_000_000
+        MONGO_COMMAND_DURATION.labels(event.command_name).observe(elapsed)
+        MONGO_COMMANDS.labels(event.command_name, outcome).inc()
+        timing.record("mongo", elapsed)
+
+
+def instrument_redis(client: Any) -> Any:
+    """
+    Wrap ``execute_command`` (and pipeline ``execute``) on a Redis client
+    instance so every command is timed. Works for any client exposing the
+    redis-py interface.
+    """
+
+    def timed(execute: Callable, label: Callable) -> Callable:
+        @wraps(execute)
+        async def timed_execute(*args, **options):
+            command = label(args)
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                result = await execute(*args, **options)
+                outcome = "success"
+                return result
+            finally:
+                elapsed = time.perf_counter() - started
+                REDIS_COMMAND_DURATION.labels(command).observe(elapsed)
+                REDIS_COMMANDS.labels(command, outcome).inc()
+                timing.record("redis", elapsed)
+
+        return timed_execute
+
+    client.execute_command = timed(
+        client.execute_command, lambda args: str(args[0]).upper() if args else "UNKNOWN"
+    )
+
+    pipeline = client.pipeline
+
+    @wraps(pipeline)
+    def timed_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        # A pipeline is one round trip, so it is timed as a single command
+        pipe.execute = timed(pipe.execute, lambda args: "PIPELINE")
+        return pipe
+
+    client.pipeline = timed_pipeline
+    return client
+
+
+def track_ai_call(provider: str) -> Callable:
+    """Decorator recording latency and outcome of an async AI provider call."""
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(*args, **kwargs) -> Dict[str, Any]:
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                result = await func(*args, **kwargs)
+                outcome = "success"
+                return result
+            finally:
+                elapsed = time.perf_counter() - started
+                AI_CALL_DURATION.labels(provider).observe(elapsed)
+                AI_CALLS.labels(provider, outcome).inc()
+                timing.record("ai", elapsed)
+
+        return wrapper
+
+    return decorator
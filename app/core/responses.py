@@ -0,0 +1,18 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson.
+
+    orjson encodes UUIDs, datetimes and enums natively, so documents read from
+    MongoDB and PostgreSQL can be rendered without going through
+    ``jsonable_encoder``. ``OPT_UTC_Z`` keeps UTC timestamps in the same
+    ``...Z`` form Pydantic produces.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
@@ -1,29 +1,98 @@
+import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Any, Union
+from functools import lru_cache
+from typing import Any, Dict, Optional, Union
 
 from jose import jwt
-from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.db.redis import get_redis
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
 
+# Revoked token IDs are kept as individual keys that expire together with the
+# token, so the revocation set never grows past the live tokens and a lookup
+# is a single O(1) EXISTS
+REVOKED_TOKEN_PREFIX = "revoked-token:"
 
-def create_access_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
-    if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
-    else:
-        expire = datetime.now(timezone.utc) + timedelta(
-            minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
-        )
-    to_encode = {"exp": expire, "sub": str(subject)}
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    # passlib and the bcrypt backend are only needed by login and register,
+    # so keep them out of the worker cold start
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _create_token(
+    subject: Union[str, Any],
+    token_type: str,
+    expires_delta: timedelta,
+    claims: Optional[Dict[str, Any]] = None
+) -> str:
+    now = datetime.now(timezone.utc)
+    to_encode = {
+        "sub": str(subject),
+        "type": token_type,
+        "jti": uuid.uuid4().hex,
+        "iat": now,
+        "exp": now + expires_delta,
+    }
+    if claims:
+        to_encode.update(claims)
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def create_access_token(
+    subject: Union[str, Any],
+    expires_delta: timedelta = None,
+    is_active: bool = True,
+    is_superuser: bool = False
+) -> str:
+    """
+    Short-lived access token. It carries the authorization claims, so
+    authenticated requests don't need to load the user.
+    """
+    return _create_token(
+        subject,
+        ACCESS_TOKEN_TYPE,
+        expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+        {"is_active": bool(is_active), "is_superuser": bool(is_superuser)},
+    )
+
+
+def create_refresh_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
+    """Long-lived token that can only be exchanged for new tokens at /auth/refresh."""
+    return _create_token(
+        subject,
+        REFRESH_TOKEN_TYPE,
+        expires_delta or timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES),
+    )
+
+
+def decode_token(token: str) -> Dict[str, Any]:
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+
+async def revoke_token(jti: str, expires_at: int) -> bool:
+    """
+    Revoke a token until its own expiry (``exp``, seconds since the epoch).
+
+    Returns False if the token was already revoked, which makes refresh token
+    rotation safe against the same token being redeemed concurrently.
+    """
+    return bool(await get_redis().set(f"{REVOKED_TOKEN_PREFIX}{jti}", 1, exat=expires_at, nx=True))
+
+
+async def is_token_revoked(jti: str) -> bool:
+    return bool(await get_redis().exists(f"{REVOKED_TOKEN_PREFIX}{jti}"))
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password) 
\ No newline at end of file
+    return get_pwd_context().hash(password)
@@ -0,0 +1,158 @@
+import inspect
+import json
+import logging
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, Optional
+
+from fastapi.routing import APIRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Human readable descriptions for the Server-Timing header
+TIMING_LABELS = {
+    "pg": "PostgreSQL",
+    "mongo": "MongoDB",
+    "redis": "Redis",
+    "ai": "AI provider",
+    "serialize": "Response serialization",
+    "compress": "Response compression",
+}
+
+
+class RequestTimings:
+    """Time spent per backend during a single request, plus round-trip counts."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations: Dict[str, float] = defaultdict(float)
+        self.counts: Dict[str, int] = defaultdict(int)
+        self.endpoint_finished: Optional[float] = None
+
+    def add(self, name: str, seconds: float) -> None:
+        self.durations[name] += seconds
+        self.counts[name] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing_header(self) -> str:
+        entries = []
+        for name, seconds in self.durations.items():
+            label = TIMING_LABELS.get(name, name)
+            entries.append(f'{name};dur={seconds * 1000:.2f};desc="{label} x{self.counts[name]}"')
+        entries.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(entries)
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {"ms": round(seconds * 1000, 3), "count": self.counts[name]}
+            for name, seconds in self.durations.items()
+        }
+
+
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current_timings.get()
+
+
+def record(name: str, seconds: float) -> None:
+    """Attribute ``seconds`` to ``name`` on the current request, if any."""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware that collects per-request backend timings, returns them in
+    a ``Server-Timing`` header and logs a breakdown for slow requests.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        status_code = 500
+        streaming = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                # Event streams stay open by design; they aren't slow requests
+                streaming = any(
+                    name.lower() == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in headers
+                )
+                headers.append((b"server-timing", timings.server_timing_header().encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_timings.reset(token)
+            elapsed_ms = timings.elapsed() * 1000
+            if elapsed_ms >= settings.SLOW_REQUEST_THRESHOLD_MS and not streaming:
+                logger.warning("slow request %s", json.dumps({
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "total_ms": round(elapsed_ms, 3),
+                    "breakdown": timings.as_dict(),
+                }))
+
+
+def _mark_endpoint_finished(endpoint: Callable) -> Callable:
+    @wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            timings = _current_timings.get()
+            if timings is not None:
+                timings.endpoint_finished = time.perf_counter()
+
+    wrapper._timed = True
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """
+    Route class that attributes the time between the endpoint returning and
+    the response being built (response model validation and JSON encoding)
+    to ``serialize``.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        if inspect.iscoroutinefunction(endpoint) and not getattr(endpoint, "_timed", False):
+            endpoint = _mark_endpoint_finished(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            response = await handler(request)
+            timings = _current_timings.get()
+            if timings is not None and timings.endpoint_finished is not None:
+                timings.add("serialize", time.perf_counter() - timings.endpoint_finished)
+                timings.endpoint_finished = None
+            return response
+
+        return timed_handler
@@ -0,0 +1,59 @@
+"""
+Move chats nobody has used in a while out of MongoDB into cold storage.
+
+    python -m app.db.archive_chats [--idle-days 30] [--batch-size 500]
+
+Chats whose ``updated_at`` is older than the idle threshold are archived in
+batches: their content documents are appended to segment files under
+``ARCHIVE_DIR`` and removed from MongoDB. The first request that reads or
+writes a chat's content (get-chat, sync-chat, add-message, branching,
+set-active-branch, branch trees and diffs) restores it, and a chat restored
+within the threshold isn't archived again, however stale ``updated_at`` is.
+Safe to re-run: chats that are already archived have no document left to
+move.
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.postgres import async_session
+from app.models.chat import Chat
+from app.services.chat_archive import chat_archive
+
+logger = logging.getLogger(__name__)
+
+
+async def archive_idle_chats(idle_days: int, batch_size: int) -> int:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=idle_days)
+    archived = 0
+    last_id = None
+    async with async_session() as session:
+        while True:
+            query = select(Chat.id).where(Chat.updated_at < cutoff).order_by(Chat.id).limit(batch_size)
+            if last_id is not None:
+                query = query.where(Chat.id > last_id)
+            chat_ids = (await session.execute(query)).scalars().all()
+            if not chat_ids:
+                break
+            archived += await chat_archive.archive(chat_ids, idle_since=cutoff)
+            last_id = chat_ids[-1]
+    return archived
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--idle-days", type=int, default=settings.ARCHIVE_IDLE_DAYS)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    archived = asyncio.run(archive_idle_chats(args.idle_days, args.batch_size))
+    logger.info("Archived %d chat(s)", archived)
+
+
+if __name__ == "__main__":
+    main()
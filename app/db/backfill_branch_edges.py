@@ -0,0 +1,60 @@
+"""
+Fill the branch_edges index for branches created before it existed.
+
+    python -m app.db.backfill_branch_edges [--batch-size 500]
+
+Reads the branch references of each chat's content once from MongoDB and
+inserts the missing edges into PostgreSQL in batches, dated with the branch
+chat's creation time. Safe to re-run: existing edges are skipped.
+
+Until it has run, get-branches and set-active-branch fill in the edges of
+a chat that has none from its content, one chat at a time.
+"""
+import argparse
+import asyncio
+import logging
+from typing import List, Tuple
+from uuid import UUID
+
+from app.db.mongodb import chat_content
+from app.db.postgres import async_session
+from app.repositories.chat_repository import ChatRepository, branch_references
+
+logger = logging.getLogger(__name__)
+
+PROJECTION = {
+    "_id": 0,
+    "chat_id": 1,
+    "qa_pairs.response_id": 1,
+    "qa_pairs.branches": 1,
+}
+
+
+async def backfill(batch_size: int) -> int:
+    inserted = 0
+    batch: List[Tuple[UUID, UUID, str]] = []
+    async with async_session() as session:
+        chat_repo = ChatRepository(session)
+        query = {"qa_pairs.branches.0": {"$exists": True}}
+        async for document in chat_content.find(query, PROJECTION, batch_size=batch_size):
+            batch.extend(branch_references(UUID(document["chat_id"]), document))
+            if len(batch) >= batch_size:
+                inserted += await chat_repo.add_missing_branch_edges(batch)
+                batch = []
+        if batch:
+            inserted += await chat_repo.add_missing_branch_edges(batch)
+    return inserted
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    inserted = asyncio.run(backfill(args.batch_size))
+    logger.info("Backfilled %d branch edge(s)", inserted)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Fill the chat statistics counters for chats created before they existed.
+
+    python -m app.db.backfill_chat_stats [--batch-size 500]
+
+Reads each chat's content once from MongoDB and writes the counters to
+PostgreSQL in batches. Safe to re-run: counters are recomputed, not added.
+"""
+import argparse
+import asyncio
+import logging
+from typing import Any, Dict, List
+from uuid import UUID
+
+from sqlalchemy import update
+
+from app.db.mongodb import chat_content
+from app.db.postgres import async_session
+from app.models.chat import Chat
+from app.services.chat_service import message_size
+from app.utils.compression import decompress_text
+
+logger = logging.getLogger(__name__)
+
+PROJECTION = {
+    "_id": 0,
+    "chat_id": 1,
+    "qa_pairs.question": 1,
+    "qa_pairs.response": 1,
+    "qa_pairs.timestamp": 1,
+    "qa_pairs.branches": 1,
+}
+
+
+def chat_stats(document: Dict[str, Any]) -> Dict[str, Any]:
+    qa_pairs = document.get("qa_pairs", [])
+    return {
+        "id": UUID(document["chat_id"]),
+        "message_count": len(qa_pairs),
+        "branch_count": sum(len(qa_pair.get("branches", [])) for qa_pair in qa_pairs),
+        "bytes_stored": sum(
+            message_size(decompress_text(qa_pair["question"]), decompress_text(qa_pair["response"]))
+            for qa_pair in qa_pairs
+        ),
+        "last_message_at": qa_pairs[-1].get("timestamp") if qa_pairs else None,
+    }
+
+
+async def backfill(batch_size: int) -> int:
+    updated = 0
+    batch: List[Dict[str, Any]] = []
+    async with async_session() as session:
+        async for document in chat_content.find({}, PROJECTION, batch_size=batch_size):
+            batch.append(chat_stats(document))
+            if len(batch) >= batch_size:
+                await session.execute(update(Chat), batch)
+                await session.commit()
+                updated += len(batch)
+                batch = []
+        if batch:
+            await session.execute(update(Chat), batch)
+            await session.commit()
+            updated += len(batch)
+    return updated
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    updated = asyncio.run(backfill(args.batch_size))
+    logger.info("Backfilled statistics for %d chat(s)", updated)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+One-off MongoDB schema steps (indexes, collection options).
+
+    python -m app.db.mongo_migrations
+
+Each migration runs once; applied names are recorded in the
+``schema_migrations`` collection. Runs hold a lock document in the same
+collection, so workers booting together with ``DB_INIT_MODE=create`` apply
+each step once while the others wait; every step is also safe to repeat,
+should a run die between a step and its record. Run this alongside
+``alembic upgrade head`` when deploying, and start workers with
+``DB_INIT_MODE=skip`` so they do no DDL at boot.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, List, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import CollectionInvalid, DuplicateKeyError
+
+from app.core.config import settings
+from app.db.mongodb import db, chat_archive_index, chat_content
+
+logger = logging.getLogger(__name__)
+
+schema_migrations = db.schema_migrations
+
+# Lock document in schema_migrations; migration names never start with "_"
+LOCK_ID = "_lock"
+# A lock not refreshed for this long belongs to a run that died
+LOCK_SECONDS = 300
+LOCK_POLL_SECONDS = 0.5
+
+
+async def create_chat_content_indexes():
+    await chat_content.create_index("chat_id")
+    await chat_content.create_index([("qa_pairs.response_id", 1)])
+
+
+async def backfill_qa_count():
+    # Message counts are kept by $inc on every push; seed them for existing chats
+    await chat_content.update_many(
+        {"qa_count": {"$exists": False}},
+        [{"$set": {"qa_count": {"$size": "$qa_pairs"}}}]
+    )
+
+
+async def backfill_branch_log(batch_size: int = 500):
+    # Delta sync reads branch additions from branch_log; rebuild it from the
+    # branch references of existing chats (creation times are unknown)
+    batch = []
+    async for document in chat_content.find(
+        {"branch_log": {"$exists": False}},
+        {"_id": 1, "qa_pairs.response_id": 1, "qa_pairs.branches": 1}
+    ):
+        branch_log = [
+            {"response_id": qa_pair.get("response_id"), "branch_chat_id": branch_chat_id, "created_at": None}
+            for qa_pair in document.get("qa_pairs", [])
+            for branch_chat_id in qa_pair.get("branches", [])
+        ]
+        batch.append(UpdateOne(
+            {"_id": document["_id"], "branch_log": {"$exists": False}},
+            {"$set": {"branch_log": branch_log}}
+        ))
+        if len(batch) >= batch_size:
+            await chat_content.bulk_write(batch, ordered=False)
+            batch = []
+    if batch:
+        await chat_content.bulk_write(batch, ordered=False)
+
+
+async def create_audit_events_collection():
+    # Capped, so the log never outgrows AUDIT_LOG_MAX_BYTES; a collection
+    # already created by an uncapped insert is converted in place
+    try:
+        await db.create_collection("audit_events", capped=True, size=settings.AUDIT_LOG_MAX_BYTES)
+    except CollectionInvalid:
+        result = await db.command("listCollections", filter={"name": "audit_events"})
+        [collection] = result["cursor"]["firstBatch"]
+        if not collection.get("options", {}).get("capped"):
+            await db.command("convertToCapped", "audit_events", size=settings.AUDIT_LOG_MAX_BYTES)
+
+
+async def create_expiry_ttl_indexes():
+    # Retention: MongoDB deletes content (and archive entries) once expires_at
+    # passes; documents with a null expires_at are kept
+    await chat_content.create_index("expires_at", expireAfterSeconds=0)
+    await chat_archive_index.create_index("expires_at", expireAfterSeconds=0)
+
+
+# Append new migrations at the end; never reorder or rename applied ones
+MIGRATIONS: List[Tuple[str, Callable[[], Awaitable[None]]]] = [
+    ("0001_chat_content_indexes", create_chat_content_indexes),
+    ("0002_backfill_qa_count", backfill_qa_count),
+    ("0003_backfill_branch_log", backfill_branch_log),
+    ("0004_audit_events_collection", create_audit_events_collection),
+    ("0005_expiry_ttl_indexes", create_expiry_ttl_indexes),
+]
+
+
+async def _acquire_lock(owner: str) -> None:
+    """Wait until this run holds the migration lock."""
+    while True:
+        now = datetime.now(timezone.utc)
+        lock = {"owner": owner, "expires_at": now + timedelta(seconds=LOCK_SECONDS)}
+        try:
+            await schema_migrations.insert_one({"_id": LOCK_ID, **lock})
+            return
+        except DuplicateKeyError:
+            pass
+        # Take over a lock whose run died
+        result = await schema_migrations.update_one(
+            {"_id": LOCK_ID, "expires_at": {"$lt": now}}, {"$set": lock}
+        )
+        if result.modified_count:
+            return
+        await asyncio.sleep(LOCK_POLL_SECONDS)
+
+
+async def _refresh_lock(owner: str) -> None:
+    await schema_migrations.update_one(
+        {"_id": LOCK_ID, "owner": owner},
+        {"$set": {"expires_at": datetime.now(timezone.utc) + timedelta(seconds=LOCK_SECONDS)}}
+    )
+
+
+async def run_migrations() -> List[str]:
+    """Apply pending migrations in order and return their names."""
+    owner = uuid.uuid4().hex
+    await _acquire_lock(owner)
+    try:
+        # Read under the lock: a run that held it before may have applied some
+        applied = {doc["_id"] async for doc in schema_migrations.find({}, {"_id": 1})}
+        newly_applied = []
+        for name, migration in MIGRATIONS:
+            if name in applied:
+                continue
+            logger.info("Applying MongoDB migration %s", name)
+            await migration()
+            await schema_migrations.update_one(
+                {"_id": name}, {"$set": {"applied_at": datetime.now(timezone.utc)}}, upsert=True
+            )
+            newly_applied.append(name)
+            await _refresh_lock(owner)
+        return newly_applied
+    finally:
+        await schema_migrations.delete_one({"_id": LOCK_ID, "owner": owner})
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    applied = asyncio.run(run_migrations())
+    logger.info("Applied %d MongoDB migration(s)", len(applied))
@@ -1,21 +1,36 @@
 import ssl
 import motor.motor_asyncio
 from app.core.config import settings
+from app.core.metrics import DATASTORE_HOOKS_ENABLED, MongoCommandListener
 
 
+# connect=False defers connecting (and PyMongo's monitor threads) until the
+# first operation, which happens inside each worker's lifespan
 client = motor.motor_asyncio.AsyncIOMotorClient(
     settings.MONGODB_URL,
+    maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+    connect=False,
+    event_listeners=[MongoCommandListener()] if DATASTORE_HOOKS_ENABLED else [],
 )
 db = client[settings.MONGODB_DB]
 
 # Collections
 chat_content = db.chat_content
+audit_events = db.audit_events
+# Where archived chats live in the segment files, keyed by chat ID
+chat_archive_index = db.chat_archive
 
 
 async def init_mongodb():
-    # Create indexes if needed
-    await chat_content.create_index("chat_id")
-    await chat_content.create_index([("qa_pairs.response_id", 1)])
+    # Create indexes if needed (development boot; production runs
+    # python -m app.db.mongo_migrations once per deploy)
+    from app.db.mongo_migrations import run_migrations
+
+    await run_migrations()
+
+
+async def close_mongodb():
+    client.close()
 
 
 async def get_mongodb():
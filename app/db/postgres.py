@@ -1,21 +1,200 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import asyncio
+import itertools
+import logging
+import time
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.exc import InterfaceError, OperationalError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlmodel import SQLModel
 
 from app.core.config import settings
+from app.core.metrics import DATASTORE_HOOKS_ENABLED, POSTGRES_READS, POSTGRES_REPLICA_HEALTHY, instrument_engine
+
+logger = logging.getLogger(__name__)
 
+# The engine opens no connections until first use, so each worker process
+# builds its own pool after it has started
 engine = create_async_engine(
-    settings.SQLALCHEMY_DATABASE_URI, 
+    settings.SQLALCHEMY_DATABASE_URI,
     echo=settings.DEBUG,
-    future=True
+    future=True,
+    pool_size=settings.POSTGRES_POOL_SIZE,
+    max_overflow=settings.POSTGRES_MAX_OVERFLOW,
+    pool_pre_ping=True
 )
+if DATASTORE_HOOKS_ENABLED:
+    instrument_engine(engine)
 
 async_session = sessionmaker(
-    engine, 
-    class_=AsyncSession, 
+    engine,
+    class_=AsyncSession,
     expire_on_commit=False
 )
 
+# Replication lag in seconds; 0 when the replica has replayed everything it
+# received (pg_last_xact_replay_timestamp alone grows while the primary is idle)
+REPLICATION_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+PIN_KEY_PREFIX = "pg-pin:"
+
+
+class ReplicaPool:
+    """
+    Read-only engines for the configured replicas.
+
+    Each replica is checked every ``interval`` seconds: it must answer and,
+    on PostgreSQL, lag at most ``max_lag`` seconds behind the primary. Reads
+    go round-robin to the healthy ones; ``pick`` returns None when there are
+    none, and callers fall back to the primary. A replica whose connection
+    fails mid-request is skipped until its next good check.
+    """
+
+    def __init__(self, engines: List[AsyncEngine], interval: float, max_lag: float):
+        self.engines = engines
+        self.interval = interval
+        self.max_lag = max_lag
+        self.healthy: List[AsyncEngine] = []
+        self._sessions = {
+            replica: sessionmaker(replica, class_=AsyncSession, expire_on_commit=False)
+            for replica in engines
+        }
+        self._next = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    def pick(self) -> Optional[AsyncEngine]:
+        healthy = self.healthy
+        if not healthy:
+            return None
+        return healthy[next(self._next) % len(healthy)]
+
+    def session(self, replica: AsyncEngine) -> AsyncSession:
+        return self._sessions[replica]()
+
+    def mark_down(self, replica: AsyncEngine) -> None:
+        if replica in self.healthy:
+            logger.warning("Read replica %d failed; reading from the others until it recovers",
+                           self.engines.index(replica))
+            self.healthy = [other for other in self.healthy if other is not replica]
+            POSTGRES_REPLICA_HEALTHY.labels(str(self.engines.index(replica))).set(0)
+
+    async def check(self) -> None:
+        results = await asyncio.gather(*(self._check(replica) for replica in self.engines))
+        for index, ok in enumerate(results):
+            POSTGRES_REPLICA_HEALTHY.labels(str(index)).set(1 if ok else 0)
+        self.healthy = [replica for replica, ok in zip(self.engines, results) if ok]
+
+    async def _check(self, replica: AsyncEngine) -> bool:
+        try:
+            async with asyncio.timeout(self.interval):
+                async with replica.connect() as conn:
+                    if replica.dialect.name != "postgresql":
+                        await conn.execute(text("SELECT 1"))
+                        return True
+                    lag = await conn.scalar(REPLICATION_LAG_QUERY)
+        except (SQLAlchemyError, OSError, TimeoutError) as exc:
+            logger.debug("Read replica health check failed: %s", exc)
+            return False
+        # NULL: not a standby (or nothing replayed yet), so nothing to lag behind
+        return lag is None or float(lag) <= self.max_lag
+
+    async def start(self) -> None:
+        """Check the replicas once, then keep checking them in the background."""
+        await self.check()
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception:
+                logger.exception("Read replica health checks failed")
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for replica in self.engines:
+            await replica.dispose()
+
+
+def _create_replica_pool() -> Optional[ReplicaPool]:
+    uris = [uri.strip() for uri in settings.POSTGRES_REPLICA_URIS.split(",") if uri.strip()]
+    if not uris:
+        return None
+    engines = []
+    for uri in uris:
+        replica = create_async_engine(
+            uri,
+            echo=settings.DEBUG,
+            pool_size=settings.POSTGRES_REPLICA_POOL_SIZE,
+            max_overflow=settings.POSTGRES_MAX_OVERFLOW,
+            pool_pre_ping=True
+        )
+        if DATASTORE_HOOKS_ENABLED:
+            instrument_engine(replica)
+        engines.append(replica)
+    return ReplicaPool(
+        engines,
+        interval=settings.POSTGRES_REPLICA_CHECK_INTERVAL_SECONDS,
+        max_lag=settings.POSTGRES_REPLICA_MAX_LAG_SECONDS,
+    )
+
+
+replica_pool = _create_replica_pool()
+
+# Users pinned to the primary by this worker, with the monotonic time the pin ends
+_local_pins: Dict[UUID, float] = {}
+
+
+async def pin_to_primary(user_id: UUID) -> None:
+    """
+    Send the user's reads to the primary for the read-your-writes window.
+
+    Called before a write starts, so reads issued after it completes can't
+    reach a replica that hasn't replayed it yet. Pins are shared through Redis
+    so they hold on every worker.
+    """
+    if replica_pool is None:
+        return
+    from redis.exceptions import RedisError
+
+    from app.db.redis import get_redis
+
+    window = settings.POSTGRES_READ_YOUR_WRITES_SECONDS
+    now = time.monotonic()
+    if len(_local_pins) > 1024:
+        for pinned, until in list(_local_pins.items()):
+            if until <= now:
+                del _local_pins[pinned]
+    _local_pins[user_id] = now + window
+    try:
+        await get_redis().set(f"{PIN_KEY_PREFIX}{user_id}", 1, px=int(window * 1000))
+    except RedisError as exc:
+        logger.warning("Read-your-writes pin failed: %s", exc)
+
+
+async def is_pinned_to_primary(user_id: UUID) -> bool:
+    if _local_pins.get(user_id, 0) > time.monotonic():
+        return True
+    from redis.exceptions import RedisError
+
+    from app.db.redis import get_redis
+
+    try:
+        return bool(await get_redis().exists(f"{PIN_KEY_PREFIX}{user_id}"))
+    except RedisError as exc:
+        # Without the shared pins a replica could serve stale reads
+        logger.warning("Read-your-writes pin lookup failed: %s", exc)
+        return True
+
 
 async def init_db():
     async with engine.begin() as conn:
@@ -23,6 +202,17 @@ async def init_db():
         await conn.run_sync(SQLModel.metadata.create_all)
 
 
+async def start_replicas():
+    if replica_pool is not None:
+        await replica_pool.start()
+
+
+async def close_db():
+    if replica_pool is not None:
+        await replica_pool.close()
+    await engine.dispose()
+
+
 async def get_session() -> AsyncSession:
     async with async_session() as session:
         try:
@@ -31,4 +221,36 @@ async def get_session() -> AsyncSession:
             await session.rollback()
             raise
         finally:
-            await session.close() 
\ No newline at end of file
+            await session.close()
+
+
+async def get_read_session(user_id: Optional[UUID] = None) -> AsyncSession:
+    """
+    Session for read-only work: a healthy replica when replicas are
+    configured, otherwise (or while ``user_id`` is pinned) the primary.
+    """
+    replica = None
+    if replica_pool is not None:
+        if user_id is not None and await is_pinned_to_primary(user_id):
+            POSTGRES_READS.labels("pinned").inc()
+        else:
+            replica = replica_pool.pick()
+            POSTGRES_READS.labels("replica" if replica is not None else "fallback").inc()
+
+    if replica is None:
+        async for session in get_session():
+            yield session
+        return
+
+    async with replica_pool.session(replica) as session:
+        try:
+            yield session
+        except (OperationalError, InterfaceError):
+            replica_pool.mark_down(replica)
+            await session.rollback()
+            raise
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
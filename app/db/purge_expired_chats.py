@@ -0,0 +1,170 @@
+"""
+Delete the chats whose retention period has run out.
+
+    python -m app.db.purge_expired_chats [--batch-size 200] [--pause 0.5]
+    python -m app.db.purge_expired_chats --restamp
+
+A chat expires RETENTION_DAYS after its last message (or its creation, if
+it has none), or after its account's users.retention_days when
+RETENTION_ACCOUNT_OVERRIDES is set. That is the same clock as the
+expires_at stamped on the chat's content, which MongoDB drops on its own
+through a TTL index; this removes the PostgreSQL rows (chat, conversations
+and branch edges) and any content the TTL monitor has not reached yet.
+
+Chats are deleted a small batch per transaction, skipping rows locked by
+live requests, with a pause in between so the purge never holds locks on
+chats for long. Safe to run repeatedly, e.g. from cron.
+
+expires_at is computed when content is written, so after changing
+RETENTION_DAYS or an account's retention_days run once with --restamp:
+it recomputes expires_at of every chat's content from the current
+settings, so MongoDB and the purge agree again.
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from uuid import UUID
+
+from pymongo import UpdateOne
+from sqlalchemy import delete, func, select, update
+
+from app.core.config import settings
+from app.db.mongodb import chat_archive_index, chat_content
+from app.db.postgres import async_session
+from app.models.chat import BranchEdge, Chat, Conversation
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Retention counts from here, served by ix_chats_last_activity_at
+LAST_ACTIVITY = func.coalesce(Chat.last_message_at, Chat.created_at)
+
+
+async def retention_periods(session) -> List[Optional[int]]:
+    """
+    The retention periods in use: None stands for the global RETENTION_DAYS,
+    a number for accounts that override it.
+    """
+    periods: List[Optional[int]] = [None] if settings.RETENTION_DAYS > 0 else []
+    if settings.RETENTION_ACCOUNT_OVERRIDES:
+        result = await session.execute(
+            select(User.retention_days).where(User.retention_days > 0).distinct()
+        )
+        periods.extend(sorted(result.scalars()))
+    return periods
+
+
+async def _expired_batch(session, days: Optional[int], batch_size: int) -> List[UUID]:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days or settings.RETENTION_DAYS)
+    query = select(Chat.id).where(LAST_ACTIVITY < cutoff)
+    if settings.RETENTION_ACCOUNT_OVERRIDES:
+        query = query.join(User, User.id == Chat.account_id).where(
+            User.retention_days.is_(None) if days is None else User.retention_days == days
+        )
+    # Rows locked by in-flight writes are left for the next batch or run
+    query = query.limit(batch_size).with_for_update(of=Chat, skip_locked=True)
+    result = await session.execute(query)
+    return list(result.scalars())
+
+
+async def _delete(session, chat_ids: List[UUID]) -> None:
+    conversations = select(Conversation.id).where(Conversation.chat_id.in_(chat_ids))
+    await session.execute(
+        update(Conversation).where(Conversation.parent_id.in_(conversations)).values(parent_id=None)
+    )
+    await session.execute(delete(Conversation).where(Conversation.chat_id.in_(chat_ids)))
+    await session.execute(
+        delete(BranchEdge).where(
+            BranchEdge.branch_chat_id.in_(chat_ids) | BranchEdge.parent_chat_id.in_(chat_ids)
+        )
+    )
+    await session.execute(delete(Chat).where(Chat.id.in_(chat_ids)))
+    await session.commit()
+
+
+async def purge(batch_size: int, pause: float) -> int:
+    purged = 0
+    async with async_session() as session:
+        for days in await retention_periods(session):
+            while True:
+                chat_ids = await _expired_batch(session, days, batch_size)
+                if not chat_ids:
+                    await session.rollback()
+                    break
+                await _delete(session, chat_ids)
+                # Content the TTL monitor hasn't removed yet, archived or not
+                keys = [str(chat_id) for chat_id in chat_ids]
+                await chat_content.delete_many({"chat_id": {"$in": keys}})
+                await chat_archive_index.delete_many({"_id": {"$in": keys}})
+                purged += len(chat_ids)
+                if len(chat_ids) < batch_size:
+                    break
+                await asyncio.sleep(pause)
+    return purged
+
+
+def _expires_at(last_activity: datetime, account_days: Optional[int]) -> Optional[datetime]:
+    days = settings.RETENTION_DAYS
+    if settings.RETENTION_ACCOUNT_OVERRIDES and account_days is not None:
+        days = account_days
+    if days <= 0:
+        return None
+    if last_activity.tzinfo is None:
+        last_activity = last_activity.replace(tzinfo=timezone.utc)
+    return last_activity + timedelta(days=days)
+
+
+async def restamp(batch_size: int) -> int:
+    """Recompute expires_at of every chat's content from the current retention settings."""
+    restamped = 0
+    after: Optional[UUID] = None
+    async with async_session() as session:
+        while True:
+            query = (
+                select(Chat.id, LAST_ACTIVITY, User.retention_days)
+                .join(User, User.id == Chat.account_id)
+                .order_by(Chat.id)
+                .limit(batch_size)
+            )
+            if after is not None:
+                query = query.where(Chat.id > after)
+            rows = (await session.execute(query)).all()
+            await session.rollback()
+            if not rows:
+                break
+
+            updates = [
+                (str(chat_id), _expires_at(last_activity, account_days))
+                for chat_id, last_activity, account_days in rows
+            ]
+            await chat_content.bulk_write([
+                UpdateOne({"chat_id": chat_id}, {"$set": {"expires_at": expires_at}}) for chat_id, expires_at in updates
+            ], ordered=False)
+            await chat_archive_index.bulk_write([
+                UpdateOne({"_id": chat_id}, {"$set": {"expires_at": expires_at}}) for chat_id, expires_at in updates
+            ], ordered=False)
+            restamped += len(rows)
+            after = rows[-1][0]
+    return restamped
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--pause", type=float, default=0.5, help="seconds to wait between batches")
+    parser.add_argument("--restamp", action="store_true", help="recompute expires_at instead of purging")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.restamp:
+        restamped = asyncio.run(restamp(args.batch_size))
+        logger.info("Restamped the content of %d chat(s)", restamped)
+        return
+    purged = asyncio.run(purge(args.batch_size, args.pause))
+    logger.info("Purged %d expired chat(s)", purged)
+
+
+if __name__ == "__main__":
+    main()
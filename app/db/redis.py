@@ -0,0 +1,37 @@
+from typing import TYPE_CHECKING, Optional
+
+from app.core.config import settings
+from app.core.metrics import DATASTORE_HOOKS_ENABLED, instrument_redis
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+redis_client: Optional["Redis"] = None
+
+
+def get_redis() -> "Redis":
+    """
+    Shared Redis client for this worker, created on first use.
+
+    The client connects lazily, so creating it is cheap; importing redis is
+    not, which is why it is deferred until something actually needs Redis.
+    """
+    global redis_client
+    if redis_client is None:
+        from redis import asyncio as aioredis
+
+        redis_client = aioredis.from_url(
+            f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}",
+            encoding="utf8",
+            decode_responses=True
+        )
+        if DATASTORE_HOOKS_ENABLED:
+            instrument_redis(redis_client)
+    return redis_client
+
+
+async def close_redis():
+    global redis_client
+    if redis_client is not None:
+        await redis_client.aclose()
+        redis_client = None
@@ -3,15 +3,22 @@ from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
-from fastapi_cache import FastAPICache
-from fastapi_cache.backends.redis import RedisBackend
-from redis import asyncio as aioredis
 from contextlib import asynccontextmanager
 
 from app.api.v1.router import api_router
 from app.core.config import settings
-from app.db.postgres import init_db
-from app.db.mongodb import init_mongodb
+from app.core.http_compression import CompressionMiddleware
+from app.core.idempotency import IdempotencyMiddleware
+from app.core.load_shedding import LoadSheddingMiddleware
+from app.core.loop_monitor import loop_lag_probe, loop_watchdog
+from app.core.metrics import PrometheusMiddleware, metrics_endpoint
+from app.core.responses import ORJSONResponse
+from app.core.timing import ServerTimingMiddleware
+from app.db.postgres import init_db, close_db, start_replicas
+from app.db.mongodb import init_mongodb, close_mongodb
+from app.db.redis import close_redis
+from app.services.audit import audit_log
+from app.services.chat_events import chat_event_bus
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,30 +27,73 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     # Startup logic
     # Initialize databases
-    await init_db()
-    await init_mongodb()
+    if settings.DB_INIT_MODE == "create":
+        await init_db()
+        await init_mongodb()
+
+    # Read replicas (if configured) are checked before taking traffic
+    await start_replicas()
+    if settings.AUDIT_LOG_ENABLED:
+        audit_log.start()
+    if settings.LOAD_SHEDDING_ENABLED or settings.LOOP_WATCHDOG_ENABLED:
+        loop_lag_probe.start()
+    if settings.LOOP_WATCHDOG_ENABLED:
+        loop_watchdog.start()
     
-    # Initialize Redis cache
-    redis = aioredis.from_url(
-        f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}", 
-        encoding="utf8", 
-        decode_responses=True
-    )
-    FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache")
+    # Redis and the response cache are set up on first use
+    # (app.db.redis.get_redis, app.utils.helpers.cached)
     
     logger.info("Application startup complete")
     
     yield
     
     # Shutdown logic
+    loop_watchdog.stop()
+    await loop_lag_probe.close()
+    await chat_event_bus.close()
+    # Write queued audit events while MongoDB is still open
+    await audit_log.close()
+    await close_redis()
+    await close_mongodb()
+    await close_db()
     logger.info("Application shutdown")
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
+# Replay responses for retried requests carrying an Idempotency-Key
+if settings.IDEMPOTENCY_ENABLED:
+    app.add_middleware(
+        IdempotencyMiddleware,
+        paths=[
+            f"{settings.API_V1_STR}/chats/create-chat",
+            f"{settings.API_V1_STR}/messages/add-message",
+            f"{settings.API_V1_STR}/branches/create-branch",
+            f"{settings.API_V1_STR}/branches/create-branches",
+        ],
+    )
+
+# Shed low-priority requests while this worker is overloaded
+if settings.LOAD_SHEDDING_ENABLED:
+    app.add_middleware(
+        LoadSheddingMiddleware,
+        probe=loop_lag_probe,
+        low_priority_paths=[
+            f"{settings.API_V1_STR}/branches/get-branch-tree",
+            f"{settings.API_V1_STR}/branches/diff-branches",
+        ],
+        # Event streams stay open for minutes and would always count as load
+        untracked_paths=[f"{settings.API_V1_STR}/chats/chat-events", "/health", "/metrics"],
+        max_loop_lag=settings.LOAD_SHEDDING_MAX_LOOP_LAG_MS / 1000,
+        max_in_flight=settings.LOAD_SHEDDING_MAX_IN_FLIGHT,
+        retry_after=settings.LOAD_SHEDDING_RETRY_AFTER_SECONDS,
+        max_retry_after=settings.LOAD_SHEDDING_MAX_RETRY_AFTER_SECONDS,
+    )
+
 # Set up CORS
 if settings.BACKEND_CORS_ORIGINS:
     app.add_middleware(
@@ -54,6 +104,24 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
+# Compress large responses (brotli or gzip, as the client accepts)
+if settings.HTTP_COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.HTTP_COMPRESSION_MIN_BYTES,
+        gzip_level=settings.HTTP_COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.HTTP_COMPRESSION_BROTLI_QUALITY,
+    )
+
+# Record request metrics
+if settings.METRICS_ENABLED:
+    app.add_middleware(PrometheusMiddleware)
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+# Report per-request backend timings
+if settings.SERVER_TIMING_ENABLED:
+    app.add_middleware(ServerTimingMiddleware)
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -1,5 +1,7 @@
+from datetime import datetime, timezone
 from enum import Enum
 from typing import Optional, List
+from sqlalchemy import BigInteger, DateTime, Index, text, true
 from sqlmodel import Field, SQLModel, Relationship
 import uuid
 
@@ -19,8 +21,24 @@ class ChatBase(SQLModel):
 
 class Chat(ChatBase, BaseModel, table=True):
     __tablename__ = "chats"
+    __table_args__ = (
+        # A user's chats ordered by recent activity
+        Index("ix_chats_account_id_updated_at", "account_id", "updated_at"),
+        # Expired chats for the retention purge, by the same clock as the
+        # expires_at stamped on their content: the last message, else creation
+        Index("ix_chats_last_activity_at", text("coalesce(last_message_at, created_at)")),
+    )
     
     account_id: uuid.UUID = Field(foreign_key="users.id", index=True)
+    # Per-chat opt-out of the AI response cache
+    ai_cache_enabled: bool = Field(default=True, sa_column_kwargs={"server_default": true()})
+
+    # Counters maintained by add_message / create_branch with atomic increments,
+    # so listings and stats never have to load the chat content
+    message_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    branch_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    bytes_stored: int = Field(default=0, sa_type=BigInteger, sa_column_kwargs={"server_default": "0"})
+    last_message_at: Optional[datetime] = Field(default=None, sa_type=DateTime(timezone=True))
     
     # Relationships
     conversations: List["Conversation"] = Relationship(back_populates="chat")
@@ -36,7 +54,7 @@ class Conversation(ConversationBase, BaseModel, table=True):
     
     chat_id: uuid.UUID = Field(foreign_key="chats.id", index=True)
     account_id: uuid.UUID = Field(foreign_key="users.id", index=True)
-    parent_id: Optional[uuid.UUID] = Field(default=None, foreign_key="conversations.id", nullable=True)
+    parent_id: Optional[uuid.UUID] = Field(default=None, foreign_key="conversations.id", nullable=True, index=True)
     
     # Relationships
     chat: Chat = Relationship(back_populates="conversations")
@@ -48,6 +66,26 @@ class Conversation(ConversationBase, BaseModel, table=True):
     )
 
 
+class BranchEdge(SQLModel, table=True):
+    """
+    One row per branch, denormalised from the parent's content so branch
+    listings and membership checks are single indexed lookups.
+    """
+    __tablename__ = "branch_edges"
+    __table_args__ = (
+        # A chat's branches in creation order
+        Index("ix_branch_edges_parent_chat_id_created_at", "parent_chat_id", "created_at"),
+    )
+
+    branch_chat_id: uuid.UUID = Field(primary_key=True)
+    parent_chat_id: uuid.UUID
+    response_id: str
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_type=DateTime(timezone=True)
+    )
+
+
 class ChatCreate(ChatBase):
     pass
 
@@ -55,6 +93,7 @@ class ChatCreate(ChatBase):
 class ChatUpdate(SQLModel):
     name: Optional[str] = None
     active: Optional[bool] = None
+    ai_cache_enabled: Optional[bool] = None
 
 
 class ConversationCreate(ConversationBase):
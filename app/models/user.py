@@ -17,6 +17,9 @@ class User(UserBase, BaseModel, table=True):
     __tablename__ = "users"
     
     hashed_password: str
+    # Days chat content is kept after its last message; None uses RETENTION_DAYS,
+    # 0 keeps it forever (honoured with RETENTION_ACCOUNT_OVERRIDES)
+    retention_days: Optional[int] = Field(default=None, nullable=True)
 
 
 class UserCreate(UserBase):
@@ -32,4 +35,5 @@ class UserUpdate(SQLModel):
     username: Optional[str] = None
     password: Optional[str] = None
     is_active: Optional[bool] = None
-    is_superuser: Optional[bool] = None 
\ No newline at end of file
+    is_superuser: Optional[bool] = None
+    retention_days: Optional[int] = None 
\ No newline at end of file
@@ -2,12 +2,70 @@ from datetime import datetime, timezone
 from typing import List, Optional, Dict, Any, Tuple
 from uuid import UUID
 
-from sqlalchemy import select, update, delete
+from pymongo import UpdateOne
+from sqlalchemy import case, select, update, delete
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.models.chat import Chat, Conversation
-from app.db.mongodb import chat_content
+from app.models.chat import BranchEdge, Chat, ChatType, Conversation
+from app.db.mongodb import chat_archive_index, chat_content
+from app.utils.compression import compress_message, decompress_message
+
+# Fields served by get-chat; everything else (``_id``, message metadata) stays in MongoDB
+CHAT_CONTENT_PROJECTION = {
+    "_id": 0,
+    "qa_pairs.question": 1,
+    "qa_pairs.response": 1,
+    "qa_pairs.response_id": 1,
+    "qa_pairs.timestamp": 1,
+    "qa_pairs.branches": 1,
+    "active_branch_id": 1,
+}
+
+# Fields needed to walk branch references
+BRANCH_REFERENCES_PROJECTION = {
+    "_id": 0,
+    "qa_pairs.response_id": 1,
+    "qa_pairs.branches": 1,
+}
+
+# Chat-level fields used to assemble AI context; turns are sliced server-side
+CONTEXT_FIELDS = {
+    "_id": 0,
+    "qa_count": 1,
+    "summary": 1,
+    "summary_upto": 1,
+    "parent_chat_id": 1,
+    "parent_response_id": 1,
+    "parent_turn_index": 1,
+}
+
+# Where a chat sits in its branch tree
+LINEAGE_FIELDS = {
+    "_id": 0,
+    "chat_id": 1,
+    "qa_count": 1,
+    "parent_chat_id": 1,
+    "parent_response_id": 1,
+    "parent_turn_index": 1,
+}
+
+
+def branch_references(parent_chat_id: UUID, document: Dict[str, Any]) -> List[Tuple[UUID, UUID, str]]:
+    """(branch_chat_id, parent_chat_id, response_id) of every branch referenced by a chat's content."""
+    return [
+        (UUID(branch_chat_id), parent_chat_id, qa_pair["response_id"])
+        for qa_pair in document.get("qa_pairs", [])
+        for branch_chat_id in qa_pair.get("branches", [])
+    ]
+
+
+def _decompress_pairs(document: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if document:
+        for qa_pair in document.get("qa_pairs", []):
+            decompress_message(qa_pair)
+    return document
 
 
 class ChatRepository:
@@ -46,16 +104,141 @@ class ChatRepository:
         return result.scalars().first()
 
     async def delete_chat(self, chat_id: UUID) -> bool:
+        # Drop the chat's edges, as a branch and as a parent, in the same transaction
+        await self.db_session.execute(
+            delete(BranchEdge).where((BranchEdge.branch_chat_id == chat_id) | (BranchEdge.parent_chat_id == chat_id))
+        )
         query = delete(Chat).where(Chat.id == chat_id)
         result = await self.db_session.execute(query)
         await self.db_session.commit()
         return result.rowcount > 0
 
-    async def get_user_chats(self, account_id: UUID) -> List[Chat]:
-        query = select(Chat).where(Chat.account_id == account_id)
+    async def get_user_chats(self, account_id: UUID, limit: Optional[int] = None, offset: int = 0) -> List[Chat]:
+        # Most recently active first, served by ix_chats_account_id_updated_at
+        query = (
+            select(Chat)
+            .where(Chat.account_id == account_id)
+            .order_by(Chat.updated_at.desc())
+            .offset(offset)
+            .limit(limit)
+        )
         result = await self.db_session.execute(query)
         return result.scalars().all()
 
+    async def record_branch(
+        self,
+        parent_chat_id: UUID,
+        branch_chat_id: UUID,
+        response_id: str,
+        copied_bytes: int,
+        copied_at: datetime
+    ) -> None:
+        """
+        Add the branch edge, and count the new branch on the parent and the
+        copied message on the branch in one statement, in one transaction.
+        """
+        self.db_session.add(BranchEdge(
+            branch_chat_id=branch_chat_id,
+            parent_chat_id=parent_chat_id,
+            response_id=response_id,
+        ))
+        is_branch = Chat.id == branch_chat_id
+        query = (
+            update(Chat)
+            .where(Chat.id.in_([parent_chat_id, branch_chat_id]))
+            .values(
+                branch_count=Chat.branch_count + case((is_branch, 0), else_=1),
+                message_count=Chat.message_count + case((is_branch, 1), else_=0),
+                bytes_stored=Chat.bytes_stored + case((is_branch, copied_bytes), else_=0),
+                last_message_at=case((is_branch, copied_at), else_=Chat.last_message_at),
+            )
+        )
+        await self.db_session.execute(query)
+        await self.db_session.commit()
+
+    async def create_branches(self, parent_chat_id: UUID, account_id: UUID, branches: List[Dict[str, Any]]) -> List[Chat]:
+        """
+        Insert branch chats, their root conversations and edges and count them
+        on the parent, in one transaction. Each item gives the branch ``name``,
+        the parent ``response_id`` it forks from and the ``copied_bytes`` /
+        ``copied_at`` of the message copied into it.
+        """
+        chats = [
+            Chat(
+                account_id=account_id,
+                name=branch["name"],
+                chat_type=ChatType.BRANCH,
+                message_count=1,
+                bytes_stored=branch["copied_bytes"],
+                last_message_at=branch["copied_at"],
+            )
+            for branch in branches
+        ]
+        self.db_session.add_all(chats)
+        self.db_session.add_all([
+            Conversation(chat_id=chat.id, account_id=account_id, name=chat.name, parent_id=None)
+            for chat in chats
+        ])
+        self.db_session.add_all([
+            BranchEdge(branch_chat_id=chat.id, parent_chat_id=parent_chat_id, response_id=branch["response_id"])
+            for chat, branch in zip(chats, branches)
+        ])
+        await self.db_session.execute(
+            update(Chat)
+            .where(Chat.id == parent_chat_id)
+            .values(branch_count=Chat.branch_count + len(chats))
+        )
+        await self.db_session.commit()
+        return chats
+
+    async def get_branch_edges(self, parent_chat_id: UUID) -> List[Tuple[BranchEdge, Chat]]:
+        """A chat's branches with their edges, oldest first, from ix_branch_edges_parent_chat_id_created_at."""
+        query = (
+            select(BranchEdge, Chat)
+            .join(Chat, Chat.id == BranchEdge.branch_chat_id)
+            .where(BranchEdge.parent_chat_id == parent_chat_id)
+            .order_by(BranchEdge.created_at)
+        )
+        result = await self.db_session.execute(query)
+        return [(edge, chat) for edge, chat in result.all()]
+
+    async def add_missing_branch_edges(self, references: List[Tuple[UUID, UUID, str]]) -> int:
+        """
+        Insert the edges of branches created before branch_edges existed,
+        dated with the branch chat's creation time. Existing edges and
+        branches whose chat was deleted are skipped; returns the number added.
+        """
+        branch_ids = [reference[0] for reference in references]
+        existing = set((await self.db_session.execute(
+            select(BranchEdge.branch_chat_id).where(BranchEdge.branch_chat_id.in_(branch_ids))
+        )).scalars())
+        created = dict((await self.db_session.execute(
+            select(Chat.id, Chat.created_at).where(Chat.id.in_(branch_ids))
+        )).all())
+        edges = [
+            BranchEdge(
+                branch_chat_id=branch_chat_id,
+                parent_chat_id=parent_chat_id,
+                response_id=response_id,
+                created_at=created[branch_chat_id],
+            )
+            for branch_chat_id, parent_chat_id, response_id in references
+            if branch_chat_id in created and branch_chat_id not in existing
+        ]
+        self.db_session.add_all(edges)
+        try:
+            await self.db_session.commit()
+        except IntegrityError:
+            # A concurrent request or the backfill added some of them first
+            await self.db_session.rollback()
+            return await self.add_missing_branch_edges(references)
+        return len(edges)
+
+    async def has_branch(self, parent_chat_id: UUID, branch_chat_id: UUID) -> bool:
+        query = select(BranchEdge.parent_chat_id).where(BranchEdge.branch_chat_id == branch_chat_id)
+        result = await self.db_session.execute(query)
+        return result.scalar() == parent_chat_id
+
     async def create_conversation(self, chat_id: UUID, account_id: UUID, name: str, parent_id: Optional[UUID] = None) -> Conversation:
         conversation = Conversation(
             chat_id=chat_id,
@@ -90,23 +273,41 @@ class ChatRepository:
 
 class ChatContentRepository:
     @staticmethod
-    async def create_chat_content(chat_id: UUID):
-        await chat_content.insert_one({
+    async def create_chat_content(
+        chat_id: UUID,
+        lineage: Optional[Dict[str, Any]] = None,
+        expires_at: Optional[datetime] = None
+    ):
+        # expires_at drives the TTL index; null keeps the document
+        document = {
             "chat_id": str(chat_id),
-            "qa_pairs": []
-        })
+            "qa_pairs": [],
+            "qa_count": 0,
+            "branch_log": [],
+            "expires_at": expires_at
+        }
+        if lineage:
+            # Branches remember where they forked so context can follow ancestry
+            document.update(lineage)
+        await chat_content.insert_one(document)
 
     @staticmethod
-    async def get_chat_content(chat_id: UUID):
-        return await chat_content.find_one({"chat_id": str(chat_id)})
+    async def get_chat_content(chat_id: UUID, projection: Optional[Dict[str, Any]] = None):
+        document = await chat_content.find_one(
+            {"chat_id": str(chat_id)},
+            projection or CHAT_CONTENT_PROJECTION
+        )
+        return _decompress_pairs(document)
 
 
+    @staticmethod
     async def add_message(
     chat_id: UUID,
     question: str,
     response: str,
     response_id: str,
-    metadata: Optional[Dict[str, Any]] = None
+    metadata: Optional[Dict[str, Any]] = None,
+    expires_at: Optional[datetime] = None
 ):
         message_data = {
             "question": question,
@@ -119,38 +320,233 @@ class ChatContentRepository:
         if metadata:
             message_data["metadata"] = metadata
 
+        # Long bodies are stored zstd-compressed; reads decompress them
         result = await chat_content.update_one(
             {"chat_id": str(chat_id)},                     
-            {"$push": {"qa_pairs": message_data}},         
+            {
+                "$push": {"qa_pairs": compress_message(dict(message_data))},
+                "$inc": {"qa_count": 1},
+                # Retention counts from the latest message
+                "$set": {"expires_at": expires_at},
+            },
             # upsert=True                                    
         )
-        return result
+        if not result.matched_count:
+            # No content document, e.g. the chat is archived
+            return None
+        return message_data
 
 
     @staticmethod
     async def add_branch_to_message(chat_id: UUID, response_id: str, branch_chat_id: UUID):
+        # branch_log records branches in creation order for delta sync
         await chat_content.update_one(
-            {"chat_id": str(chat_id), "qa_pairs.response_id": response_id},
-            {"$push": {"qa_pairs.$.branches": str(branch_chat_id)}}
+            {"chat_id": str(chat_id), "qa_pairs": {"$elemMatch": {"response_id": response_id}}},
+            {"$push": {
+                "qa_pairs.$.branches": str(branch_chat_id),
+                "branch_log": {
+                    "response_id": response_id,
+                    "branch_chat_id": str(branch_chat_id),
+                    "created_at": datetime.now(timezone.utc),
+                },
+            }}
         )
 
     
+    @staticmethod
+    async def create_branch_contents(
+        parent_chat_id: UUID,
+        branches: List[Dict[str, Any]],
+        expires_at: Optional[datetime] = None
+    ):
+        """
+        Insert the content documents of new branches in one write. Each item
+        gives ``branch_chat_id``, the parent ``response_id`` it forks from and
+        the ``message`` copied into it.
+        """
+        await chat_content.insert_many([
+            {
+                "chat_id": str(branch["branch_chat_id"]),
+                "qa_pairs": [compress_message(dict(branch["message"]))],
+                "qa_count": 1,
+                "branch_log": [],
+                "parent_chat_id": str(parent_chat_id),
+                "parent_response_id": branch["response_id"],
+                "expires_at": expires_at,
+            }
+            for branch in branches
+        ], ordered=False)
+
+    @staticmethod
+    async def add_branches_to_messages(chat_id: UUID, branches: List[Tuple[str, UUID]]):
+        """Push many (response_id, branch_chat_id) references with one bulk write."""
+        created_at = datetime.now(timezone.utc)
+        by_response: Dict[str, List[str]] = {}
+        for response_id, branch_chat_id in branches:
+            by_response.setdefault(response_id, []).append(str(branch_chat_id))
+        await chat_content.bulk_write([
+            UpdateOne(
+                {"chat_id": str(chat_id), "qa_pairs": {"$elemMatch": {"response_id": response_id}}},
+                {"$push": {
+                    "qa_pairs.$.branches": {"$each": branch_chat_ids},
+                    "branch_log": {"$each": [
+                        {"response_id": response_id, "branch_chat_id": branch_chat_id, "created_at": created_at}
+                        for branch_chat_id in branch_chat_ids
+                    ]},
+                }}
+            )
+            for response_id, branch_chat_ids in by_response.items()
+        ], ordered=True)
+
+    @staticmethod
+    async def get_qa_pairs_by_response_ids(chat_id: UUID, response_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """The chat's QA pairs with the given response IDs, by response ID, in one query."""
+        pipeline = [
+            {"$match": {"chat_id": str(chat_id)}},
+            {"$project": {
+                "_id": 0,
+                "qa_pairs": {"$filter": {
+                    "input": "$qa_pairs",
+                    "as": "qa_pair",
+                    "cond": {"$in": ["$$qa_pair.response_id", list(response_ids)]},
+                }},
+            }},
+        ]
+        qa_pairs = {}
+        async for document in chat_content.aggregate(pipeline):
+            for qa_pair in document.get("qa_pairs") or []:
+                qa_pairs[qa_pair["response_id"]] = decompress_message(qa_pair)
+        return qa_pairs
+
     @staticmethod
     async def get_qa_pair_by_response_id(chat_id: UUID, response_id: str):
-        # First find the document
-        document = await chat_content.find_one({"chat_id": str(chat_id)})
-        if not document or "qa_pairs" not in document:
+        # Let MongoDB return only the matching pair instead of the whole history
+        document = await chat_content.find_one(
+            {"chat_id": str(chat_id)},
+            {"_id": 0, "qa_pairs": {"$elemMatch": {"response_id": response_id}}}
+        )
+        if not document or not document.get("qa_pairs"):
+            return None
+
+        return decompress_message(document["qa_pairs"][0])
+
+    @staticmethod
+    async def get_context_window(chat_id: UUID, limit: int, end: Optional[int] = None):
+        """
+        Context fields plus at most ``limit`` turns ending before index ``end``
+        (the latest turns when ``end`` is None), sliced by MongoDB so only
+        those turns are returned.
+        """
+        projection = dict(CONTEXT_FIELDS)
+        if end is None:
+            projection["qa_pairs"] = {"$slice": -limit}
+        else:
+            skip = max(0, end - limit)
+            if end > skip:
+                projection["qa_pairs"] = {"$slice": [skip, end - skip]}
+        document = await chat_content.find_one({"chat_id": str(chat_id)}, projection)
+        return _decompress_pairs(document)
+
+    @staticmethod
+    async def get_changes_since(chat_id: UUID, messages: int, branches: int, limit: int):
+        """
+        At most ``limit`` messages after the first ``messages`` and ``limit``
+        branch additions after the first ``branches``, sliced by MongoDB.
+        Messages are append-only, so positions are stable sequence numbers.
+        """
+        document = await chat_content.find_one(
+            {"chat_id": str(chat_id)},
+            {
+                "_id": 0,
+                "qa_pairs": {"$slice": [messages, limit]},
+                "branch_log": {"$slice": [branches, limit]},
+                "active_branch_id": 1,
+            }
+        )
+        return _decompress_pairs(document)
+
+    @staticmethod
+    async def get_turn_index(chat_id: UUID, response_id: str) -> Optional[int]:
+        document = await chat_content.find_one(
+            {"chat_id": str(chat_id)},
+            {"_id": 0, "qa_pairs.response_id": 1}
+        )
+        if not document:
             return None
-            
-        for qa_pair in document["qa_pairs"]:
+        for index, qa_pair in enumerate(document.get("qa_pairs", [])):
             if qa_pair.get("response_id") == response_id:
-                return qa_pair
-                
+                return index
         return None
 
+    @staticmethod
+    async def get_lineage(chat_ids: List[UUID]) -> Dict[str, Dict[str, Any]]:
+        """Lineage fields of several chats in one query, by chat ID."""
+        cursor = chat_content.find({"chat_id": {"$in": [str(chat_id) for chat_id in chat_ids]}}, LINEAGE_FIELDS)
+        return {document["chat_id"]: document async for document in cursor}
+
+    @staticmethod
+    async def get_turn_indexes(chat_ids: List[UUID]) -> Dict[str, Dict[str, int]]:
+        """Turn index of every response ID of several chats in one query, by chat ID."""
+        cursor = chat_content.find(
+            {"chat_id": {"$in": [str(chat_id) for chat_id in chat_ids]}},
+            {"_id": 0, "chat_id": 1, "qa_pairs.response_id": 1}
+        )
+        return {
+            document["chat_id"]: {
+                qa_pair.get("response_id"): index for index, qa_pair in enumerate(document.get("qa_pairs", []))
+            }
+            async for document in cursor
+        }
+
+    @staticmethod
+    async def get_turn_ranges(ranges: Dict[str, Tuple[int, int]]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        ``qa_pairs[start:end]`` of several chats, by chat ID, sliced by MongoDB
+        in a single aggregation so turns outside the ranges are never read.
+        """
+        if not ranges:
+            return {}
+        pipeline = [
+            {"$match": {"chat_id": {"$in": list(ranges)}}},
+            {"$project": {
+                "_id": 0,
+                "chat_id": 1,
+                "qa_pairs": {"$switch": {
+                    "branches": [
+                        {"case": {"$eq": ["$chat_id", chat_id]}, "then": {"$slice": ["$qa_pairs", start, end - start]}}
+                        for chat_id, (start, end) in ranges.items()
+                    ],
+                    "default": [],
+                }},
+            }},
+        ]
+        turns = {}
+        async for document in chat_content.aggregate(pipeline):
+            turns[document["chat_id"]] = _decompress_pairs(document)["qa_pairs"]
+        return turns
+
+    @staticmethod
+    async def set_parent_turn_index(chat_id: UUID, index: int):
+        await chat_content.update_one(
+            {"chat_id": str(chat_id)},
+            {"$set": {"parent_turn_index": index}}
+        )
+
+    @staticmethod
+    async def update_summary(chat_id: UUID, summary: str, summary_upto: int, previous_upto: int) -> bool:
+        # Only move forward from the summary we read, so concurrent folds can't
+        # overwrite a newer summary with an older one
+        result = await chat_content.update_one(
+            {"chat_id": str(chat_id), "summary_upto": previous_upto or {"$in": [None, 0]}},
+            {"$set": {"summary": summary, "summary_upto": summary_upto}}
+        )
+        return result.modified_count > 0
+
     @staticmethod
     async def delete_chat_content(chat_id: UUID):
         await chat_content.delete_one({"chat_id": str(chat_id)}) 
+        # An archived chat's content is reachable only through its index entry
+        await chat_archive_index.delete_one({"_id": str(chat_id)})
     
     @staticmethod
     async def set_active_branch(chat_id: UUID, branch_id: UUID) -> bool:
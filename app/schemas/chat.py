@@ -18,6 +18,7 @@ class ChatCreate(BaseModel):
 class ChatUpdate(BaseModel):
     name: Optional[str] = None
     active: Optional[bool] = None
+    ai_cache_enabled: Optional[bool] = None
 
 
 class ChatResponse(BaseModel):
@@ -28,6 +29,22 @@ class ChatResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     active: bool
+    ai_cache_enabled: bool = True
+
+
+class ChatStats(BaseModel):
+    message_count: int = 0
+    branch_count: int = 0
+    bytes_stored: int = 0
+    last_message_at: Optional[datetime] = None
+
+
+class ChatStatsResponse(ChatStats):
+    chat_id: UUID
+
+
+class ChatListItem(ChatResponse, ChatStats):
+    pass
 
 
 class BranchInfo(BaseModel):
@@ -45,4 +62,19 @@ class QAPair(BaseModel):
 class ChatContent(BaseModel):
     chat: ChatResponse
     qa_pairs: List[QAPair]
-    active_branch_id: Optional[UUID] = None
\ No newline at end of file
+    active_branch_id: Optional[UUID] = None
+
+
+class BranchAddition(BaseModel):
+    response_id: str
+    branch_chat_id: UUID
+    created_at: Optional[datetime] = None
+
+
+class ChatSyncResponse(BaseModel):
+    chat_id: UUID
+    qa_pairs: List[QAPair]
+    branches: List[BranchAddition]
+    active_branch_id: Optional[UUID] = None
+    cursor: str = Field(..., description="Pass back as `cursor` to get only later changes")
+    has_more: bool = False
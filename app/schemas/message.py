@@ -3,6 +3,8 @@ from typing import Optional, List, Dict, Any
 from pydantic import BaseModel, UUID4, Field
 from uuid import UUID
 
+from app.schemas.chat import QAPair
+
 
 class MessageCreate(BaseModel):
     chat_id: UUID
@@ -24,6 +26,16 @@ class BranchCreate(BaseModel):
     name: Optional[str] = None
 
 
+class BranchBatchItem(BaseModel):
+    response_id: str
+    name: Optional[str] = None
+
+
+class BranchBatchCreate(BaseModel):
+    chat_id: UUID
+    branches: List[BranchBatchItem] = Field(..., min_length=1, max_length=100)
+
+
 class BranchResponse(BaseModel):
     id: UUID
     name: str
@@ -32,6 +44,25 @@ class BranchResponse(BaseModel):
     created_at: datetime
 
 
+class BranchDiffRange(BaseModel):
+    chat_id: UUID
+    start: int = Field(..., description="Index of the first turn in the chat's qa_pairs")
+    qa_pairs: List[QAPair]
+
+
+class BranchDiffSide(BaseModel):
+    chat_id: UUID
+    ranges: List[BranchDiffRange]
+
+
+class BranchDiffResponse(BaseModel):
+    fork_chat_id: Optional[UUID] = Field(None, description="Deepest chat both sides descend from")
+    fork_response_id: Optional[str] = None
+    shared_turns: int = Field(..., description="Turns of fork_chat_id both sides share")
+    left: BranchDiffSide
+    right: BranchDiffSide
+
+
 class BranchTreeNode(BaseModel):
     id: UUID
     name: str
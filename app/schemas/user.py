@@ -1,4 +1,5 @@
 from typing import Optional
+from uuid import UUID
 from pydantic import BaseModel, EmailStr
 
 from app.schemas.mixins import PasswordMixin
@@ -27,7 +28,29 @@ class UserResponse(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
 
 
 class TokenPayload(BaseModel):
-    sub: Optional[str] = None 
\ No newline at end of file
+    sub: Optional[str] = None
+    type: Optional[str] = None
+    jti: Optional[str] = None
+    exp: Optional[int] = None
+    is_active: bool = False
+    is_superuser: bool = False
+
+
+class CurrentUser(BaseModel):
+    """The authenticated user, as described by the access token claims."""
+    id: UUID
+    is_active: bool
+    is_superuser: bool 
\ No newline at end of file
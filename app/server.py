@@ -0,0 +1,79 @@
+"""
+Production entry point.
+
+    python -m app.server
+
+Runs uvicorn with the worker count, event loop, HTTP parser, keep-alive,
+backlog, worker recycling and graceful shutdown settings from ``Settings``.
+Each worker is a separate process that builds its own database clients and
+cache in the application lifespan.
+"""
+import importlib
+import os
+import tempfile
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+from app.core.config import settings
+
+
+def worker_count() -> int:
+    return settings.WEB_CONCURRENCY or os.cpu_count() or 1
+
+
+def child_exit(pid: int) -> None:
+    """Drop a dead worker's live gauges (in-flight requests, listeners, replica health)."""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(pid)
+
+
+class WorkerSupervisor(Multiprocess):
+    """
+    uvicorn's worker supervisor, calling ``child_exit`` for every worker it
+    replaces (after a crash, a failed health check or SIGHUP) or stops (SIGTTOU).
+    """
+
+    def handle_signals(self) -> None:
+        self._reaping(super().handle_signals)
+
+    def keep_subprocess_alive(self) -> None:
+        self._reaping(super().keep_subprocess_alive)
+
+    def _reaping(self, step) -> None:
+        pids = {process.pid for process in self.processes}
+        step()
+        for pid in pids - {process.pid for process in self.processes}:
+            child_exit(pid)
+
+
+def main() -> None:
+    workers = worker_count()
+
+    # Let every worker write its metrics to a shared directory so /metrics
+    # reports the whole server rather than whichever worker answered
+    if workers > 1 and settings.METRICS_ENABLED:
+        os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="prometheus-"))
+        # uvicorn has no child-exit hook; run its workers under a supervisor
+        # that provides one, so dead workers stop counting in live gauges
+        importlib.import_module("uvicorn.main").Multiprocess = WorkerSupervisor
+
+    uvicorn.run(
+        "app.main:app",
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        workers=workers,
+        loop=settings.SERVER_LOOP,
+        http=settings.SERVER_HTTP,
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE_TIMEOUT,
+        limit_max_requests=settings.SERVER_MAX_REQUESTS or None,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+        proxy_headers=True,
+        access_log=settings.SERVER_ACCESS_LOG,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import hashlib
+import logging
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import orjson
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.metrics import AI_CACHE_REQUESTS
+from app.db.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ai-cache:"
+# Sorted set of cache keys scored by last use, for LRU eviction
+LRU_KEY = "ai-cache:lru"
+
+_WHITESPACE = re.compile(r"\s+")
+_EDGE_PUNCTUATION = re.compile(r"^[^\w]+|[^\w]+$")
+
+
+def normalise_question(question: str) -> str:
+    """Case, width, whitespace and surrounding punctuation don't change the answer."""
+    question = unicodedata.normalize("NFKC", question).casefold()
+    question = _WHITESPACE.sub(" ", question).strip()
+    return _EDGE_PUNCTUATION.sub("", question)
+
+
+def context_hash(context: Optional[Dict[str, Any]]) -> str:
+    if not context or not (context.get("summary") or context.get("turns")):
+        return ""
+    payload = {"summary": context.get("summary"), "turns": context.get("turns")}
+    return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+def cache_key(question: str, context: Optional[Dict[str, Any]] = None) -> str:
+    digest = hashlib.sha256(
+        f"{normalise_question(question)}\0{context_hash(context)}".encode()
+    ).hexdigest()
+    return f"{KEY_PREFIX}{digest}"
+
+
+class AIResponseCache:
+    """
+    Exact-match cache in front of the AI provider.
+
+    Lookups go to a per-worker LRU first, then Redis. Redis entries expire
+    after ``ttl`` seconds and the least recently used are evicted beyond
+    ``max_entries``, independently of the server's maxmemory policy (which
+    must not evict revocation keys). A Redis outage only disables the cache.
+    """
+
+    def __init__(self, ttl: int, max_entries: int, l1_max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.l1_max_entries = l1_max_entries
+        self._l1: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    async def get_or_generate(
+        self,
+        question: str,
+        context: Optional[Dict[str, Any]],
+        generate: Callable[..., Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        key = cache_key(question, context)
+
+        result = self._l1_get(key)
+        if result is not None:
+            AI_CACHE_REQUESTS.labels("l1_hit").inc()
+            return result
+
+        result = await self._redis_get(key)
+        if result is not None:
+            AI_CACHE_REQUESTS.labels("redis_hit").inc()
+            self._l1_set(key, result)
+            return result
+
+        AI_CACHE_REQUESTS.labels("miss").inc()
+        result = await generate(question, context)
+        self._l1_set(key, result)
+        await self._redis_set(key, result)
+        return dict(result)
+
+    def clear_local(self) -> None:
+        self._l1.clear()
+
+    def _l1_get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._l1.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at < time.monotonic():
+            del self._l1[key]
+            return None
+        self._l1.move_to_end(key)
+        return dict(result)
+
+    def _l1_set(self, key: str, result: Dict[str, Any]) -> None:
+        self._l1[key] = (time.monotonic() + self.ttl, dict(result))
+        self._l1.move_to_end(key)
+        while len(self._l1) > self.l1_max_entries:
+            self._l1.popitem(last=False)
+
+    async def _redis_get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                # Refresh recency only if the key is still tracked
+                pipe.zadd(LRU_KEY, {key: time.time()}, xx=True)
+                value, _ = await pipe.execute()
+        except RedisError as exc:
+            logger.warning("AI cache lookup failed: %s", exc)
+            return None
+        return orjson.loads(value) if value else None
+
+    async def _redis_set(self, key: str, result: Dict[str, Any]) -> None:
+        now = time.time()
+        try:
+            redis = get_redis()
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.set(key, orjson.dumps(result), ex=self.ttl)
+                pipe.zadd(LRU_KEY, {key: now})
+                # Forget keys that have expired on their own
+                pipe.zremrangebyscore(LRU_KEY, "-inf", now - self.ttl)
+                pipe.zcard(LRU_KEY)
+                *_, size = await pipe.execute()
+
+            if size > self.max_entries:
+                evicted = await redis.zpopmin(LRU_KEY, size - self.max_entries)
+                if evicted:
+                    await redis.delete(*(member for member, _ in evicted))
+        except RedisError as exc:
+            logger.warning("AI cache store failed: %s", exc)
+
+
+ai_response_cache = AIResponseCache(
+    ttl=settings.AI_CACHE_TTL_SECONDS,
+    max_entries=settings.AI_CACHE_MAX_ENTRIES,
+    l1_max_entries=settings.AI_CACHE_L1_MAX_ENTRIES,
+)
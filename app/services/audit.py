@@ -0,0 +1,132 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.metrics import AUDIT_EVENTS
+from app.db.mongodb import audit_events
+
+logger = logging.getLogger(__name__)
+
+CHAT_CREATED = "chat_created"
+MESSAGE_ADDED = "message_added"
+BRANCH_CREATED = "branch_created"
+CHAT_DELETED = "chat_deleted"
+
+# Queued by close() after the last event; the writer exits once it reaches it
+_STOP = object()
+
+
+class AuditLog:
+    """
+    Append-only log of chat writes, for compliance and analytics.
+
+    Requests only put events on a bounded in-memory queue; a background
+    writer inserts them into the capped ``audit_events`` collection in
+    batches of up to ``batch_size``, waiting at most ``flush_interval``
+    seconds to fill a batch. When the queue is full, callers wait up to
+    ``enqueue_timeout`` seconds for room (backpressure) before the event is
+    dropped. ``close`` writes everything still queued.
+    """
+
+    def __init__(self, queue_size: int, batch_size: int, flush_interval: float, enqueue_timeout: float):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the writer; events recorded while it isn't running are not kept."""
+        # The queue belongs to the running event loop, so it is created here
+        self._queue = asyncio.Queue(self.queue_size)
+        self._writer = asyncio.create_task(self._run(self._queue))
+
+    async def record(
+        self,
+        event_type: str,
+        chat_id: UUID,
+        account_id: Optional[UUID] = None,
+        data: Optional[Dict[str, Any]] = None
+    ) -> None:
+        if self._queue is None:
+            return
+        event = {
+            "type": event_type,
+            "chat_id": str(chat_id),
+            "account_id": str(account_id) if account_id is not None else None,
+            "at": datetime.now(timezone.utc),
+            **({"data": data} if data else {}),
+        }
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(self._queue.put(event), self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                AUDIT_EVENTS.labels("dropped").inc()
+                logger.warning("Audit log queue full; dropped %s event for chat %s", event_type, chat_id)
+                return
+        AUDIT_EVENTS.labels("queued").inc()
+
+    async def close(self) -> None:
+        """Write every queued event and stop the writer."""
+        if self._queue is None:
+            return
+        queue, writer = self._queue, self._writer
+        # New events are not accepted while the queue drains
+        self._queue = None
+        await queue.put(_STOP)
+        await writer
+        self._writer = None
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        while True:
+            batch, stopping = await self._next_batch(queue)
+            if batch:
+                await self._write(batch)
+            if stopping:
+                return
+
+    async def _next_batch(self, queue: asyncio.Queue) -> Tuple[List[Dict[str, Any]], bool]:
+        """The next batch of events, and whether close() was reached."""
+        batch: List[Dict[str, Any]] = []
+        event = await queue.get()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while event is not _STOP:
+            batch.append(event)
+            if len(batch) >= self.batch_size:
+                return batch, False
+            try:
+                event = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return batch, False
+                try:
+                    event = await asyncio.wait_for(queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    return batch, False
+        return batch, True
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            await audit_events.insert_many(batch, ordered=False)
+        except Exception:
+            # The writer must outlive a failed batch, whatever the cause
+            AUDIT_EVENTS.labels("failed").inc(len(batch))
+            logger.exception("Audit log write of %d event(s) failed", len(batch))
+            return
+        AUDIT_EVENTS.labels("written").inc(len(batch))
+
+
+audit_log = AuditLog(
+    queue_size=settings.AUDIT_LOG_QUEUE_SIZE,
+    batch_size=settings.AUDIT_LOG_BATCH_SIZE,
+    flush_interval=settings.AUDIT_LOG_FLUSH_INTERVAL_SECONDS,
+    enqueue_timeout=settings.AUDIT_LOG_ENQUEUE_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,161 @@
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from app.repositories.chat_repository import ChatContentRepository
+from app.services.chat_archive import chat_archive
+
+# Deepest branch nesting followed when looking for a common ancestor
+MAX_LINEAGE_DEPTH = 64
+
+# Turn count assumed for content documents written before qa_count existed
+UNKNOWN_TURN_COUNT = 2 ** 31 - 1
+
+
+class BranchDiffService:
+    """
+    Diffs two chats of the same branch tree.
+
+    A branch forked at turn ``k`` of its parent shares the parent's turns
+    ``0..k`` and continues with its own turns from index 1 (index 0 is its
+    copy of the fork turn). The diff walks both lineages up to the deepest
+    common chat, one batched lineage query per level, and then reads only
+    the turns after the fork point, for both sides, in one aggregation.
+    """
+
+    async def diff(self, chat_id: UUID, other_chat_id: UUID) -> Dict[str, Any]:
+        left, right = str(chat_id), str(other_chat_id)
+        lineage = await self._load_lineage([left, right])
+        await self._resolve_fork_indexes(lineage)
+
+        left_chain = self._chain(left, lineage)
+        right_chain = self._chain(right, lineage)
+        common = next((candidate for candidate in left_chain if candidate in right_chain), None)
+
+        if common is None:
+            # Unrelated chats share nothing: each side is its whole lineage
+            fork_position, fork_response_id = 0, None
+            left_path, right_path = left_chain[::-1], right_chain[::-1]
+        else:
+            left_path = [common] + left_chain[:left_chain.index(common)][::-1]
+            right_path = [common] + right_chain[:right_chain.index(common)][::-1]
+            left_exit = self._exit(left_path, lineage)
+            right_exit = self._exit(right_path, lineage)
+            # The last shared turn of the common chat is the earlier exit;
+            # on a tie, prefer the side that leaves through a branch
+            exit_index, _, exit_path = min(
+                (left_exit, len(left_path) == 1, left_path),
+                (right_exit, len(right_path) == 1, right_path),
+                key=lambda item: item[:2]
+            )
+            fork_position = exit_index + 1
+            fork_response_id = lineage[exit_path[1]].get("parent_response_id") if len(exit_path) > 1 else None
+
+        left_ranges = self._ranges(left_path, fork_position, lineage)
+        right_ranges = self._ranges(right_path, fork_position, lineage)
+        turns = await self._read_ranges(left_ranges + right_ranges)
+
+        return {
+            "fork_chat_id": common,
+            "fork_response_id": fork_response_id,
+            "shared_turns": fork_position,
+            "left": {"chat_id": left, "ranges": self._with_turns(left_ranges, turns)},
+            "right": {"chat_id": right, "ranges": self._with_turns(right_ranges, turns)},
+        }
+
+    @staticmethod
+    async def _load_lineage(chat_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        lineage: Dict[str, Dict[str, Any]] = {}
+        frontier = set(chat_ids)
+        for _ in range(MAX_LINEAGE_DEPTH):
+            if not frontier:
+                break
+            documents = await ChatContentRepository.get_lineage([UUID(chat_id) for chat_id in frontier])
+            # Chats missing from the batch may be archived: restore and read them again
+            for chat_id in frontier - documents.keys():
+                documents.update(await chat_archive.load(
+                    UUID(chat_id), lambda: ChatContentRepository.get_lineage([UUID(chat_id)])
+                ))
+            lineage.update(documents)
+            frontier = {
+                document["parent_chat_id"] for document in documents.values()
+                if document.get("parent_chat_id") and document["parent_chat_id"] not in lineage
+            }
+        return lineage
+
+    @staticmethod
+    async def _resolve_fork_indexes(lineage: Dict[str, Dict[str, Any]]) -> None:
+        # Older branches don't record their fork index; look them all up at once
+        unresolved = [
+            document for document in lineage.values()
+            if document.get("parent_chat_id") in lineage and document.get("parent_turn_index") is None
+        ]
+        if not unresolved:
+            return
+        indexes = await ChatContentRepository.get_turn_indexes(
+            [UUID(document["parent_chat_id"]) for document in unresolved]
+        )
+        for document in unresolved:
+            index = indexes.get(document["parent_chat_id"], {}).get(document.get("parent_response_id"))
+            if index is not None:
+                document["parent_turn_index"] = index
+                await ChatContentRepository.set_parent_turn_index(UUID(document["chat_id"]), index)
+
+    @staticmethod
+    def _chain(chat_id: str, lineage: Dict[str, Dict[str, Any]]) -> List[str]:
+        """``chat_id`` followed by its ancestors, up to the root."""
+        chain = []
+        current: Optional[str] = chat_id
+        while current in lineage and current not in chain:
+            chain.append(current)
+            document = lineage[current]
+            if document.get("parent_turn_index") is None:
+                break
+            current = document.get("parent_chat_id")
+        return chain
+
+    @staticmethod
+    def _exit(path: List[str], lineage: Dict[str, Dict[str, Any]]) -> int:
+        """Index of the last turn of ``path[0]`` on the path."""
+        if len(path) > 1:
+            return lineage[path[1]]["parent_turn_index"]
+        return lineage[path[0]].get("qa_count", UNKNOWN_TURN_COUNT) - 1
+
+    @staticmethod
+    def _ranges(path: List[str], start: int, lineage: Dict[str, Dict[str, Any]]) -> List[Tuple[str, int, int]]:
+        """(chat_id, start, end) turn ranges along ``path`` from position ``start`` of its first chat."""
+        ranges = []
+        for position, chat_id in enumerate(path):
+            first = start if position == 0 else 1
+            if position + 1 < len(path):
+                end = lineage[path[position + 1]]["parent_turn_index"] + 1
+            else:
+                end = lineage[chat_id].get("qa_count", UNKNOWN_TURN_COUNT)
+            if end > first:
+                ranges.append((chat_id, first, end))
+        return ranges
+
+    @staticmethod
+    async def _read_ranges(ranges: List[Tuple[str, int, int]]) -> Dict[str, Tuple[int, List[Dict[str, Any]]]]:
+        # The common chat may be on both sides; read the union of its ranges once
+        merged: Dict[str, Tuple[int, int]] = {}
+        for chat_id, start, end in ranges:
+            if chat_id in merged:
+                start, end = min(start, merged[chat_id][0]), max(end, merged[chat_id][1])
+            merged[chat_id] = (start, end)
+        turns = await ChatContentRepository.get_turn_ranges(merged)
+        return {chat_id: (merged[chat_id][0], turns.get(chat_id, [])) for chat_id in merged}
+
+    @staticmethod
+    def _with_turns(
+        ranges: List[Tuple[str, int, int]],
+        turns: Dict[str, Tuple[int, List[Dict[str, Any]]]]
+    ) -> List[Dict[str, Any]]:
+        result = []
+        for chat_id, start, end in ranges:
+            offset, chat_turns = turns[chat_id]
+            result.append({
+                "chat_id": chat_id,
+                "start": start,
+                "qa_pairs": chat_turns[start - offset:end - offset],
+            })
+        return result
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, List, Optional, Tuple, TypeVar
+from uuid import UUID
+
+import bson
+from pymongo import DeleteOne, ReplaceOne
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.core.metrics import CHAT_ARCHIVE
+from app.db.mongodb import chat_archive_index, chat_content
+from app.utils.compression import compress_bytes, decompress_bytes
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Every top-level field a request can change on an existing content document.
+# qa_pairs and the branch lists inside it only grow, which qa_count and the
+# size of branch_log track.
+MUTABLE_FIELDS = ("qa_count", "active_branch_id", "summary", "summary_upto", "parent_turn_index", "expires_at")
+
+
+class SegmentStore:
+    """
+    Append-only segment files under ``directory``.
+
+    Records are written back to back and addressed by (segment, offset,
+    length). Each process appends to segments of its own, named after the
+    time, process ID and a random suffix, so concurrent archivers never
+    share a file; a segment is closed once it reaches ``max_bytes``.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._segment: Optional[str] = None
+        self._size = 0
+        self._lock = asyncio.Lock()
+
+    async def append(self, records: List[bytes]) -> List[Tuple[str, int, int]]:
+        async with self._lock:
+            return await asyncio.to_thread(self._append, records)
+
+    async def read(self, segment: str, offset: int, length: int) -> bytes:
+        return await asyncio.to_thread(self._read, segment, offset, length)
+
+    def _append(self, records: List[bytes]) -> List[Tuple[str, int, int]]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        locations = []
+        handle = None
+        try:
+            for record in records:
+                if self._segment is None or (self._size and self._size + len(record) > self.max_bytes):
+                    if handle is not None:
+                        self._close(handle)
+                        handle = None
+                    started = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+                    self._segment = f"{started}-{os.getpid()}-{uuid.uuid4().hex[:8]}.seg"
+                    self._size = 0
+                if handle is None:
+                    handle = open(self.directory / self._segment, "ab")
+                handle.write(record)
+                locations.append((self._segment, self._size, len(record)))
+                self._size += len(record)
+        finally:
+            if handle is not None:
+                self._close(handle)
+        return locations
+
+    @staticmethod
+    def _close(handle) -> None:
+        # Index entries are only written once their records are on disk
+        handle.flush()
+        os.fsync(handle.fileno())
+        handle.close()
+
+    def _read(self, segment: str, offset: int, length: int) -> bytes:
+        with open(self.directory / Path(segment).name, "rb") as handle:
+            handle.seek(offset)
+            data = handle.read(length)
+        if len(data) != length:
+            raise OSError(f"Archive segment {segment} is truncated at offset {offset}")
+        return data
+
+
+class ChatArchive:
+    """
+    Cold storage for chat content.
+
+    ``archive`` moves whole ``chat_content`` documents, BSON-encoded and
+    zstd-compressed, into segment files and records where each one went in
+    the ``chat_archive`` index collection. ``restore`` puts a document back
+    into MongoDB the first time the chat is accessed again, stamped with
+    ``restored_at`` so it isn't archived again until it has been idle anew.
+    """
+
+    def __init__(self, store: SegmentStore):
+        self.store = store
+
+    async def archive(self, chat_ids: List[UUID], idle_since: Optional[datetime] = None) -> int:
+        """
+        Archive the chats' content; returns how many documents were moved.
+        With ``idle_since``, chats restored after it are left where they are.
+        """
+        query = {"chat_id": {"$in": [str(chat_id) for chat_id in chat_ids]}}
+        if idle_since is not None:
+            query["$or"] = [{"restored_at": {"$exists": False}}, {"restored_at": {"$lt": idle_since}}]
+        documents = [document async for document in chat_content.find(query)]
+        if not documents:
+            return 0
+
+        locations = await self.store.append([compress_bytes(bson.encode(document)) for document in documents])
+        archived_at = datetime.now(timezone.utc)
+        await chat_archive_index.bulk_write([
+            ReplaceOne(
+                {"_id": document["chat_id"]},
+                {
+                    "segment": segment,
+                    "offset": offset,
+                    "length": length,
+                    "archived_at": archived_at,
+                    # Retention still applies to archived chats
+                    "expires_at": document.get("expires_at"),
+                },
+                upsert=True
+            )
+            for document, (segment, offset, length) in zip(documents, locations)
+        ], ordered=False)
+
+        # A chat written to since it was read keeps its document; its index
+        # entry is never used because restore only runs when content is missing
+        result = await chat_content.bulk_write([DeleteOne(_unchanged(document)) for document in documents], ordered=False)
+        CHAT_ARCHIVE.labels("archived").inc(result.deleted_count)
+        return result.deleted_count
+
+    async def load(
+        self,
+        chat_id: UUID,
+        access: Callable[[], Awaitable[T]],
+        found: Callable[[Any], bool] = bool
+    ) -> T:
+        """
+        Run ``access``, a read or write of the chat's content document. If it
+        finds nothing (``found`` is false for its result) and the chat is
+        archived, the chat is restored and ``access`` runs again. All access
+        to chat content goes through here.
+        """
+        result = await access()
+        if not found(result) and await self.restore(chat_id):
+            result = await access()
+        return result
+
+    async def restore(self, chat_id: UUID) -> bool:
+        """Move an archived chat back into MongoDB; False if it isn't archived."""
+        entry = await chat_archive_index.find_one({"_id": str(chat_id)})
+        if entry is None:
+            return False
+        data = await self.store.read(entry["segment"], entry["offset"], entry["length"])
+        document = bson.decode(decompress_bytes(data))
+        document["restored_at"] = datetime.now(timezone.utc)
+        try:
+            await chat_content.insert_one(document)
+        except DuplicateKeyError:
+            # Restored concurrently by another request
+            pass
+        await chat_archive_index.delete_one(
+            {"_id": entry["_id"], "segment": entry["segment"], "offset": entry["offset"]}
+        )
+        CHAT_ARCHIVE.labels("restored").inc()
+        logger.info("Restored archived chat %s", chat_id)
+        return True
+
+
+def _unchanged(document: dict) -> dict:
+    """A filter matching ``document`` only while none of its mutable fields has changed."""
+    guard = {"_id": document["_id"]}
+    for field in MUTABLE_FIELDS:
+        guard[field] = document[field] if field in document else {"$exists": False}
+    guard["branch_log"] = {"$size": len(document["branch_log"])} if "branch_log" in document else {"$exists": False}
+    return guard
+
+
+chat_archive = ChatArchive(SegmentStore(settings.ARCHIVE_DIR, settings.ARCHIVE_SEGMENT_MAX_BYTES))
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+from uuid import UUID
+
+import orjson
+
+from app.core.config import settings
+from app.core.metrics import CHAT_EVENT_LISTENERS, CHAT_EVENTS
+from app.db.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "chat-events:"
+
+MESSAGE_ADDED = "message_added"
+BRANCH_CREATED = "branch_created"
+ACTIVE_BRANCH_CHANGED = "active_branch_changed"
+
+
+class ChatEventBus:
+    """
+    Per-chat events published on Redis pub/sub, so listeners attached to any
+    worker see writes made by every other worker.
+
+    Each worker holds a single subscriber connection: a chat's channel is
+    subscribed when its first local listener arrives and unsubscribed when
+    its last one leaves, and one reader task fans incoming events out to the
+    listeners' queues. A listener whose queue fills up is cut off with a
+    ``None`` sentinel and is expected to catch up through sync-chat.
+    Publishing never fails the write that triggered it.
+    """
+
+    def __init__(self, queue_size: int, heartbeat: float):
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self._listeners: Dict[str, Set[asyncio.Queue]] = {}
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def publish(self, chat_id: UUID, event_type: str, data: Optional[Dict[str, Any]] = None) -> None:
+        await self.publish_many(chat_id, event_type, [data or {}])
+
+    async def publish_many(self, chat_id: UUID, event_type: str, items: List[Dict[str, Any]]) -> None:
+        """Publish one event per item, in a single round trip."""
+        from redis.exceptions import RedisError
+
+        channel = f"{CHANNEL_PREFIX}{chat_id}"
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                for data in items:
+                    event = {"type": event_type, "chat_id": str(chat_id), **data}
+                    pipe.publish(channel, orjson.dumps(event, option=orjson.OPT_UTC_Z).decode())
+                await pipe.execute()
+        except RedisError as exc:
+            logger.warning("Chat event publish failed: %s", exc)
+            return
+        CHAT_EVENTS.labels("published").inc(len(items))
+
+    @asynccontextmanager
+    async def listen(self, chat_id: UUID) -> AsyncIterator[asyncio.Queue]:
+        """
+        Queue receiving the chat's events (JSON strings) while the context is
+        open. Raises RedisError if the channel can't be subscribed.
+        """
+        channel = f"{CHANNEL_PREFIX}{chat_id}"
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        async with self._lock:
+            listeners = self._listeners.setdefault(channel, set())
+            listeners.add(queue)
+            if len(listeners) == 1:
+                try:
+                    await self._subscribe(channel)
+                except Exception:
+                    del self._listeners[channel]
+                    raise
+        CHAT_EVENT_LISTENERS.inc()
+        try:
+            yield queue
+        finally:
+            CHAT_EVENT_LISTENERS.dec()
+            await self._remove(channel, queue)
+
+    async def stream(self, chat_id: UUID) -> AsyncIterator[str]:
+        """The chat's events as a server-sent event stream."""
+        from redis.exceptions import RedisError
+
+        try:
+            async with self.listen(chat_id) as queue:
+                yield ": connected\n\n"
+                while True:
+                    try:
+                        event = await asyncio.wait_for(queue.get(), self.heartbeat)
+                    except asyncio.TimeoutError:
+                        # Keeps proxies from closing an idle connection
+                        yield ": keepalive\n\n"
+                        continue
+                    if event is None:
+                        yield "event: resync\ndata: {}\n\n"
+                        return
+                    yield f"data: {event}\n\n"
+        except RedisError as exc:
+            logger.warning("Chat event subscription failed: %s", exc)
+            yield "event: unavailable\ndata: {}\n\n"
+
+    async def close(self) -> None:
+        """Stop the reader and end every open stream."""
+        if self._reader is not None:
+            self._reader.cancel()
+            self._reader = None
+        for listeners in self._listeners.values():
+            for queue in listeners:
+                self._cut_off(queue)
+        self._listeners.clear()
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+
+    async def _subscribe(self, channel: str) -> None:
+        if self._pubsub is None:
+            self._pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(channel)
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read())
+
+    async def _remove(self, channel: str, queue: asyncio.Queue) -> None:
+        from redis.exceptions import RedisError
+
+        async with self._lock:
+            listeners = self._listeners.get(channel)
+            if listeners is None:
+                return
+            listeners.discard(queue)
+            if listeners:
+                return
+            del self._listeners[channel]
+            try:
+                await self._pubsub.unsubscribe(channel)
+            except RedisError as exc:
+                logger.warning("Chat event unsubscribe failed: %s", exc)
+
+    async def _read(self) -> None:
+        from redis.exceptions import RedisError
+
+        # Ends once the last listener has left; the next subscribe restarts it
+        while self._listeners:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except RedisError as exc:
+                # The connection resubscribes its channels when it reconnects
+                logger.warning("Chat event subscription lost: %s", exc)
+                await asyncio.sleep(1)
+                continue
+            if message is not None and message["type"] == "message":
+                self._dispatch(message["channel"], message["data"])
+
+    def _dispatch(self, channel: str, event: str) -> None:
+        for queue in list(self._listeners.get(channel, ())):
+            try:
+                queue.put_nowait(event)
+                CHAT_EVENTS.labels("delivered").inc()
+            except asyncio.QueueFull:
+                CHAT_EVENTS.labels("dropped").inc()
+                self._listeners[channel].discard(queue)
+                self._cut_off(queue)
+
+    @staticmethod
+    def _cut_off(queue: asyncio.Queue) -> None:
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+
+chat_event_bus = ChatEventBus(
+    queue_size=settings.CHAT_EVENTS_QUEUE_SIZE,
+    heartbeat=settings.CHAT_EVENTS_HEARTBEAT_SECONDS,
+)
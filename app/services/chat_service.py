@@ -1,22 +1,66 @@
 import uuid
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from uuid import UUID
 from datetime import datetime, timezone
 
 from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.chat import Chat, ChatType, Conversation
-from app.repositories.chat_repository import ChatRepository, ChatContentRepository
+from app.core.config import settings
+from app.db.postgres import async_session
+from app.models.chat import BranchEdge, Chat, ChatType, Conversation
+from app.repositories.chat_repository import (
+    BRANCH_REFERENCES_PROJECTION,
+    ChatContentRepository,
+    ChatRepository,
+    branch_references,
+)
 from app.schemas.chat import ChatResponse
+from app.services import audit
+from app.services.audit import audit_log
+from app.services.chat_archive import chat_archive
+from app.services.retention import retention_policy
+from app.services.chat_events import (
+    ACTIVE_BRANCH_CHANGED,
+    BRANCH_CREATED,
+    MESSAGE_ADDED,
+    chat_event_bus,
+)
 from app.schemas.message import BranchTreeNode
 
 
+def message_size(question: str, response: str) -> int:
+    """Bytes of message text a QA pair adds to a chat."""
+    return len(question.encode("utf-8")) + len(response.encode("utf-8"))
+
+
+def parse_sync_cursor(cursor: Optional[str]) -> Tuple[int, int]:
+    """
+    Split a sync cursor into (messages seen, branch additions seen). Cursors
+    are opaque to clients; an empty one means "from the start".
+    """
+    if not cursor:
+        return 0, 0
+    try:
+        messages, branches = (int(part) for part in cursor.split("."))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid sync cursor")
+    if messages < 0 or branches < 0:
+        raise HTTPException(status_code=400, detail="Invalid sync cursor")
+    return messages, branches
+
+
 class ChatService:
     def __init__(self, db_session: AsyncSession):
         self.chat_repo = ChatRepository(db_session)
 
-    async def create_chat(self, account_id: UUID, name: str, chat_type: ChatType = ChatType.PERSONAL) -> Chat:
+    async def create_chat(
+        self,
+        account_id: UUID,
+        name: str,
+        chat_type: ChatType = ChatType.PERSONAL,
+        lineage: Optional[Dict[str, Any]] = None
+    ) -> Chat:
         chat = await self.chat_repo.create_chat(
             account_id=account_id,
             name=name,
@@ -24,29 +68,83 @@ class ChatService:
         )
         
         # Create chat content in MongoDB
-        await ChatContentRepository.create_chat_content(chat.id)
+        await ChatContentRepository.create_chat_content(chat.id, lineage, await self._expires_at(account_id))
+        # Branch chats are audited as branch_created on their parent
+        if chat_type != ChatType.BRANCH:
+            await self._audit(audit.CHAT_CREATED, chat.id, account_id)
         
         return chat
 
+    @staticmethod
+    def _chat_versions():
+        # Imported on first use: it pulls in the Redis client
+        from app.services.chat_versions import chat_versions
+
+        return chat_versions
+
+    @staticmethod
+    async def _publish(chat_id: UUID, event_type: str, *items: Dict[str, Any]) -> None:
+        if settings.CHAT_EVENTS_ENABLED:
+            await chat_event_bus.publish_many(chat_id, event_type, list(items))
+
+    async def _expires_at(self, account_id: UUID) -> Optional[datetime]:
+        return await retention_policy.expires_at(self.chat_repo.db_session, account_id)
+
+    @staticmethod
+    async def _audit(
+        event_type: str,
+        chat_id: UUID,
+        account_id: Optional[UUID],
+        data: Optional[Dict[str, Any]] = None
+    ) -> None:
+        if settings.AUDIT_LOG_ENABLED:
+            await audit_log.record(event_type, chat_id, account_id, data)
+
     async def get_chat(self, chat_id: UUID) -> Optional[Chat]:
         chat = await self.chat_repo.get_chat(chat_id)
         if not chat:
             raise HTTPException(status_code=404, detail="Chat not found")
         return chat
 
-    async def get_chat_with_content(self, chat_id: UUID):
-        # Get chat metadata from PostgreSQL
-        chat = await self.get_chat(chat_id)
+    async def get_chat_with_content(self, chat_id: UUID, chat: Optional[Chat] = None):
+        # Get chat metadata from PostgreSQL, unless the caller already has it
+        if chat is None:
+            chat = await self.get_chat(chat_id)
         
-        # Get chat content from MongoDB
-        content = await ChatContentRepository.get_chat_content(chat_id)
+        # Get chat content from MongoDB; archived chats are moved back first
+        content = await chat_archive.load(chat_id, lambda: ChatContentRepository.get_chat_content(chat_id))
         if not content:
             raise HTTPException(status_code=404, detail="Chat content not found")
        
         return {
             "chat": chat,
             "qa_pairs": content['qa_pairs'],
-            "active_branch_id": content['active_branch_id']
+            "active_branch_id": content.get('active_branch_id')
+        }
+
+    async def sync_chat(self, chat_id: UUID, cursor: Optional[str], limit: int) -> Dict[str, Any]:
+        """
+        Messages and branch additions newer than ``cursor``, with the cursor
+        to pass next time. ``has_more`` is set when either list was cut at
+        ``limit``.
+        """
+        messages, branches = parse_sync_cursor(cursor)
+
+        content = await chat_archive.load(
+            chat_id, lambda: ChatContentRepository.get_changes_since(chat_id, messages, branches, limit)
+        )
+        if not content:
+            raise HTTPException(status_code=404, detail="Chat content not found")
+
+        qa_pairs = content.get("qa_pairs", [])
+        branch_log = content.get("branch_log", [])
+        return {
+            "chat_id": chat_id,
+            "qa_pairs": qa_pairs,
+            "branches": branch_log,
+            "active_branch_id": content.get("active_branch_id"),
+            "cursor": f"{messages + len(qa_pairs)}.{branches + len(branch_log)}",
+            "has_more": len(qa_pairs) >= limit or len(branch_log) >= limit,
         }
 
     async def update_chat(self, chat_id: UUID, update_data: Dict[str, Any]) -> Chat:
@@ -67,14 +165,17 @@ class ChatService:
         
         # Delete chat content from MongoDB
         await ChatContentRepository.delete_chat_content(chat_id)
+        await self._chat_versions().forget(chat_id)
         
         # Delete chat from PostgreSQL
         result = await self.chat_repo.delete_chat(chat_id)
+        if result:
+            await self._audit(audit.CHAT_DELETED, chat_id, account_id)
         
         return result
 
-    async def get_user_chats(self, account_id: UUID) -> List[Chat]:
-        return await self.chat_repo.get_user_chats(account_id)
+    async def get_user_chats(self, account_id: UUID, limit: Optional[int] = None, offset: int = 0) -> List[Chat]:
+        return await self.chat_repo.get_user_chats(account_id, limit=limit, offset=offset)
 
     async def add_message(self, chat_id: UUID, question: str, response: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         chat = await self.get_chat(chat_id)  # This will raise 404 if not found
@@ -82,16 +183,32 @@ class ChatService:
         # Generate a unique response ID
         response_id = str(uuid.uuid4())
         
-        # Add message to MongoDB
-        message = await ChatContentRepository.add_message(
+        # Add message to MongoDB, moving an archived chat back first if needed
+        expires_at = await self._expires_at(chat.account_id)
+        message = await chat_archive.load(chat_id, lambda: ChatContentRepository.add_message(
             chat_id=chat_id,
             question=question,
             response=response,
             response_id=response_id,
-            metadata=metadata
-        )
-        # Update chat's updated_at timestamp
-        await self.chat_repo.update_chat(chat_id, {"updated_at": None})  # The repository will set the current timestamp
+            metadata=metadata,
+            expires_at=expires_at
+        ))
+        if message is None:
+            raise HTTPException(status_code=404, detail="Chat content not found")
+        await self._chat_versions().bump(chat_id)
+        # Update chat's updated_at timestamp and its counters in one statement
+        await self.chat_repo.update_chat(chat_id, {
+            "message_count": Chat.message_count + 1,
+            "bytes_stored": Chat.bytes_stored + message_size(question, response),
+            "last_message_at": message["timestamp"],
+        })  # The repository will set updated_at
+        await self._publish(chat_id, MESSAGE_ADDED, {
+            "response_id": response_id,
+            "question": question,
+            "response": response,
+            "timestamp": message["timestamp"],
+        })
+        await self._audit(audit.MESSAGE_ADDED, chat_id, chat.account_id, {"response_id": response_id})
         
         return {
             "chat_id": chat_id,
@@ -107,7 +224,9 @@ class ChatService:
         parent_chat = await self.get_chat(chat_id)
         
         # Check if the response exists in the chat
-        qa_pair = await ChatContentRepository.get_qa_pair_by_response_id(chat_id, response_id)
+        qa_pair = await chat_archive.load(
+            chat_id, lambda: ChatContentRepository.get_qa_pair_by_response_id(chat_id, response_id)
+        )
         if not qa_pair:
             raise HTTPException(status_code=404, detail="Oops! Given Response not found")
         
@@ -116,7 +235,8 @@ class ChatService:
         branch_chat = await self.create_chat(
             account_id=account_id,
             name=branch_name,
-            chat_type=ChatType.BRANCH
+            chat_type=ChatType.BRANCH,
+            lineage={"parent_chat_id": str(chat_id), "parent_response_id": response_id}
         )
         
         # Create conversation record linking the branch to the parent
@@ -131,13 +251,32 @@ class ChatService:
         await ChatContentRepository.add_branch_to_message(chat_id, response_id, branch_chat.id)
         
         # Copy the parent message content to the branch
-        await ChatContentRepository.add_message(
+        copied = await ChatContentRepository.add_message(
             chat_id=branch_chat.id,
             question=qa_pair["question"],
             response=qa_pair["response"],
             response_id=str(uuid.uuid4()),  # Generate a new response ID for the branch
-            metadata=qa_pair.get("metadata")  # Copy metadata if present
+            metadata=qa_pair.get("metadata"),  # Copy metadata if present
+            expires_at=await self._expires_at(account_id)
         )
+
+        await self.chat_repo.record_branch(
+            parent_chat_id=chat_id,
+            branch_chat_id=branch_chat.id,
+            response_id=response_id,
+            copied_bytes=message_size(qa_pair["question"], qa_pair["response"]),
+            copied_at=copied["timestamp"],
+        )
+        await self._chat_versions().bump(chat_id, branch_chat.id)
+        await self._publish(chat_id, BRANCH_CREATED, {
+            "response_id": response_id,
+            "branch_chat_id": str(branch_chat.id),
+            "name": branch_name,
+        })
+        await self._audit(audit.BRANCH_CREATED, chat_id, account_id, {
+            "response_id": response_id,
+            "branch_chat_id": str(branch_chat.id),
+        })
         
         return {
             "branch_id": branch_chat.id,
@@ -147,32 +286,103 @@ class ChatService:
             "created_at": datetime.now(timezone.utc)
         }   
 
-    async def get_branches(self, chat_id: UUID) -> List[Chat]:
+    async def create_branches(
+        self,
+        chat_id: UUID,
+        branches: List[Dict[str, Any]],
+        account_id: UUID,
+        parent_chat: Optional[Chat] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Fork the chat at many responses at once. Each item has a
+        ``response_id`` and an optional ``name``.
+
+        All responses are validated with one MongoDB query before anything
+        is written; the branch chats and conversations are then inserted in
+        one PostgreSQL transaction, their content in one insert and the branch
+        references on the parent in one bulk write.
+        """
+        if parent_chat is None:
+            parent_chat = await self.get_chat(chat_id)
+
+        response_ids = [branch["response_id"] for branch in branches]
+        qa_pairs = await chat_archive.load(
+            chat_id, lambda: ChatContentRepository.get_qa_pairs_by_response_ids(chat_id, response_ids)
+        )
+        missing = sorted(set(response_ids) - set(qa_pairs))
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Responses not found: {', '.join(missing)}")
+
+        copied_at = datetime.now(timezone.utc)
+        copies = []
+        for branch in branches:
+            qa_pair = qa_pairs[branch["response_id"]]
+            message = {
+                "question": qa_pair["question"],
+                "response": qa_pair["response"],
+                "response_id": str(uuid.uuid4()),  # Generate a new response ID for the branch
+                "timestamp": copied_at,
+                "branches": [],
+            }
+            if qa_pair.get("metadata"):
+                message["metadata"] = qa_pair["metadata"]
+            copies.append({
+                "response_id": branch["response_id"],
+                "name": branch.get("name") or f"Branch of {parent_chat.name}",
+                "message": message,
+                "copied_bytes": message_size(qa_pair["question"], qa_pair["response"]),
+                "copied_at": copied_at,
+            })
+
+        branch_chats = await self.chat_repo.create_branches(chat_id, account_id, copies)
+        for copy, branch_chat in zip(copies, branch_chats):
+            copy["branch_chat_id"] = branch_chat.id
+
+        await ChatContentRepository.create_branch_contents(chat_id, copies, await self._expires_at(account_id))
+        await ChatContentRepository.add_branches_to_messages(
+            chat_id, [(copy["response_id"], copy["branch_chat_id"]) for copy in copies]
+        )
+
+        await self._chat_versions().bump(chat_id, *(copy["branch_chat_id"] for copy in copies))
+        await self._publish(chat_id, BRANCH_CREATED, *(
+            {"response_id": copy["response_id"], "branch_chat_id": str(copy["branch_chat_id"]), "name": copy["name"]}
+            for copy in copies
+        ))
+        for copy in copies:
+            await self._audit(audit.BRANCH_CREATED, chat_id, account_id, {
+                "response_id": copy["response_id"],
+                "branch_chat_id": str(copy["branch_chat_id"]),
+            })
+
+        return [
+            {
+                "branch_id": branch_chat.id,
+                "parent_chat_id": chat_id,
+                "parent_response_id": copy["response_id"],
+                "name": copy["name"],
+                "created_at": branch_chat.created_at
+            }
+            for copy, branch_chat in zip(copies, branch_chats)
+        ]
+
+    async def get_branches(self, chat_id: UUID) -> List[Dict[str, Any]]:
         # Get the chat to verify it exists
         await self.get_chat(chat_id)
-        
-        # Get chat content
-        content = await ChatContentRepository.get_chat_content(chat_id)
-        if not content:
-            return []
-            
-        # Extract branch IDs from all messages
-        branch_ids = set()
-        for qa_pair in content.get("qa_pairs", []):
-            branch_ids.update(qa_pair.get("branches", []))
-            
-        # Get branch chats
-        branches = []
-        for branch_id in branch_ids:
-            try:
-                branch = await self.chat_repo.get_chat(UUID(branch_id))
-                if branch:
-                    branches.append(branch)
-            except ValueError:
-                # Invalid UUID, skip
-                pass
-                
-        return branches
+
+        # One indexed lookup on branch_edges, joined to the branch chats
+        edges = await self.chat_repo.get_branch_edges(chat_id)
+        if not edges:
+            edges = await self._add_missing_branch_edges(chat_id)
+        return [
+            {
+                "branch_id": branch.id,
+                "parent_chat_id": chat_id,
+                "parent_response_id": edge.response_id,
+                "name": branch.name,
+                "created_at": edge.created_at
+            }
+            for edge, branch in edges
+        ]
 
     async def build_branch_tree(self, chat_id: UUID) -> BranchTreeNode:
         # Get the chat to verify it exists
@@ -181,19 +391,13 @@ class ChatService:
         # Get all branches for this chat
         branches = await self.get_branches(chat_id)
         
-        # Build a map of branch IDs to chats
-        branch_map = {str(branch.id): branch for branch in branches}
+        # Build a map of branch IDs to branches
+        branch_map = {str(branch["branch_id"]): branch for branch in branches}
         
         # Get chat content to find parent-child relationships
-        content = await ChatContentRepository.get_chat_content(chat_id)
-        
-        # Map of response_id to branches
-        response_branches = {}
-        if content:
-            for qa_pair in content.get("qa_pairs", []):
-                response_id = qa_pair.get("response_id")
-                if response_id:
-                    response_branches[response_id] = qa_pair.get("branches", [])
+        content = await self._branch_references(chat_id)
+        if not content:
+            raise HTTPException(status_code=404, detail="Chat content not found")
         
         # Create the root node
         root_node = BranchTreeNode(
@@ -209,13 +413,13 @@ class ChatService:
                 if branch_id in branch_map:
                     branch = branch_map[branch_id]
                     child_node = BranchTreeNode(
-                        id=branch.id,
-                        name=branch.name,
+                        id=branch["branch_id"],
+                        name=branch["name"],
                         parent_id=node.id,
                         children=[]
                     )
                     # Get child branches
-                    branch_content = await ChatContentRepository.get_chat_content(branch.id)
+                    branch_content = await self._branch_references(branch["branch_id"])
                     if branch_content:
                         for qa in branch_content.get("qa_pairs", []):
                             await build_tree(child_node, qa.get("branches", []))
@@ -227,19 +431,45 @@ class ChatService:
             await build_tree(root_node, qa_pair.get("branches", []))
             
         return root_node 
+
+    @staticmethod
+    async def _branch_references(chat_id: UUID) -> Optional[Dict[str, Any]]:
+        return await chat_archive.load(
+            chat_id, lambda: ChatContentRepository.get_chat_content(chat_id, BRANCH_REFERENCES_PROJECTION)
+        )
     
+    async def _add_missing_branch_edges(self, chat_id: UUID) -> List[Tuple[BranchEdge, Chat]]:
+        """
+        Index the branches a chat's content references but branch_edges
+        lacks, i.e. ones made before it existed and not yet backfilled, and
+        return the chat's edges.
+
+        Read-only endpoints may be running on a replica session, so the edges
+        are written and read back through a primary session of their own.
+        """
+        content = await self._branch_references(chat_id)
+        references = branch_references(chat_id, content or {})
+        if not references:
+            return []
+        async with async_session() as session:
+            chat_repo = ChatRepository(session)
+            await chat_repo.add_missing_branch_edges(references)
+            return await chat_repo.get_branch_edges(chat_id)
+
     async def set_active_branch(self, chat_id: UUID, branch_id: UUID) -> bool:
         # First verify the chat exists
         chat = await self.get_chat(chat_id)
         
-        # Check if this branch belongs to the chat
-        branches = await self.get_branches(chat_id)
-        branch_exists = any(str(branch.id) == str(branch_id) for branch in branches)
-        
-        if not branch_exists:
+        # Check if this branch belongs to the chat, by its edge's primary key
+        if not await self.chat_repo.has_branch(chat_id, branch_id) and not any(
+            edge.branch_chat_id == branch_id for edge, _ in await self._add_missing_branch_edges(chat_id)
+        ):
             raise HTTPException(status_code=404, detail="Branch not found for this chat")
         
         # Update the active branch in MongoDB
-        result = await ChatContentRepository.set_active_branch(chat_id, branch_id)
+        result = await chat_archive.load(chat_id, lambda: ChatContentRepository.set_active_branch(chat_id, branch_id))
+        if result:
+            await self._chat_versions().bump(chat_id)
+            await self._publish(chat_id, ACTIVE_BRANCH_CHANGED, {"active_branch_id": str(branch_id)})
         
         return result
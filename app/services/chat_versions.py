@@ -0,0 +1,124 @@
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.db.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "chat-version:"
+
+
+def _seed() -> int:
+    # Counters start from the clock, so a counter recreated after expiry or a
+    # Redis restart never reissues a version a client may still hold
+    return time.time_ns() // 1_000_000
+
+
+def make_etag(version: int, updated_at: Optional[datetime]) -> str:
+    """
+    Weak ETag of a get-chat response: the content version plus the chat's
+    ``updated_at``, which moves on metadata changes (rename, settings).
+    """
+    stamp = int(updated_at.timestamp() * 1_000_000) if updated_at else 0
+    return f'W/"{version}-{stamp}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of ``etag`` against an If-None-Match header."""
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+class ChatVersionIndex:
+    """
+    Per-chat content version counters, bumped on every write to a chat's
+    MongoDB document, so conditional get-chat requests are answered from
+    here without reading the content.
+
+    The "redis" backend is shared by all workers; counters expire ``ttl``
+    seconds after the last write and are recreated on demand.
+    The "memory" backend keeps a bounded LRU per process and is only correct
+    with a single worker. A Redis outage disables conditional responses; it
+    never fails a request.
+    """
+
+    def __init__(self, backend: str, ttl: int, max_entries: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local: "OrderedDict[str, int]" = OrderedDict()
+
+    async def current(self, chat_id: UUID) -> Optional[int]:
+        """The chat's current version, created if the chat has none yet."""
+        if self.backend == "memory":
+            return self._local_touch(str(chat_id))
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                pipe.set(f"{KEY_PREFIX}{chat_id}", _seed(), nx=True, ex=self.ttl)
+                pipe.get(f"{KEY_PREFIX}{chat_id}")
+                _, version = await pipe.execute()
+        except RedisError as exc:
+            logger.warning("Chat version lookup failed: %s", exc)
+            return None
+        return int(version) if version is not None else None
+
+    async def bump(self, *chat_ids: UUID) -> None:
+        """Record that the content of these chats changed."""
+        if self.backend == "memory":
+            for chat_id in chat_ids:
+                key = str(chat_id)
+                self._local[key] = self._local_touch(key) + 1
+            return
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                for chat_id in chat_ids:
+                    key = f"{KEY_PREFIX}{chat_id}"
+                    pipe.set(key, _seed(), nx=True)
+                    pipe.incr(key)
+                    pipe.expire(key, self.ttl)
+                await pipe.execute()
+        except RedisError as exc:
+            # The chat's metadata timestamp still moves on new messages, so
+            # the ETag changes for those even when this bump is lost
+            logger.warning("Chat version bump failed: %s", exc)
+
+    async def forget(self, chat_id: UUID) -> None:
+        if self.backend == "memory":
+            self._local.pop(str(chat_id), None)
+            return
+        try:
+            await get_redis().delete(f"{KEY_PREFIX}{chat_id}")
+        except RedisError as exc:
+            logger.warning("Chat version delete failed: %s", exc)
+
+    def clear_local(self) -> None:
+        self._local.clear()
+
+    def _local_touch(self, key: str) -> int:
+        version = self._local.get(key)
+        if version is None:
+            version = self._local[key] = _seed()
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+        return version
+
+
+chat_versions = ChatVersionIndex(
+    backend=settings.CHAT_VERSION_BACKEND,
+    ttl=settings.CHAT_VERSION_TTL_SECONDS,
+    max_entries=settings.CHAT_VERSION_MAX_ENTRIES,
+)
@@ -0,0 +1,155 @@
+import logging
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from app.core.config import settings
+from app.repositories.chat_repository import ChatContentRepository
+from app.services.chat_archive import chat_archive
+from app.utils.helpers import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on turns folded into the summary by a single request, so a long
+# legacy chat catches up over several requests instead of one slow one
+MAX_TURNS_PER_FOLD = 100
+
+
+class ContextService:
+    """
+    Assembles the conversation context sent with an AI call.
+
+    Only the latest turns are read (sliced by MongoDB), newest first, until
+    ``AI_CONTEXT_MAX_TURNS`` or ``AI_CONTEXT_TOKEN_BUDGET`` is reached. When a
+    branch runs out of turns, context continues in its parent chat before the
+    fork point. Older turns are represented by a rolling summary that is
+    extended in batches as turns leave the window, by ``refresh_summary``
+    after the response has been sent.
+    """
+
+    def __init__(
+        self,
+        max_turns: Optional[int] = None,
+        token_budget: Optional[int] = None,
+        max_ancestors: Optional[int] = None
+    ):
+        self.max_turns = max_turns or settings.AI_CONTEXT_MAX_TURNS
+        self.token_budget = token_budget or settings.AI_CONTEXT_TOKEN_BUDGET
+        self.max_ancestors = settings.AI_CONTEXT_MAX_ANCESTORS if max_ancestors is None else max_ancestors
+
+    async def build_context(self, chat_id: UUID) -> Dict[str, Any]:
+        """
+        Returns:
+            ``{"summary", "turns", "tokens"}`` with turns oldest first
+        """
+        document = await chat_archive.load(
+            chat_id, lambda: ChatContentRepository.get_context_window(chat_id, self.max_turns)
+        )
+        if not document:
+            return {"summary": None, "turns": [], "tokens": 0}
+
+        turns: List[Dict[str, Any]] = []
+        tokens = 0
+        summary = None
+        current_id, depth = chat_id, 0
+        while True:
+            window = document.get("qa_pairs", [])
+            window_start = self._window_start(document, window)
+
+            taken = 0
+            full = False
+            for turn in reversed(window):
+                cost = estimate_tokens(turn["question"]) + estimate_tokens(turn["response"])
+                if len(turns) >= self.max_turns or tokens + cost > self.token_budget:
+                    full = True
+                    break
+                turns.append({"question": turn["question"], "response": turn["response"]})
+                tokens += cost
+                taken += 1
+            oldest_index = window_start + len(window) - taken
+
+            if not full and len(turns) < self.max_turns and oldest_index == 0 and depth < self.max_ancestors:
+                parent = await self._parent_window(current_id, document, self.max_turns - len(turns))
+                if parent is not None:
+                    current_id, document = parent
+                    depth += 1
+                    continue
+
+            # Older turns are only represented by a summary that ends before
+            # the oldest turn we kept
+            summary_upto = document.get("summary_upto") or 0
+            if document.get("summary") and summary_upto <= oldest_index:
+                summary = document["summary"]
+            break
+
+        if summary:
+            summary_tokens = estimate_tokens(summary)
+            if tokens + summary_tokens <= self.token_budget:
+                tokens += summary_tokens
+            else:
+                summary = None
+
+        turns.reverse()
+        return {"summary": summary, "turns": turns, "tokens": tokens}
+
+    @staticmethod
+    def _window_start(document: Dict[str, Any], window: List[Dict[str, Any]]) -> int:
+        if "window_start" in document:
+            return document["window_start"]
+        return max(0, document.get("qa_count", len(window)) - len(window))
+
+    async def _parent_window(self, chat_id: UUID, document: Dict[str, Any], limit: int):
+        parent_id = document.get("parent_chat_id")
+        if not parent_id:
+            return None
+        parent_id = UUID(parent_id)
+
+        # The branch starts with a copy of the fork turn, so the parent
+        # contributes the turns before it
+        fork_index = document.get("parent_turn_index")
+        if fork_index is None:
+            fork_index = await chat_archive.load(
+                parent_id,
+                lambda: ChatContentRepository.get_turn_index(parent_id, document.get("parent_response_id")),
+                found=lambda index: index is not None
+            )
+            if fork_index is None:
+                return None
+            await ChatContentRepository.set_parent_turn_index(chat_id, fork_index)
+
+        parent = await chat_archive.load(
+            parent_id, lambda: ChatContentRepository.get_context_window(parent_id, limit, end=fork_index)
+        )
+        if not parent:
+            return None
+        parent["window_start"] = max(0, fork_index - limit)
+        return parent_id, parent
+
+    async def refresh_summary(self, chat_id: UUID) -> None:
+        """
+        Fold turns that have left the context window into the rolling summary.
+
+        Makes an AI call, so it runs as a background task after the response;
+        until it is written, contexts use the previous summary.
+        """
+        try:
+            # Only the context fields are needed
+            document = await ChatContentRepository.get_context_window(chat_id, 1)
+            if not document or document.get("qa_count") is None:
+                return
+
+            summary_upto = document.get("summary_upto") or 0
+            fold_end = min(document["qa_count"] - self.max_turns, summary_upto + MAX_TURNS_PER_FOLD)
+            if fold_end - summary_upto < settings.AI_SUMMARY_BATCH_TURNS:
+                return
+
+            older = await ChatContentRepository.get_context_window(chat_id, fold_end - summary_upto, end=fold_end)
+            if not older or not older.get("qa_pairs"):
+                return
+
+            from app.utils.mock_ai import generate_summary
+
+            summary = await generate_summary(document.get("summary"), older["qa_pairs"], settings.AI_SUMMARY_MAX_TOKENS)
+            # Guarded by summary_upto, so concurrent refreshes fold each batch once
+            await ChatContentRepository.update_summary(chat_id, summary, fold_end, summary_upto)
+        except Exception:
+            logger.exception("Could not refresh the summary of chat %s", chat_id)
@@ -0,0 +1,60 @@
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.user import User
+
+# Cached account settings kept per worker before the cache is cleared
+MAX_CACHED_ACCOUNTS = 10000
+
+
+class RetentionPolicy:
+    """
+    How long an account's chat content is kept after its last message.
+
+    ``default_days`` applies to everyone unless ``account_overrides`` is set,
+    in which case an account's ``retention_days`` (when not null) wins; 0
+    keeps content forever. Account settings are cached per worker for
+    ``cache_seconds``, so a change takes that long to apply to new writes;
+    content written before keeps its expiry until
+    ``python -m app.db.purge_expired_chats --restamp`` recomputes it.
+    """
+
+    def __init__(self, default_days: int, account_overrides: bool, cache_seconds: float):
+        self.default_days = default_days
+        self.account_overrides = account_overrides
+        self.cache_seconds = cache_seconds
+        self._accounts: Dict[UUID, Tuple[Optional[int], float]] = {}
+
+    async def days_for(self, session: AsyncSession, account_id: UUID) -> int:
+        if not self.account_overrides:
+            return self.default_days
+        cached = self._accounts.get(account_id)
+        if cached is not None and cached[1] > time.monotonic():
+            days = cached[0]
+        else:
+            result = await session.execute(select(User.retention_days).where(User.id == account_id))
+            days = result.scalar()
+            if len(self._accounts) >= MAX_CACHED_ACCOUNTS:
+                self._accounts.clear()
+            self._accounts[account_id] = (days, time.monotonic() + self.cache_seconds)
+        return self.default_days if days is None else days
+
+    async def expires_at(self, session: AsyncSession, account_id: UUID) -> Optional[datetime]:
+        """When content written now expires, or None to keep it."""
+        days = await self.days_for(session, account_id)
+        if days <= 0:
+            return None
+        return datetime.now(timezone.utc) + timedelta(days=days)
+
+
+retention_policy = RetentionPolicy(
+    default_days=settings.RETENTION_DAYS,
+    account_overrides=settings.RETENTION_ACCOUNT_OVERRIDES,
+    cache_seconds=settings.RETENTION_CACHE_SECONDS,
+)
@@ -32,7 +32,7 @@ class UserService:
             return None
             
         if not user:
-            return ModuleNotFoundError
+            return None
             
         if not verify_password(password, user.hashed_password):
             return None
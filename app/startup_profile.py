@@ -0,0 +1,98 @@
+"""
+Import-time profile of the application.
+
+    python -m app.startup_profile [--module app.main] [--top 25] [--json]
+
+Imports the module in a fresh interpreter with ``-X importtime`` and reports
+the slowest imports by cumulative and self time, the total import time and
+the peak memory of that interpreter. Use it to check that rarely used
+subsystems stay out of the worker cold start.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+
+def parse_importtime(output: str) -> List[Dict[str, Any]]:
+    """Parse ``-X importtime`` lines into ``{module, self_us, cumulative_us, depth}``."""
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+        })
+    return entries
+
+
+def profile(module: str) -> Dict[str, Any]:
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise SystemExit(f"importing {module} failed:\n{result.stderr}")
+
+    entries = parse_importtime(result.stderr)
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    max_rss_mb = max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+    return {
+        "module": module,
+        "wall_ms": round(wall_ms, 1),
+        "import_ms": round(sum(e["self_us"] for e in entries) / 1000, 1),
+        "modules_imported": len(entries),
+        "max_rss_mb": round(max_rss_mb, 1),
+        "entries": entries,
+    }
+
+
+def top(entries: List[Dict[str, Any]], key: str, count: int) -> List[Dict[str, Any]]:
+    return sorted(entries, key=lambda e: e[key], reverse=True)[:count]
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--json", action="store_true", help="machine-readable output")
+    args = parser.parse_args(argv)
+
+    report = profile(args.module)
+    # Top-level packages only, so the report reads as "who costs what"
+    packages: Dict[str, int] = {}
+    for entry in report["entries"]:
+        package = entry["module"].split(".")[0]
+        packages[package] = packages.get(package, 0) + entry["self_us"]
+    report["packages"] = dict(sorted(packages.items(), key=lambda item: item[1], reverse=True))
+
+    if args.json:
+        report["entries"] = top(report["entries"], "cumulative_us", args.top)
+        print(json.dumps(report, indent=2))
+        return 0
+
+    print(f"import {report['module']}: {report['import_ms']} ms in {report['modules_imported']} modules, "
+          f"process wall {report['wall_ms']} ms, max RSS {report['max_rss_mb']} MB\n")
+    print("By package (self time):")
+    for package, self_us in list(report["packages"].items())[:args.top]:
+        print(f"  {self_us / 1000:9.1f} ms  {package}")
+    print("\nBy module (cumulative time):")
+    for entry in top(report["entries"], "cumulative_us", args.top):
+        print(f"  {entry['cumulative_us'] / 1000:9.1f} ms  {entry['module']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
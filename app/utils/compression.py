@@ -0,0 +1,64 @@
+from functools import lru_cache
+from typing import Any, Dict, Optional, Union
+
+from app.core.config import settings
+
+# Message fields that may be stored compressed
+COMPRESSED_FIELDS = ("question", "response")
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+@lru_cache(maxsize=None)
+def _zstd():
+    # zstandard is only needed once a chat holds a long message
+    import zstandard
+
+    return (
+        zstandard.ZstdCompressor(level=settings.CONTENT_COMPRESSION_LEVEL),
+        zstandard.ZstdDecompressor(),
+    )
+
+
+def compress_text(text: str, min_bytes: Optional[int] = None) -> Union[str, bytes]:
+    """
+    zstd-compress ``text`` if its UTF-8 encoding is at least ``min_bytes``
+    long and compression actually saves space; otherwise return it as is.
+    """
+    min_bytes = settings.CONTENT_COMPRESSION_MIN_BYTES if min_bytes is None else min_bytes
+    if not min_bytes or len(text) * 4 < min_bytes:
+        return text
+    encoded = text.encode("utf-8")
+    if len(encoded) < min_bytes:
+        return text
+    compressed = _zstd()[0].compress(encoded)
+    return compressed if len(compressed) < len(encoded) else text
+
+
+def decompress_text(value: Union[str, bytes]) -> str:
+    """Inverse of ``compress_text``; plain strings pass through."""
+    if isinstance(value, (bytes, bytearray)) and value[:4] == ZSTD_MAGIC:
+        return _zstd()[1].decompress(bytes(value)).decode("utf-8")
+    return value
+
+
+def compress_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    for field in COMPRESSED_FIELDS:
+        if isinstance(message.get(field), str):
+            message[field] = compress_text(message[field])
+    return message
+
+
+def decompress_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    for field in COMPRESSED_FIELDS:
+        if field in message:
+            message[field] = decompress_text(message[field])
+    return message
+
+
+def compress_bytes(data: bytes) -> bytes:
+    return _zstd()[0].compress(data)
+
+
+def decompress_bytes(data: bytes) -> bytes:
+    return _zstd()[1].decompress(data)
@@ -2,7 +2,7 @@ import uuid
 from functools import wraps
 from typing import Any, Callable
 
-from fastapi_cache.decorator import cache
+from app.db.redis import get_redis
 
 
 def generate_unique_id() -> str:
@@ -10,6 +10,20 @@ def generate_unique_id() -> str:
     return str(uuid.uuid4())
 
 
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting prompts (about 4 characters per token)."""
+    return (len(text) + 3) // 4 if text else 0
+
+
+def init_cache() -> None:
+    """Initialise FastAPI-cache with the shared Redis client, once per worker."""
+    from fastapi_cache import FastAPICache
+    from fastapi_cache.backends.redis import RedisBackend
+
+    if getattr(FastAPICache, "_backend", None) is None:
+        FastAPICache.init(RedisBackend(get_redis()), prefix="fastapi-cache")
+
+
 def cached(
     expire: int = 60,
     namespace: str = "api",
@@ -17,6 +31,9 @@ def cached(
 ):
     """
     Cache decorator that uses FastAPI-cache with custom defaults.
+
+    FastAPI-cache and its backend are imported and initialised on the first
+    call of a decorated function rather than at application startup.
     
     Args:
         expire: Cache expiration time in seconds
@@ -26,4 +43,19 @@ def cached(
     Returns:
         Decorated function with caching
     """
-    return cache(expire=expire, namespace=namespace, key_builder=key_builder) 
\ No newline at end of file
+    def decorator(func: Callable) -> Callable:
+        cached_func = None
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs) -> Any:
+            nonlocal cached_func
+            if cached_func is None:
+                from fastapi_cache.decorator import cache
+
+                init_cache()
+                cached_func = cache(expire=expire, namespace=namespace, key_builder=key_builder)(func)
+            return await cached_func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,6 +1,10 @@
 import random
 import asyncio
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+
+from app.core.config import settings
+from app.core.metrics import track_ai_call
+from app.utils.helpers import estimate_tokens
 
 # Mock responses based on keywords
 MOCK_RESPONSES = {
@@ -41,19 +45,22 @@ DEFAULT_RESPONSES = [
 ]
 
 
-async def generate_ai_response(question: str) -> Dict[str, Any]:
+@track_ai_call("mock_ai")
+async def generate_ai_response(question: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Simulates an AI service call by analyzing the question and returning 
     a relevant response based on keywords.
     
     Args:
         question: The user's question
+        context: Prior conversation as assembled by ContextService
+            (``summary`` and ``turns``, oldest first)
         
     Returns:
         Dict with response and metadata
     """
     # Add a small delay to simulate network latency
-    await asyncio.sleep(0.3)
+    await asyncio.sleep(settings.MOCK_AI_LATENCY_MS / 1000)
     
     # Convert to lowercase for case-insensitive matching
     question_lower = question.lower()
@@ -75,4 +82,23 @@ async def generate_ai_response(question: str) -> Dict[str, Any]:
         "confidence": random.uniform(0.5, 0.7),
         "source": "mock_ai",
         "processing_time_ms": random.randint(100, 500)
-    } 
\ No newline at end of file
+    } 
+
+
+@track_ai_call("mock_ai")
+async def generate_summary(previous_summary: Optional[str], turns: List[Dict[str, Any]], max_tokens: int) -> str:
+    """
+    Simulates summarising conversation turns into a rolling summary.
+
+    The summary is extended with one line per turn and trimmed from the
+    oldest end so it stays within ``max_tokens``.
+    """
+    await asyncio.sleep(settings.MOCK_AI_LATENCY_MS / 1000)
+
+    lines = previous_summary.splitlines() if previous_summary else []
+    for turn in turns:
+        lines.append(f"User asked: {turn['question'][:120]} / Assistant: {turn['response'][:120]}")
+
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
@@ -0,0 +1,5 @@
+"""
+Performance benchmarks for the Chat Application API.
+
+Run ``python -m benchmarks.load --help`` for the load and latency harness.
+"""
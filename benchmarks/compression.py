@@ -0,0 +1,185 @@
+"""
+CPU cost versus bytes saved for message storage and HTTP response compression.
+
+Measures, on synthetic chat content:
+  * zstd levels for individual message bodies of various sizes (storage)
+  * gzip levels and brotli qualities for get-chat JSON payloads (HTTP)
+
+Examples:
+    python -m benchmarks.compression
+    python -m benchmarks.compression --messages 200 --repeat 20 --output compression.json
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from uuid import uuid4
+
+import orjson
+
+WORDS = (
+    "the a to of and in is it you that for on with as this be are can your not have or from "
+    "conversation branch message response question answer context model token summary chat "
+    "account weather help thanks hello python request latency cache database replica index"
+).split()
+
+BODY_SIZES = (256, 1024, 4096, 16384)
+
+
+def synthetic_text(rng: random.Random, size: int) -> str:
+    words = []
+    length = 0
+    while length <= size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:size]
+
+
+def chat_payload(rng: random.Random, messages: int, response_size: int) -> bytes:
+    """A get-chat response body as the API serializes it."""
+    return orjson.dumps({
+        "chat": {
+            "id": str(uuid4()),
+            "name": "benchmark chat",
+            "chat_type": "personal",
+            "account_id": str(uuid4()),
+            "created_at": datetime.now(timezone.utc),
+            "updated_at": datetime.now(timezone.utc),
+            "active": True,
+        },
+        "qa_pairs": [
+            {
+                "question": synthetic_text(rng, rng.randint(20, 200)),
+                "response": synthetic_text(rng, rng.randint(response_size // 2, response_size)),
+                "response_id": str(uuid4()),
+                "timestamp": datetime.now(timezone.utc),
+                "branches": [],
+            }
+            for _ in range(messages)
+        ],
+        "active_branch_id": None,
+    }, option=orjson.OPT_UTC_Z)
+
+
+def measure(compress: Callable[[bytes], bytes], decompress: Callable[[bytes], bytes],
+            samples: List[bytes], repeat: int) -> Dict[str, Any]:
+    original = sum(len(sample) for sample in samples)
+    compressed = [compress(sample) for sample in samples]
+    stored = sum(len(item) for item in compressed)
+
+    started = time.process_time()
+    for _ in range(repeat):
+        for sample in samples:
+            compress(sample)
+    compress_s = (time.process_time() - started) / repeat
+
+    started = time.process_time()
+    for _ in range(repeat):
+        for item in compressed:
+            decompress(item)
+    decompress_s = (time.process_time() - started) / repeat
+
+    megabytes = original / 1_000_000
+    return {
+        "original_bytes": original,
+        "compressed_bytes": stored,
+        "ratio": round(original / stored, 3) if stored else 0.0,
+        "saved_pct": round((1 - stored / original) * 100, 2) if original else 0.0,
+        "compress_cpu_ms": round(compress_s * 1000, 3),
+        "decompress_cpu_ms": round(decompress_s * 1000, 3),
+        "compress_mb_per_cpu_s": round(megabytes / compress_s, 1) if compress_s else None,
+        "decompress_mb_per_cpu_s": round(megabytes / decompress_s, 1) if decompress_s else None,
+    }
+
+
+def storage_codecs() -> Dict[str, Any]:
+    import zstandard
+
+    codecs = {}
+    for level in (1, 3, 6, 12):
+        compressor = zstandard.ZstdCompressor(level=level)
+        decompressor = zstandard.ZstdDecompressor()
+        codecs[f"zstd-{level}"] = (compressor.compress, decompressor.decompress)
+    return codecs
+
+
+def http_codecs() -> Dict[str, Any]:
+    def gzip_codec(level: int):
+        def compress(data: bytes) -> bytes:
+            compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            return compressor.compress(data) + compressor.flush()
+
+        return compress, lambda data: zlib.decompress(data, 16 + zlib.MAX_WBITS)
+
+    codecs = {f"gzip-{level}": gzip_codec(level) for level in (1, 6, 9)}
+    try:
+        import brotli
+    except ImportError:
+        return codecs
+    for quality in (1, 4, 6, 11):
+        codecs[f"br-{quality}"] = (
+            lambda data, quality=quality: brotli.compress(data, quality=quality),
+            brotli.decompress,
+        )
+    return codecs
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+
+    storage: Dict[str, Dict[str, Any]] = {}
+    for size in BODY_SIZES:
+        bodies = [synthetic_text(rng, size).encode() for _ in range(args.messages)]
+        storage[f"{size}B"] = {
+            name: measure(compress, decompress, bodies, args.repeat)
+            for name, (compress, decompress) in storage_codecs().items()
+        }
+
+    http: Dict[str, Dict[str, Any]] = {}
+    for messages in sorted({5, 50, args.messages}):
+        payloads = [chat_payload(rng, messages, args.response_size) for _ in range(5)]
+        http[f"get-chat-{messages}-messages"] = {
+            name: measure(compress, decompress, payloads, args.repeat)
+            for name, (compress, decompress) in http_codecs().items()
+        }
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "seed": args.seed,
+            "messages": args.messages,
+            "response_size": args.response_size,
+            "repeat": args.repeat,
+        },
+        "storage": storage,
+        "http": http,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100, help="message bodies per size / messages per large chat")
+    parser.add_argument("--response-size", type=int, default=2000, help="upper bound of response length in chats")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    output = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+In-process stand-ins for PostgreSQL, MongoDB and Redis.
+
+``configure_environment`` must run before anything under ``app`` is imported,
+because ``app.core.config.settings`` and the SQLAlchemy engine are created at
+import time. ``install_fakes`` then swaps the Motor client and collections and
+the Redis factory for in-memory equivalents.
+"""
+import os
+import sys
+import tempfile
+from typing import List, Optional, Tuple
+
+
+def configure_environment(workdir: Optional[str] = None) -> str:
+    """
+    Point the application at a throw-away SQLite database.
+
+    Returns:
+        The path of the SQLite file that replaces PostgreSQL
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix="chat-bench-")
+    db_path = os.path.join(workdir, "bench.db")
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite+aiosqlite:///{db_path}"
+    os.environ.setdefault("DEBUG", "False")
+    return db_path
+
+
+def accept_bulk_sort() -> None:
+    """
+    PyMongo 4.11+ passes ``sort`` when UpdateOne / ReplaceOne join a bulk
+    write, which mongomock's bulk builder doesn't take. The app never sorts
+    single-document bulk updates, so accept it only when unset.
+    """
+    from mongomock.collection import BulkOperationBuilder
+
+    for name in ("add_update", "add_replace", "add_delete"):
+        add = getattr(BulkOperationBuilder, name)
+        if getattr(add, "accepts_sort", False):
+            continue
+
+        def add_without_sort(self, *args, sort=None, _add=add, **kwargs):
+            if sort is not None:
+                raise NotImplementedError("mongomock bulk writes can't sort")
+            return _add(self, *args, **kwargs)
+
+        add_without_sort.accepts_sort = True
+        setattr(BulkOperationBuilder, name, add_without_sort)
+
+
+def install_fakes() -> None:
+    """
+    Replace the MongoDB and Redis clients used by the application with
+    in-memory fakes.
+
+    Every module under ``app`` that imported a Motor client, database or
+    collection by name gets its reference rebound, so repositories keep working
+    without knowing they are being benchmarked.
+    """
+    import fakeredis
+    import mongomock_motor
+    from motor import motor_asyncio
+    from redis import asyncio as aioredis
+
+    from app.core.config import settings
+    from app.db import mongodb
+
+    fake_client = mongomock_motor.AsyncMongoMockClient()
+    fake_db = fake_client[settings.MONGODB_DB]
+
+    # mongomock has no capped collections; create them as plain ones
+    create_collection = fake_db.create_collection
+
+    async def create_plain_collection(name, **options):
+        return await create_collection(name)
+
+    fake_db.create_collection = create_plain_collection
+
+    accept_bulk_sort()
+
+    replacements: List[Tuple[object, object]] = [
+        (mongodb.client, fake_client),
+        (mongodb.db, fake_db),
+    ]
+    for value in vars(mongodb).values():
+        if isinstance(value, motor_asyncio.AsyncIOMotorCollection):
+            replacements.append((value, fake_db[value.name]))
+
+    for name, module in list(sys.modules.items()):
+        if not name.startswith("app") or module is None:
+            continue
+        for attr, value in list(vars(module).items()):
+            for original, fake in replacements:
+                if value is original:
+                    setattr(module, attr, fake)
+                    break
+            else:
+                if isinstance(value, motor_asyncio.AsyncIOMotorCollection):
+                    setattr(module, attr, fake_db[value.name])
+
+    fake_server = fakeredis.FakeServer()
+
+    def from_url(url, **kwargs):
+        return fakeredis.aioredis.FakeRedis(server=fake_server, **kwargs)
+
+    aioredis.from_url = from_url
@@ -0,0 +1,387 @@
+"""
+Load and latency harness for the Chat Application API.
+
+Drives a weighted mix of create-chat, add-message, get-chat, create-branch and
+get-branch-tree calls (create-branches on request) at a fixed concurrency and reports p50/p95/p99 latency
+and throughput per endpoint as JSON.
+
+Examples:
+    # Boot app.main.app in-process against in-memory fakes
+    python -m benchmarks.load --requests 2000 --concurrency 16 --output bench.json
+
+    # Boot app.main.app in-process against the docker-compose databases
+    python -m benchmarks.load --backend containers
+
+    # Drive an already running server
+    python -m benchmarks.load --base-url http://localhost:8000
+
+    # Compare two runs and fail on p95 regressions above 10%
+    python -m benchmarks.load --compare baseline.json bench.json --threshold 0.10
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+API = "/api/v1"
+
+DEFAULT_MIX = {
+    "create-chat": 10,
+    "add-message": 35,
+    "get-chat": 30,
+    "create-branch": 10,
+    "get-branch-tree": 15,
+}
+# Also available through --mix; left out of the default so reports stay
+# comparable with ones recorded before it existed
+OPERATIONS = (*DEFAULT_MIX, "create-branches")
+
+QUESTIONS = [
+    "hello",
+    "Can you help me with my account?",
+    "What's the weather like today?",
+    "thanks!",
+    "Tell me something interesting about branching conversations.",
+    "bye",
+]
+
+PASSWORD = "Bench!Passw0rd"
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(samples)))
+    return samples[min(rank, len(samples)) - 1]
+
+
+def summarise(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    count = len(ordered)
+    return {
+        "count": count,
+        "errors": errors,
+        "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(ordered) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if count else 0.0,
+    }
+
+
+class Workload:
+    """State shared by the benchmark workers: auth headers and known chats."""
+
+    def __init__(self, client: httpx.AsyncClient, rng: random.Random):
+        self.client = client
+        self.rng = rng
+        self.headers: Dict[str, str] = {}
+        self.chats: List[str] = []
+        self.responses: Dict[str, List[str]] = defaultdict(list)
+        # Last ETag seen per chat; get-chat revalidates like a polling client
+        self.etags: Dict[str, str] = {}
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def login(self) -> None:
+        email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+        response = await self.client.post(
+            f"{API}/auth/register",
+            json={"email": email, "username": email.split("@")[0], "password": PASSWORD},
+        )
+        response.raise_for_status()
+        response = await self.client.post(
+            f"{API}/auth/login", data={"username": email, "password": PASSWORD}
+        )
+        response.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def seed(self, chats: int, messages: int) -> None:
+        for _ in range(chats):
+            await self.create_chat()
+        for chat_id in list(self.chats):
+            for _ in range(messages):
+                await self.add_message(chat_id)
+
+    async def create_chat(self) -> httpx.Response:
+        response = await self.client.post(
+            f"{API}/chats/create-chat",
+            json={"name": f"bench chat {len(self.chats)}", "chat_type": "personal"},
+            headers=self.headers,
+        )
+        if response.status_code < 400:
+            self.chats.append(response.json()["id"])
+        return response
+
+    async def add_message(self, chat_id: Optional[str] = None) -> httpx.Response:
+        chat_id = chat_id or self.rng.choice(self.chats)
+        response = await self.client.post(
+            f"{API}/messages/add-message",
+            json={"chat_id": chat_id, "question": self.rng.choice(QUESTIONS)},
+            headers=self.headers,
+        )
+        if response.status_code < 400:
+            self.responses[chat_id].append(response.json()["response_id"])
+        return response
+
+    async def get_chat(self) -> httpx.Response:
+        chat_id = self.rng.choice(self.chats)
+        headers = dict(self.headers)
+        if chat_id in self.etags:
+            headers["If-None-Match"] = self.etags[chat_id]
+        response = await self.client.get(
+            f"{API}/chats/get-chat",
+            params={"chat_id": chat_id},
+            headers=headers,
+        )
+        if "etag" in response.headers:
+            self.etags[chat_id] = response.headers["etag"]
+        return response
+
+    def branchable_chats(self) -> List[str]:
+        return [chat_id for chat_id in self.chats if self.responses[chat_id]]
+
+    async def create_branch(self) -> httpx.Response:
+        candidates = self.branchable_chats()
+        chat_id = self.rng.choice(candidates)
+        response = await self.client.post(
+            f"{API}/branches/create-branch",
+            json={"chat_id": chat_id, "response_id": self.rng.choice(self.responses[chat_id])},
+            headers=self.headers,
+        )
+        if response.status_code < 400:
+            self.chats.append(response.json()["id"])
+        return response
+
+    async def create_branches(self) -> httpx.Response:
+        chat_id = self.rng.choice(self.branchable_chats())
+        responses = self.responses[chat_id]
+        response_ids = self.rng.sample(responses, min(3, len(responses)))
+        response = await self.client.post(
+            f"{API}/branches/create-branches",
+            json={"chat_id": chat_id, "branches": [{"response_id": response_id} for response_id in response_ids]},
+            headers=self.headers,
+        )
+        if response.status_code < 400:
+            self.chats.extend(branch["id"] for branch in response.json())
+        return response
+
+    async def get_branch_tree(self) -> httpx.Response:
+        return await self.client.get(
+            f"{API}/branches/get-branch-tree",
+            params={"chat_id": self.rng.choice(self.chats)},
+            headers=self.headers,
+        )
+
+    async def execute(self, operation: str) -> None:
+        handlers = {
+            "create-chat": self.create_chat,
+            "add-message": self.add_message,
+            "get-chat": self.get_chat,
+            "create-branch": self.create_branch,
+            "create-branches": self.create_branches,
+            "get-branch-tree": self.get_branch_tree,
+        }
+        # No chat has a response to branch from yet (e.g. --seed-messages 0),
+        # so add one instead; it is timed as the add-message it is
+        if operation in ("create-branch", "create-branches") and not self.branchable_chats():
+            operation = "add-message"
+        handler = handlers[operation]
+        started = time.perf_counter()
+        try:
+            response = await handler()
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        self.latencies[operation].append(time.perf_counter() - started)
+        if failed:
+            self.errors[operation] += 1
+
+
+def build_schedule(mix: Dict[str, int], requests: int, seed: int) -> List[str]:
+    """Deterministic sequence of operations so runs are comparable."""
+    rng = random.Random(seed)
+    operations = list(mix)
+    return rng.choices(operations, weights=[mix[op] for op in operations], k=requests)
+
+
+async def run_workload(client: httpx.AsyncClient, args: argparse.Namespace) -> Dict[str, Any]:
+    random.seed(args.seed)
+    workload = Workload(client, random.Random(args.seed))
+    await workload.login()
+    await workload.seed(args.seed_chats, args.seed_messages)
+
+    schedule = build_schedule(args.mix, args.warmup, args.seed + 1)
+    for operation in schedule:
+        await workload.execute(operation)
+    workload.latencies.clear()
+    workload.errors.clear()
+
+    schedule = iter(build_schedule(args.mix, args.requests, args.seed))
+
+    async def worker() -> None:
+        for operation in schedule:
+            await workload.execute(operation)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    all_latencies = [value for values in workload.latencies.values() for value in values]
+    return {
+        "meta": collect_metadata(args, elapsed),
+        "endpoints": {
+            operation: summarise(workload.latencies[operation], workload.errors[operation], elapsed)
+            for operation in args.mix
+        },
+        "total": summarise(all_latencies, sum(workload.errors.values()), elapsed),
+    }
+
+
+def collect_metadata(args: argparse.Namespace, elapsed: float) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "target": args.base_url or f"in-process/{args.backend}",
+        "requests": args.requests,
+        "warmup": args.warmup,
+        "concurrency": args.concurrency,
+        "seed": args.seed,
+        "seed_chats": args.seed_chats,
+        "seed_messages": args.seed_messages,
+        "ai_latency_ms": args.ai_latency_ms,
+        "mix": args.mix,
+        "elapsed_s": round(elapsed, 3),
+    }
+
+
+async def run_in_process(args: argparse.Namespace) -> Dict[str, Any]:
+    os.environ["MOCK_AI_LATENCY_MS"] = str(args.ai_latency_ms)
+    if args.backend == "fakes":
+        from benchmarks.fakes import configure_environment, install_fakes
+
+        configure_environment()
+        import app.main  # noqa: F401  (import before patching so every module is loaded)
+
+        install_fakes()
+
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await run_workload(client, args)
+
+
+async def run_remote(args: argparse.Namespace) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30) as client:
+        return await run_workload(client, args)
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> Tuple[List[str], bool]:
+    """
+    Compare two benchmark reports.
+
+    Returns:
+        Human readable report lines and whether any endpoint's p95 regressed
+        by more than ``threshold`` (a fraction, e.g. 0.1 for 10%)
+    """
+    lines = []
+    regressed = False
+    for operation, current_stats in current["endpoints"].items():
+        baseline_stats = baseline["endpoints"].get(operation)
+        if not baseline_stats or not baseline_stats["count"]:
+            continue
+        cells = []
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            before, after = baseline_stats[key], current_stats[key]
+            change = (after - before) / before if before else 0.0
+            cells.append(f"{key[:-3]} {before:.2f} -> {after:.2f} ms ({change:+.1%})")
+            if key == "p95_ms" and change > threshold:
+                regressed = True
+                cells[-1] += " REGRESSION"
+        lines.append(f"{operation:>16}: " + ", ".join(cells))
+    return lines, regressed
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    mix = {}
+    for item in value.split(","):
+        operation, _, weight = item.partition("=")
+        if operation not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation {operation!r}")
+        mix[operation] = int(weight)
+    return mix
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["fakes", "containers"], default="fakes",
+                        help="datastores used when booting the app in-process")
+    parser.add_argument("--base-url", help="benchmark a running server instead of booting the app")
+    parser.add_argument("--requests", type=int, default=1000, help="measured requests")
+    parser.add_argument("--warmup", type=int, default=100, help="unmeasured requests before the run")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--seed-chats", type=int, default=10)
+    parser.add_argument("--seed-messages", type=int, default=5)
+    parser.add_argument("--ai-latency-ms", type=int, default=0,
+                        help="mock AI delay when booting the app in-process")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="operation weights, e.g. add-message=50,get-chat=50")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="compare two JSON reports instead of running")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed p95 slowdown when comparing")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+        lines, regressed = compare(baseline, current, args.threshold)
+        print("\n".join(lines))
+        return 1 if regressed else 0
+
+    runner = run_remote if args.base_url else run_in_process
+    report = asyncio.run(runner(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
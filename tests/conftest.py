@@ -6,6 +6,7 @@ from fastapi.testclient import TestClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
+from app.api.deps import get_read_db, get_write_db
 from app.db.postgres import get_session
 from app.main import app
 
@@ -35,5 +36,7 @@ def override_get_db(mock_db_session: AsyncSession):
         yield mock_db_session
 
     app.dependency_overrides[get_session] = _override_get_db
+    app.dependency_overrides[get_read_db] = _override_get_db
+    app.dependency_overrides[get_write_db] = _override_get_db
     yield
     app.dependency_overrides = {} 
\ No newline at end of file
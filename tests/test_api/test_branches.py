@@ -281,4 +281,111 @@ async def test_set_active_branch_not_found(client, override_get_db, mock_db_sess
             # Assert
             assert response.status_code == status.HTTP_404_NOT_FOUND
             data = response.json()
-            assert data["detail"] == "No branch found" 
\ No newline at end of file
+            assert data["detail"] == "No branch found" 
+
+
+@pytest.fixture
+def batch_client():
+    """Client for create-branches with auth and the write session stubbed, no lifespan."""
+    from fastapi.testclient import TestClient
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from app.api.deps import get_current_user, get_write_db
+    from app.main import app
+    from app.schemas.user import CurrentUser
+
+    user = CurrentUser(id=UUID("123e4567-e89b-12d3-a456-426614174000"), is_active=True, is_superuser=False)
+
+    async def _write_db():
+        yield AsyncMock(spec=AsyncSession)
+
+    app.dependency_overrides[get_current_user] = lambda: user
+    app.dependency_overrides[get_write_db] = _write_db
+    yield TestClient(app), user
+    app.dependency_overrides = {}
+
+
+@pytest.fixture
+def batch_stores(batch_client):
+    """ChatService with its repositories, content store and side effects mocked."""
+    from app.models.chat import Chat, ChatType
+    from app.services.chat_service import ChatService
+
+    _, user = batch_client
+    parent = Chat(id=UUID("223e4567-e89b-12d3-a456-426614174000"), account_id=user.id, name="Parent", chat_type=ChatType.PERSONAL)
+    qa_pairs = {
+        response_id: {"question": f"Q {response_id}", "response": f"A {response_id}", "response_id": response_id}
+        for response_id in ("r1", "r2", "r3")
+    }
+
+    async def create_branches(parent_chat_id, account_id, copies):
+        return [
+            Chat(account_id=account_id, name=copy["name"], chat_type=ChatType.BRANCH,
+                 created_at=datetime.datetime.now(datetime.timezone.utc))
+            for copy in copies
+        ]
+
+    with patch("app.services.chat_service.ChatRepository") as chat_repo_class, \
+            patch("app.services.chat_service.ChatContentRepository", new_callable=AsyncMock) as content_repo, \
+            patch.object(ChatService, "_expires_at", AsyncMock(return_value=None)), \
+            patch.object(ChatService, "_chat_versions", return_value=AsyncMock()), \
+            patch.object(ChatService, "_publish", AsyncMock()), \
+            patch.object(ChatService, "_audit", AsyncMock()):
+        chat_repo = chat_repo_class.return_value
+        chat_repo.get_chat = AsyncMock(return_value=parent)
+        chat_repo.create_branches = AsyncMock(side_effect=create_branches)
+        content_repo.get_qa_pairs_by_response_ids = AsyncMock(
+            side_effect=lambda chat_id, response_ids: {r: qa_pairs[r] for r in response_ids if r in qa_pairs}
+        )
+        yield parent, chat_repo, content_repo
+
+
+def test_create_branches_forks_every_response_in_one_batch(batch_client, batch_stores):
+    client, _ = batch_client
+    parent, chat_repo, content_repo = batch_stores
+
+    response = client.post("/api/v1/branches/create-branches", json={
+        "chat_id": str(parent.id),
+        "branches": [{"response_id": "r1", "name": "First"}, {"response_id": "r3"}],
+    })
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [(branch["parent_response_id"], branch["name"]) for branch in data] == [
+        ("r1", "First"), ("r3", "Branch of Parent")
+    ]
+    assert all(branch["parent_chat_id"] == str(parent.id) for branch in data)
+    assert set(data[0]) == {"id", "name", "parent_chat_id", "parent_response_id", "created_at"}
+    # One PostgreSQL transaction and one bulk write for the whole batch
+    chat_repo.create_branches.assert_awaited_once()
+    content_repo.add_branches_to_messages.assert_awaited_once_with(
+        parent.id, [("r1", UUID(data[0]["id"])), ("r3", UUID(data[1]["id"]))]
+    )
+
+
+def test_create_branches_rejects_the_whole_batch_when_a_response_is_missing(batch_client, batch_stores):
+    client, _ = batch_client
+    parent, chat_repo, content_repo = batch_stores
+
+    response = client.post("/api/v1/branches/create-branches", json={
+        "chat_id": str(parent.id),
+        "branches": [{"response_id": "r1"}, {"response_id": "missing"}, {"response_id": "r2"}],
+    })
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json()["detail"] == "Responses not found: missing"
+    chat_repo.create_branches.assert_not_called()
+    content_repo.add_branches_to_messages.assert_not_called()
+
+
+def test_create_branches_from_another_users_chat_is_forbidden(batch_client, batch_stores):
+    client, _ = batch_client
+    parent, chat_repo, _ = batch_stores
+    parent.account_id = UUID("523e4567-e89b-12d3-a456-426614174000")
+
+    response = client.post("/api/v1/branches/create-branches", json={
+        "chat_id": str(parent.id), "branches": [{"response_id": "r1"}],
+    })
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    chat_repo.create_branches.assert_not_called()
@@ -0,0 +1,25 @@
+import random
+
+from benchmarks.compression import chat_payload, measure, parse_args, run, synthetic_text
+
+
+def test_synthetic_text_has_requested_size():
+    assert len(synthetic_text(random.Random(1), 500)) == 500
+
+
+def test_measure_reports_bytes_saved():
+    samples = [synthetic_text(random.Random(1), 4096).encode()]
+
+    result = measure(lambda data: data[: len(data) // 2], lambda data: data, samples, repeat=1)
+
+    assert result["original_bytes"] == 4096
+    assert result["compressed_bytes"] == 2048
+    assert result["saved_pct"] == 50.0
+
+
+def test_run_covers_storage_and_http_codecs():
+    report = run(parse_args(["--messages", "3", "--repeat", "1", "--response-size", "200"]))
+
+    assert "zstd-3" in report["storage"]["1024B"]
+    assert "gzip-6" in report["http"]["get-chat-5-messages"]
+    assert chat_payload(random.Random(1), 2, 100).startswith(b'{"chat"')
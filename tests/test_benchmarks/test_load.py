@@ -0,0 +1,71 @@
+import random
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+
+from benchmarks.load import DEFAULT_MIX, Workload, build_schedule, compare, parse_mix, percentile, summarise
+
+
+def _report(p95_ms):
+    stats = {"count": 10, "p50_ms": 1.0, "p95_ms": p95_ms, "p99_ms": 3.0}
+    return {"endpoints": {"get-chat": stats}}
+
+
+def test_percentile_nearest_rank():
+    samples = sorted(float(i) for i in range(1, 101))
+
+    assert percentile(samples, 50) == 50.0
+    assert percentile(samples, 95) == 95.0
+    assert percentile(samples, 99) == 99.0
+    assert percentile([], 99) == 0.0
+    # The rank is rounded up, never to the nearest (or even) neighbour
+    assert percentile([1.0, 2.0, 3.0, 4.0, 5.0], 90) == 5.0
+    assert percentile([float(i) for i in range(1, 11)], 25) == 3.0
+
+
+def test_summarise_reports_milliseconds_and_throughput():
+    result = summarise([0.010, 0.020, 0.030, 0.040], errors=1, elapsed=2.0)
+
+    assert result["count"] == 4
+    assert result["errors"] == 1
+    assert result["throughput_rps"] == 2.0
+    assert result["p50_ms"] == 20.0
+    assert result["max_ms"] == 40.0
+
+
+def test_schedule_is_deterministic():
+    first = build_schedule(DEFAULT_MIX, 200, seed=7)
+    second = build_schedule(DEFAULT_MIX, 200, seed=7)
+
+    assert first == second
+    assert set(first) <= set(DEFAULT_MIX)
+
+
+def test_compare_flags_p95_regressions():
+    _, regressed = compare(_report(2.0), _report(2.1), threshold=0.10)
+    assert regressed is False
+
+    lines, regressed = compare(_report(2.0), _report(2.5), threshold=0.10)
+    assert regressed is True
+    assert "REGRESSION" in lines[0]
+
+
+@pytest.mark.asyncio
+async def test_create_branch_adds_a_message_while_nothing_can_be_branched():
+    client = MagicMock()
+    client.post = AsyncMock(return_value=httpx.Response(200, json={"response_id": "r1"}))
+    workload = Workload(client, random.Random(1))
+    workload.chats = ["chat-1"]
+
+    await workload.execute("create-branch")
+
+    assert client.post.await_args.args[0].endswith("/messages/add-message")
+    assert workload.responses["chat-1"] == ["r1"]
+    assert list(workload.latencies) == ["add-message"]
+    assert not workload.errors
+
+
+def test_create_branches_is_opt_in():
+    assert "create-branches" not in DEFAULT_MIX
+    assert parse_mix("get-chat=5,create-branches=1") == {"get-chat": 5, "create-branches": 1}
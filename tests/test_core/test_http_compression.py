@@ -0,0 +1,71 @@
+import json
+
+import brotli
+from fastapi import FastAPI
+from fastapi.responses import Response
+from fastapi.testclient import TestClient
+
+from app.core.http_compression import CompressionMiddleware, negotiate
+
+BODY = {"text": "conversation " * 500}
+
+
+def _client():
+    app = FastAPI()
+
+    @app.get("/large")
+    async def large():
+        return BODY
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/binary")
+    async def binary():
+        return Response(b"\x00" * 5000, media_type="application/octet-stream")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+def test_negotiate_prefers_brotli():
+    assert negotiate("gzip, deflate, br", brotli_available=True) == "br"
+    assert negotiate("gzip, deflate, br", brotli_available=False) == "gzip"
+    assert negotiate("br;q=0, gzip", brotli_available=True) == "gzip"
+    assert negotiate("identity", brotli_available=True) is None
+
+
+def test_large_json_is_brotli_compressed():
+    # Read the body as sent, before the client's own decoding
+    with _client().stream("GET", "/large", headers={"Accept-Encoding": "br"}) as response:
+        body = b"".join(response.iter_raw())
+
+    assert response.headers["content-encoding"] == "br"
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert int(response.headers["content-length"]) == len(body) < 1000
+    assert json.loads(brotli.decompress(body)) == BODY
+
+
+def test_large_json_falls_back_to_gzip():
+    response = _client().get("/large", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json() == BODY
+
+
+def test_small_and_binary_responses_are_not_compressed():
+    client = _client()
+
+    small = client.get("/small", headers={"Accept-Encoding": "gzip, br"})
+    binary = client.get("/binary", headers={"Accept-Encoding": "gzip, br"})
+
+    assert "content-encoding" not in small.headers
+    assert "content-encoding" not in binary.headers
+
+
+def test_no_compression_without_accept_encoding():
+    response = _client().get("/large", headers={"Accept-Encoding": "identity"})
+
+    assert "content-encoding" not in response.headers
+    assert response.json() == BODY
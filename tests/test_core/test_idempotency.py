@@ -0,0 +1,181 @@
+import asyncio
+
+import httpx
+import pytest
+from unittest.mock import patch
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.core.idempotency import IdempotencyMiddleware
+from app.core.security import create_access_token, create_refresh_token
+
+
+def _build_app(delay: float = 0.0, status_code: int = 201):
+    calls = []
+
+    async def create(request: Request):
+        calls.append(await request.json())
+        await asyncio.sleep(delay)
+        return JSONResponse({"id": len(calls)}, status_code=status_code)
+
+    app = Starlette(routes=[
+        Route("/create", create, methods=["POST"]),
+        Route("/other", create, methods=["POST"]),
+    ])
+    app.add_middleware(IdempotencyMiddleware, paths=["/create"])
+    return app, calls
+
+
+@pytest.fixture
+def fake_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    with patch("app.core.idempotency.get_redis", return_value=redis):
+        yield redis
+
+
+def _headers(key="abc", user="user-1", token=None):
+    return {"Idempotency-Key": key, "Authorization": f"Bearer {token or create_access_token(user)}"}
+
+
+def _client(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_retry_replays_first_response(fake_redis):
+    app, calls = _build_app()
+    headers = _headers()
+
+    async with _client(app) as client:
+        first = await client.post("/create", json={"q": 1}, headers=headers)
+        retry = await client.post("/create", json={"q": 1}, headers=headers)
+
+    assert len(calls) == 1
+    assert retry.status_code == first.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_wait_for_in_flight_request(fake_redis):
+    app, calls = _build_app(delay=0.05)
+    headers = _headers()
+
+    async with _client(app) as client:
+        responses = await asyncio.gather(*(
+            client.post("/create", json={"q": 1}, headers=headers) for _ in range(3)
+        ))
+
+    assert len(calls) == 1
+    assert {response.json()["id"] for response in responses} == {1}
+
+
+@pytest.mark.asyncio
+async def test_keys_are_scoped_to_the_account(fake_redis):
+    app, calls = _build_app()
+
+    async with _client(app) as client:
+        await client.post("/create", json={"q": 1}, headers=_headers(user="user-1"))
+        await client.post("/create", json={"q": 1}, headers=_headers(user="user-2"))
+        # A retry after refreshing the access token is still the same request
+        retry = await client.post("/create", json={"q": 1}, headers=_headers(user="user-1"))
+
+    assert len(calls) == 2
+    assert retry.headers["idempotent-replayed"] == "true"
+
+
+@pytest.mark.asyncio
+async def test_requests_without_a_valid_access_token_run_without_the_key(fake_redis):
+    app, calls = _build_app()
+
+    async with _client(app) as client:
+        for token in ("not-a-jwt", create_refresh_token("user-1")):
+            await client.post("/create", json={"q": 1}, headers=_headers(token=token))
+            await client.post("/create", json={"q": 1}, headers=_headers(token=token))
+
+    assert len(calls) == 4
+    assert await fake_redis.dbsize() == 0
+
+
+@pytest.mark.asyncio
+async def test_reused_key_with_different_body_is_rejected(fake_redis):
+    app, calls = _build_app()
+    headers = _headers()
+
+    async with _client(app) as client:
+        await client.post("/create", json={"q": 1}, headers=headers)
+        response = await client.post("/create", json={"q": 2}, headers=headers)
+
+    assert response.status_code == 422
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_server_errors_release_the_key(fake_redis):
+    app, calls = _build_app(status_code=503)
+    headers = _headers()
+
+    async with _client(app) as client:
+        await client.post("/create", json={"q": 1}, headers=headers)
+        await client.post("/create", json={"q": 1}, headers=headers)
+
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_duplicates_waiting_on_a_failed_request_run_themselves(fake_redis):
+    calls = []
+
+    async def create(request: Request):
+        calls.append(await request.json())
+        await asyncio.sleep(0.05)
+        return JSONResponse({"id": len(calls)}, status_code=500 if len(calls) == 1 else 201)
+
+    app = Starlette(routes=[Route("/create", create, methods=["POST"])])
+    app.add_middleware(IdempotencyMiddleware, paths=["/create"])
+    headers = _headers()
+
+    async with _client(app) as client:
+        responses = await asyncio.gather(*(
+            client.post("/create", json={"q": 1}, headers=headers) for _ in range(3)
+        ))
+
+    # One duplicate takes over after the failure, the other replays its result
+    assert sorted(response.status_code for response in responses) == [201, 201, 500]
+    assert len(calls) == 2
+    assert [response.json()["id"] for response in responses if response.status_code == 201] == [2, 2]
+
+
+@pytest.mark.asyncio
+async def test_duplicates_run_when_another_worker_releases_the_key(fake_redis):
+    app, calls = _build_app()
+    headers = _headers()
+
+    async with _client(app) as client:
+        await client.post("/create", json={"q": 1}, headers=headers)
+        # Stand in for a request on another worker that is still running
+        [key] = await fake_redis.keys("idempotency:*")
+        await fake_redis.set(key, '{"state": "in_progress", "fingerprint": ""}')
+        asyncio.get_running_loop().call_later(0.05, lambda: asyncio.ensure_future(fake_redis.delete(key)))
+        response = await client.post("/create", json={"q": 1}, headers=headers)
+
+    assert response.status_code == 201
+    assert "idempotent-replayed" not in response.headers
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_requests_without_key_or_on_other_routes_pass_through(fake_redis):
+    app, calls = _build_app()
+
+    async with _client(app) as client:
+        await client.post("/create", json={"q": 1})
+        await client.post("/create", json={"q": 1})
+        await client.post("/other", json={"q": 1}, headers={"Idempotency-Key": "abc"})
+        await client.post("/other", json={"q": 1}, headers={"Idempotency-Key": "abc"})
+
+    assert len(calls) == 4
+    assert await fake_redis.dbsize() == 0
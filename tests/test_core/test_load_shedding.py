@@ -0,0 +1,115 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.core.config import settings
+from app.core.load_shedding import LoadSheddingMiddleware
+from app.core.loop_monitor import LoopLagProbe
+
+
+def _build_app(probe, release=None, **options):
+    if release is None:
+        release = asyncio.Event()
+        release.set()
+
+    async def endpoint(request):
+        return JSONResponse({"ok": True})
+
+    async def slow(request):
+        await release.wait()
+        return JSONResponse({"ok": True})
+
+    app = Starlette(routes=[Route("/tree", endpoint), Route("/messages", slow), Route("/events", slow)])
+    app.add_middleware(
+        LoadSheddingMiddleware,
+        probe=probe,
+        low_priority_paths=["/tree"],
+        untracked_paths=["/events"],
+        **options,
+    )
+    return app
+
+
+def _client(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_loop_lag_sheds_only_low_priority_routes():
+    probe = LoopLagProbe(interval=0.05, window=0.15)
+    app = _build_app(probe, max_loop_lag=0.1, retry_after=2, max_retry_after=5)
+
+    async with _client(app) as client:
+        probe.observe(0.25)
+        # One late sample is not overload
+        assert (await client.get("/tree")).status_code == 200
+
+        probe.observe(0.25)
+        probe.observe(0.25)
+        shed = await client.get("/tree")
+        served = await client.get("/messages")
+
+    assert shed.status_code == 503
+    # 2.5x over the limit
+    assert shed.headers["retry-after"] == "5"
+    assert served.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_in_flight_limit_ignores_untracked_paths():
+    release = asyncio.Event()
+    app = _build_app(LoopLagProbe(interval=0.05), release=release, max_in_flight=1)
+
+    async with _client(app) as client:
+        streams = [asyncio.create_task(client.get("/events")) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        idle = (await client.get("/tree")).status_code
+
+        message = asyncio.create_task(client.get("/messages"))
+        await asyncio.sleep(0.05)
+        busy = (await client.get("/tree")).status_code
+
+        release.set()
+        await asyncio.gather(message, *streams)
+        after = (await client.get("/tree")).status_code
+
+    assert (idle, busy, after) == (200, 503, 200)
+
+
+def _main_shedding_options():
+    from app.main import app as main_app
+
+    [middleware] = [m for m in main_app.user_middleware if m.cls is LoadSheddingMiddleware]
+    return middleware.kwargs
+
+
+@pytest.mark.asyncio
+async def test_idle_server_with_default_settings_does_not_shed():
+    options = _main_shedding_options()
+    probe = LoopLagProbe(
+        settings.LOOP_LAG_PROBE_INTERVAL_MS / 1000, window=settings.LOAD_SHEDDING_LAG_WINDOW_MS / 1000
+    )
+    app = _build_app(
+        probe,
+        max_loop_lag=options["max_loop_lag"],
+        max_in_flight=options["max_in_flight"],
+    )
+    probe.start()
+    await asyncio.sleep(settings.LOAD_SHEDDING_LAG_WINDOW_MS / 1000)
+    time.sleep(0.3)  # one synchronous password hash on login
+    await asyncio.sleep(0.1)
+
+    async with _client(app) as client:
+        response = await client.get("/tree")
+    await probe.close()
+
+    assert response.status_code == 200
+    # Writes and O(1) reads are never shed
+    assert not {"/branches/create-branches", "/chats/get-chat-stats"} & {
+        path.removeprefix(settings.API_V1_STR) for path in options["low_priority_paths"]
+    }
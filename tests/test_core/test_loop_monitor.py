@@ -0,0 +1,54 @@
+import asyncio
+import logging
+import os
+import time
+import traceback
+
+import pytest
+
+from app.core.loop_monitor import APP_DIR, LoopLagProbe, LoopWatchdog, blocking_frame
+
+
+def _block_loop(seconds):
+    time.sleep(seconds)
+
+
+@pytest.mark.asyncio
+async def test_probe_measures_a_blocked_loop():
+    probe = LoopLagProbe(interval=0.01)
+    probe.start()
+    await asyncio.sleep(0.02)
+    time.sleep(0.1)  # blocks the loop
+    await asyncio.sleep(0.02)
+    await probe.close()
+
+    assert probe.lag > 0.05
+
+
+@pytest.mark.asyncio
+async def test_watchdog_reports_the_blocking_frame_once_per_stall(caplog):
+    probe = LoopLagProbe(interval=0.01)
+    probe.start()
+    watchdog = LoopWatchdog(probe, threshold=0.02)
+    watchdog.start()
+    await asyncio.sleep(0.02)
+
+    with caplog.at_level(logging.WARNING, logger="app.core.loop_monitor"):
+        _block_loop(0.15)
+        await asyncio.sleep(0.05)
+    watchdog.stop()
+    await probe.close()
+
+    [record] = caplog.records
+    assert "Event loop blocked" in record.getMessage()
+    assert "_block_loop" in record.getMessage()
+
+
+def test_blocking_frame_prefers_app_code():
+    stack = [
+        traceback.FrameSummary(os.path.join(APP_DIR, "services", "user_service.py"), 42, "authenticate"),
+        traceback.FrameSummary("/usr/lib/python3/site-packages/passlib/hash.py", 7, "verify"),
+    ]
+
+    assert blocking_frame(stack) == os.path.join("app", "services", "user_service.py") + ":42 authenticate"
+    assert blocking_frame(stack[1:]).endswith("passlib/hash.py:7 verify")
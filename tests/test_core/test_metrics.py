@@ -0,0 +1,99 @@
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, MagicMock
+
+from app.db import redis as redis_db
+
+from app.core.metrics import (
+    AI_CALLS,
+    HTTP_REQUEST_DURATION,
+    REDIS_COMMANDS,
+    instrument_redis,
+    track_ai_call,
+)
+from app.main import app
+
+client = TestClient(app)
+
+
+def _sample(metric, suffix, **labels):
+    for family in metric.collect():
+        for sample in family.samples:
+            if sample.name.endswith(suffix) and sample.labels == labels:
+                return sample.value
+    return 0.0
+
+
+def test_request_latency_is_labelled_by_route_template():
+    before = _sample(HTTP_REQUEST_DURATION, "_count", method="GET", route="/health", status="200")
+
+    client.get("/health")
+
+    after = _sample(HTTP_REQUEST_DURATION, "_count", method="GET", route="/health", status="200")
+    assert after == before + 1
+
+
+def test_unmatched_paths_share_one_label():
+    client.get("/does-not-exist/12345")
+
+    assert _sample(HTTP_REQUEST_DURATION, "_count", method="GET", route="unmatched", status="404") >= 1
+
+
+def test_metrics_endpoint_exposes_prometheus_text():
+    client.get("/health")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "http_request_duration_seconds_bucket" in response.text
+    assert "http_requests_in_flight" in response.text
+
+
+@pytest.mark.asyncio
+async def test_instrument_redis_counts_commands():
+    redis = MagicMock()
+    redis.execute_command = AsyncMock(return_value="PONG")
+    instrument_redis(redis)
+    before = _sample(REDIS_COMMANDS, "_total", command="PING", outcome="success")
+
+    assert await redis.execute_command("PING") == "PONG"
+
+    assert _sample(REDIS_COMMANDS, "_total", command="PING", outcome="success") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_instrument_redis_counts_pipelines_once():
+    redis = MagicMock()
+    redis.execute_command = AsyncMock()
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=["value", 1])
+    redis.pipeline.return_value = pipe
+    instrument_redis(redis)
+    before = _sample(REDIS_COMMANDS, "_total", command="PIPELINE", outcome="success")
+
+    assert await redis.pipeline(transaction=False).execute() == ["value", 1]
+
+    assert _sample(REDIS_COMMANDS, "_total", command="PIPELINE", outcome="success") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_track_ai_call_records_failures():
+    @track_ai_call("test_provider")
+    async def failing_provider(question):
+        raise RuntimeError("provider down")
+
+    with pytest.raises(RuntimeError):
+        await failing_provider("hello")
+
+    assert _sample(AI_CALLS, "_total", provider="test_provider", outcome="error") == 1
+
+
+def test_redis_client_is_not_instrumented_with_metrics_and_timing_off(monkeypatch):
+    pytest.importorskip("redis")
+    monkeypatch.setattr(redis_db, "redis_client", None)
+    monkeypatch.setattr(redis_db, "DATASTORE_HOOKS_ENABLED", False)
+
+    redis = redis_db.get_redis()
+
+    assert not hasattr(redis.execute_command, "__wrapped__")
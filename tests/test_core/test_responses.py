@@ -0,0 +1,37 @@
+import json
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from app.core.responses import ORJSONResponse
+from app.schemas.chat import ChatContent
+
+
+def test_trusted_chat_content_matches_validated_output():
+    chat_id = uuid4()
+    content = {
+        "chat": {
+            "id": chat_id,
+            "name": "Test Chat",
+            "chat_type": "personal",
+            "account_id": uuid4(),
+            "created_at": datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc),
+            "updated_at": datetime(2025, 1, 2, 8, 30, 15, 123000, tzinfo=timezone.utc),
+            "active": True,
+            "ai_cache_enabled": True,
+        },
+        "qa_pairs": [
+            {
+                "question": "Hello",
+                "response": "Hi there!",
+                "response_id": str(uuid4()),
+                "timestamp": datetime(2025, 1, 2, 8, 30, 15, 120000),
+                "branches": [str(uuid4())],
+            }
+        ],
+        "active_branch_id": str(uuid4()),
+    }
+
+    rendered = json.loads(ORJSONResponse(content).body)
+    validated = json.loads(ChatContent.model_validate(content).model_dump_json())
+
+    assert rendered == validated
@@ -0,0 +1,105 @@
+import uuid
+from datetime import timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.deps import get_current_user, get_token_payload
+from app.core.security import (
+    ACCESS_TOKEN_TYPE,
+    REFRESH_TOKEN_TYPE,
+    create_access_token,
+    create_refresh_token,
+    decode_token,
+    revoke_token,
+)
+
+
+def test_access_token_carries_authorization_claims():
+    user_id = uuid.uuid4()
+
+    payload = decode_token(create_access_token(user_id, is_active=True, is_superuser=True))
+
+    assert payload["sub"] == str(user_id)
+    assert payload["type"] == ACCESS_TOKEN_TYPE
+    assert payload["is_active"] is True
+    assert payload["is_superuser"] is True
+    assert payload["jti"]
+    assert payload["exp"] > payload["iat"]
+
+
+def test_refresh_token_has_no_authorization_claims():
+    payload = decode_token(create_refresh_token(uuid.uuid4()))
+
+    assert payload["type"] == REFRESH_TOKEN_TYPE
+    assert "is_active" not in payload
+    assert "is_superuser" not in payload
+
+
+@pytest.mark.asyncio
+async def test_current_user_comes_from_claims_without_database():
+    user_id = uuid.uuid4()
+    token = create_access_token(user_id, is_active=True, is_superuser=False)
+
+    with patch("app.api.deps.is_token_revoked", AsyncMock(return_value=False)):
+        user = await get_current_user(await get_token_payload(token))
+
+    assert user.id == user_id
+    assert user.is_active is True
+    assert user.is_superuser is False
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_is_rejected_as_access_token():
+    token = create_refresh_token(uuid.uuid4())
+
+    with patch("app.api.deps.is_token_revoked", AsyncMock(return_value=False)):
+        with pytest.raises(HTTPException) as exc_info:
+            await get_token_payload(token)
+
+    assert exc_info.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_expired_token_is_rejected():
+    token = create_access_token(uuid.uuid4(), expires_delta=timedelta(seconds=-1))
+
+    with pytest.raises(HTTPException) as exc_info:
+        await get_token_payload(token)
+
+    assert exc_info.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_revoked_token_is_rejected():
+    token = create_access_token(uuid.uuid4())
+
+    with patch("app.api.deps.is_token_revoked", AsyncMock(return_value=True)) as is_revoked:
+        with pytest.raises(HTTPException) as exc_info:
+            await get_token_payload(token)
+
+    is_revoked.assert_awaited_once_with(decode_token(token)["jti"])
+    assert exc_info.value.detail == "Token has been revoked"
+
+
+@pytest.mark.asyncio
+async def test_inactive_user_claim_is_rejected():
+    token = create_access_token(uuid.uuid4(), is_active=False)
+
+    with patch("app.api.deps.is_token_revoked", AsyncMock(return_value=False)):
+        with pytest.raises(HTTPException) as exc_info:
+            await get_current_user(await get_token_payload(token))
+
+    assert exc_info.value.detail == "Inactive user"
+
+
+@pytest.mark.asyncio
+async def test_revocation_expires_with_the_token():
+    redis = AsyncMock()
+    redis.set.return_value = True
+
+    with patch("app.core.security.get_redis", return_value=redis):
+        assert await revoke_token("abc", 1700000000) is True
+
+    redis.set.assert_awaited_once_with("revoked-token:abc", 1, exat=1700000000, nx=True)
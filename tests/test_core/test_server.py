@@ -0,0 +1,59 @@
+import importlib
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from uvicorn.supervisors import Multiprocess
+
+from app import server
+
+
+def test_launcher_passes_tuning_settings_to_uvicorn(monkeypatch):
+    monkeypatch.setattr(server.settings, "WEB_CONCURRENCY", 1)
+    monkeypatch.setattr(server.settings, "SERVER_MAX_REQUESTS", 5000)
+    monkeypatch.setattr(server.settings, "SERVER_BACKLOG", 4096)
+
+    with patch("app.server.uvicorn.run") as run:
+        server.main()
+
+    args, kwargs = run.call_args
+    assert args == ("app.main:app",)
+    assert kwargs["workers"] == 1
+    assert kwargs["limit_max_requests"] == 5000
+    assert kwargs["backlog"] == 4096
+    assert kwargs["timeout_graceful_shutdown"] == server.settings.SERVER_GRACEFUL_TIMEOUT
+
+
+def test_worker_count_defaults_to_cpu_count(monkeypatch):
+    monkeypatch.setattr(server.settings, "WEB_CONCURRENCY", None)
+
+    with patch("app.server.os.cpu_count", return_value=6):
+        assert server.worker_count() == 6
+
+
+def test_dead_workers_are_marked_dead_for_multiprocess_metrics():
+    supervisor = server.WorkerSupervisor.__new__(server.WorkerSupervisor)
+    supervisor.processes = [SimpleNamespace(pid=101), SimpleNamespace(pid=102)]
+
+    def restart_second():
+        supervisor.processes[1] = SimpleNamespace(pid=103)
+
+    with patch.object(Multiprocess, "keep_subprocess_alive", side_effect=restart_second), \
+            patch.object(Multiprocess, "handle_signals"), \
+            patch("prometheus_client.multiprocess.mark_process_dead") as mark_process_dead:
+        supervisor.keep_subprocess_alive()
+        supervisor.handle_signals()
+
+    mark_process_dead.assert_called_once_with(102)
+
+
+def test_launcher_supervises_workers_when_metrics_are_shared(monkeypatch, tmp_path):
+    uvicorn_main = importlib.import_module("uvicorn.main")
+    monkeypatch.setattr(server.settings, "WEB_CONCURRENCY", 4)
+    monkeypatch.setattr(server.settings, "METRICS_ENABLED", True)
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    monkeypatch.setattr(uvicorn_main, "Multiprocess", uvicorn_main.Multiprocess)
+
+    with patch("app.server.uvicorn.run"):
+        server.main()
+
+    assert uvicorn_main.Multiprocess is server.WorkerSupervisor
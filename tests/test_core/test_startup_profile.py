@@ -0,0 +1,29 @@
+from app.startup_profile import parse_importtime
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     _io
+import time:       300 |        420 |   encodings
+import time:      1500 |       1920 | app.main
+"""
+
+
+def test_parse_importtime():
+    entries = parse_importtime(IMPORTTIME_OUTPUT)
+
+    assert [e["module"] for e in entries] == ["_io", "encodings", "app.main"]
+    assert [e["depth"] for e in entries] == [2, 1, 0]
+    assert entries[-1]["self_us"] == 1500
+    assert entries[-1]["cumulative_us"] == 1920
+
+
+def test_heavy_subsystems_are_not_imported_with_the_app():
+    import subprocess
+    import sys
+
+    code = (
+        "import sys, app.main; "
+        "print(','.join(m for m in ('passlib', 'fastapi_cache', 'redis', 'app.utils.mock_ai') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == ""
@@ -0,0 +1,44 @@
+import logging
+
+from fastapi.testclient import TestClient
+
+from app.core import timing
+from app.core.timing import RequestTimings
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_server_timing_header_lists_each_store_with_round_trips():
+    timings = RequestTimings()
+    timings.add("pg", 0.002)
+    timings.add("pg", 0.003)
+    timings.add("mongo", 0.010)
+
+    header = timings.server_timing_header()
+
+    assert 'pg;dur=5.00;desc="PostgreSQL x2"' in header
+    assert 'mongo;dur=10.00;desc="MongoDB x1"' in header
+    assert header.split(", ")[-1].startswith("total;dur=")
+
+
+def test_record_outside_a_request_is_a_no_op():
+    timing.record("pg", 1.0)
+
+    assert timing.current_timings() is None
+
+
+def test_responses_carry_server_timing_header():
+    response = client.get("/health")
+
+    assert response.status_code == 200
+    assert "total;dur=" in response.headers["server-timing"]
+
+
+def test_slow_requests_are_logged_with_breakdown(monkeypatch, caplog):
+    monkeypatch.setattr(timing.settings, "SLOW_REQUEST_THRESHOLD_MS", 0)
+
+    with caplog.at_level(logging.WARNING, logger="app.core.timing"):
+        client.get("/health")
+
+    assert any('"path": "/health"' in record.getMessage() for record in caplog.records)
@@ -0,0 +1,86 @@
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+
+from app.models.chat import Chat, ChatType
+from app.models.user import User
+from app.repositories.chat_repository import ChatRepository, branch_references
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+async def _chat(session, account_id, chat_type=ChatType.PERSONAL):
+    chat = Chat(account_id=account_id, name="chat", chat_type=chat_type)
+    session.add(chat)
+    await session.commit()
+    return chat
+
+
+@pytest.mark.asyncio
+async def test_edges_follow_branch_creation_and_deletion(session):
+    user = User(email="a@example.com", username="a", hashed_password="x")
+    session.add(user)
+    await session.commit()
+    parent = await _chat(session, user.id)
+    other = await _chat(session, user.id)
+    branch = await _chat(session, user.id, ChatType.BRANCH)
+    sent_at = datetime(2025, 6, 1, 12, 0, tzinfo=timezone.utc)
+    repo = ChatRepository(session)
+
+    await repo.record_branch(parent.id, branch.id, "r1", copied_bytes=10, copied_at=sent_at)
+    batch = await repo.create_branches(parent.id, user.id, [
+        {"name": "two", "response_id": "r2", "copied_bytes": 10, "copied_at": sent_at},
+    ])
+
+    edges = await repo.get_branch_edges(parent.id)
+    assert [(edge.response_id, chat.id) for edge, chat in edges] == [("r1", branch.id), ("r2", batch[0].id)]
+    assert await repo.has_branch(parent.id, branch.id)
+    assert not await repo.has_branch(other.id, branch.id)
+
+    await repo.delete_chat(branch.id)
+
+    assert [edge.response_id for edge, _ in await repo.get_branch_edges(parent.id)] == ["r2"]
+    assert not await repo.has_branch(parent.id, branch.id)
+
+
+def test_backfill_reads_edges_from_branch_references():
+    parent_id, branch_id = uuid4(), uuid4()
+    document = {
+        "qa_pairs": [
+            {"response_id": "r1", "branches": []},
+            {"response_id": "r2", "branches": [str(branch_id)]},
+        ],
+    }
+
+    assert branch_references(parent_id, document) == [(branch_id, parent_id, "r2")]
+
+
+@pytest.mark.asyncio
+async def test_missing_edges_are_added_once_for_existing_branches(session):
+    user = User(email="a@example.com", username="a", hashed_password="x")
+    session.add(user)
+    await session.commit()
+    parent = await _chat(session, user.id)
+    indexed = await _chat(session, user.id, ChatType.BRANCH)
+    legacy = await _chat(session, user.id, ChatType.BRANCH)
+    repo = ChatRepository(session)
+    await repo.record_branch(parent.id, indexed.id, "r1", copied_bytes=10, copied_at=datetime.now(timezone.utc))
+    references = [(indexed.id, parent.id, "r1"), (legacy.id, parent.id, "r2"), (uuid4(), parent.id, "r3")]
+
+    assert await repo.add_missing_branch_edges(references) == 1
+    assert await repo.add_missing_branch_edges(references) == 0
+
+    edges = await repo.get_branch_edges(parent.id)
+    assert sorted(edge.response_id for edge, _ in edges) == ["r1", "r2"]
+    assert await repo.has_branch(parent.id, legacy.id)
@@ -0,0 +1,97 @@
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+
+from app.db.backfill_chat_stats import chat_stats
+from app.models.chat import Chat, ChatType, Conversation
+from app.models.user import User
+from app.repositories.chat_repository import ChatRepository
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+async def _chat(session, account_id, chat_type=ChatType.PERSONAL):
+    chat = Chat(account_id=account_id, name="chat", chat_type=chat_type)
+    session.add(chat)
+    await session.commit()
+    return chat
+
+
+@pytest.mark.asyncio
+async def test_counters_are_incremented_in_place(session):
+    user = User(email="a@example.com", username="a", hashed_password="x")
+    session.add(user)
+    await session.commit()
+    parent = await _chat(session, user.id)
+    branch = await _chat(session, user.id, ChatType.BRANCH)
+    repo = ChatRepository(session)
+    sent_at = datetime(2025, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+    await repo.update_chat(parent.id, {
+        "message_count": Chat.message_count + 1,
+        "bytes_stored": Chat.bytes_stored + 10,
+        "last_message_at": sent_at,
+    })
+    await repo.record_branch(parent.id, branch.id, "r1", copied_bytes=10, copied_at=sent_at)
+
+    await session.refresh(parent)
+    await session.refresh(branch)
+    assert (parent.message_count, parent.branch_count, parent.bytes_stored) == (1, 1, 10)
+    assert (branch.message_count, branch.branch_count, branch.bytes_stored) == (1, 0, 10)
+    assert branch.last_message_at is not None
+
+
+def test_backfill_recomputes_counters_from_content():
+    chat_id = uuid4()
+    sent_at = datetime(2025, 6, 1, 12, 0, tzinfo=timezone.utc)
+    document = {
+        "chat_id": str(chat_id),
+        "qa_pairs": [
+            {"question": "hi", "response": "hello", "timestamp": sent_at, "branches": [str(uuid4())]},
+            {"question": "héllo", "response": "ok", "timestamp": sent_at, "branches": []},
+        ],
+    }
+
+    assert chat_stats(document) == {
+        "id": chat_id,
+        "message_count": 2,
+        "branch_count": 1,
+        "bytes_stored": 2 + 5 + 6 + 2,
+        "last_message_at": sent_at,
+    }
+
+
+@pytest.mark.asyncio
+async def test_create_branches_inserts_and_counts_in_one_transaction(session):
+    user = User(email="a@example.com", username="a", hashed_password="x")
+    session.add(user)
+    await session.commit()
+    parent = await _chat(session, user.id)
+    sent_at = datetime(2025, 6, 1, 12, 0, tzinfo=timezone.utc)
+    repo = ChatRepository(session)
+
+    branches = await repo.create_branches(parent.id, user.id, [
+        {"name": "one", "response_id": "r1", "copied_bytes": 10, "copied_at": sent_at},
+        {"name": "two", "response_id": "r2", "copied_bytes": 20, "copied_at": sent_at},
+    ])
+
+    await session.refresh(parent)
+    assert parent.branch_count == 2
+    assert [(branch.chat_type, branch.message_count, branch.bytes_stored) for branch in branches] == [
+        (ChatType.BRANCH, 1, 10),
+        (ChatType.BRANCH, 1, 20),
+    ]
+    conversations = await session.execute(select(Conversation.chat_id))
+    assert set(conversations.scalars()) == {branch.id for branch in branches}
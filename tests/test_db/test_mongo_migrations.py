@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from pymongo.errors import CollectionInvalid
+
+from app.db import mongo_migrations
+
+
+@pytest.fixture
+def schema_migrations():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    collection = mongomock_motor.AsyncMongoMockClient()["test"]["schema_migrations"]
+    with patch.object(mongo_migrations, "schema_migrations", collection):
+        yield collection
+
+
+async def _recorded(collection):
+    return [doc["_id"] async for doc in collection.find({}, {"_id": 1})]
+
+
+@pytest.mark.asyncio
+async def test_pending_migrations_run_in_order_and_are_recorded(schema_migrations):
+    order = []
+    first = AsyncMock(side_effect=lambda: order.append("0001_a"))
+    second = AsyncMock(side_effect=lambda: order.append("0002_b"))
+
+    with patch.object(mongo_migrations, "MIGRATIONS", [("0001_a", first), ("0002_b", second)]):
+        applied = await mongo_migrations.run_migrations()
+
+    assert applied == order == ["0001_a", "0002_b"]
+    # The lock is released
+    assert await _recorded(schema_migrations) == ["0001_a", "0002_b"]
+
+
+@pytest.mark.asyncio
+async def test_applied_migrations_are_skipped(schema_migrations):
+    first, second = AsyncMock(), AsyncMock()
+    await schema_migrations.insert_one({"_id": "0001_a"})
+
+    with patch.object(mongo_migrations, "MIGRATIONS", [("0001_a", first), ("0002_b", second)]):
+        applied = await mongo_migrations.run_migrations()
+
+    assert applied == ["0002_b"]
+    first.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_workers_booting_together_apply_each_migration_once(schema_migrations):
+    async def slow():
+        await asyncio.sleep(0.05)
+
+    migration = AsyncMock(side_effect=slow)
+
+    with patch.object(mongo_migrations, "MIGRATIONS", [("0001_a", migration)]), \
+            patch.object(mongo_migrations, "LOCK_POLL_SECONDS", 0.01):
+        results = await asyncio.gather(*(mongo_migrations.run_migrations() for _ in range(4)))
+
+    migration.assert_awaited_once()
+    assert sorted(results) == [[], [], [], ["0001_a"]]
+
+
+@pytest.mark.asyncio
+async def test_audit_collection_step_can_run_again():
+    db = MagicMock()
+    db.create_collection = AsyncMock(side_effect=CollectionInvalid("collection audit_events already exists"))
+    db.command = AsyncMock(return_value={"cursor": {"firstBatch": [{"name": "audit_events", "options": {"capped": True}}]}})
+
+    with patch.object(mongo_migrations, "db", db):
+        await mongo_migrations.create_audit_events_collection()
+
+    # Already capped: not converted again
+    assert [call.args[0] for call in db.command.await_args_list] == ["listCollections"]
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+
+from app.core.config import settings
+from app.db.purge_expired_chats import purge, restamp
+from app.models.chat import BranchEdge, Chat, ChatType, Conversation
+from app.models.user import User
+
+
+@pytest.fixture
+async def sessionmaker():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+def _chat(account, name, days_idle, created_days_ago=60, messages=True):
+    now = datetime.now(timezone.utc)
+    return Chat(
+        account_id=account.id,
+        name=name,
+        chat_type=ChatType.PERSONAL,
+        created_at=now - timedelta(days=created_days_ago),
+        # Renaming bumps updated_at but not the retention clock
+        updated_at=now,
+        last_message_at=now - timedelta(days=days_idle) if messages else None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_purge_removes_expired_chats_per_retention_period(sessionmaker):
+    default = User(email="a@example.com", username="a", hashed_password="x")
+    short = User(email="b@example.com", username="b", hashed_password="x", retention_days=3)
+    chats = {
+        "old": _chat(default, "old", days_idle=40),
+        "recent": _chat(default, "recent", days_idle=5),
+        "empty_old": _chat(default, "empty_old", days_idle=None, created_days_ago=40, messages=False),
+        "empty_new": _chat(default, "empty_new", days_idle=None, created_days_ago=1, messages=False),
+        "short_old": _chat(short, "short_old", days_idle=5),
+        "short_recent": _chat(short, "short_recent", days_idle=1),
+    }
+    async with sessionmaker() as session:
+        session.add_all([default, short, *chats.values()])
+        session.add(Conversation(chat_id=chats["old"].id, account_id=default.id, name="old"))
+        session.add(BranchEdge(branch_chat_id=chats["recent"].id, parent_chat_id=chats["old"].id, response_id="r1"))
+        await session.commit()
+
+    content, index = AsyncMock(), AsyncMock()
+    with patch("app.db.purge_expired_chats.async_session", sessionmaker), \
+            patch("app.db.purge_expired_chats.chat_content", content), \
+            patch("app.db.purge_expired_chats.chat_archive_index", index), \
+            patch.object(settings, "RETENTION_DAYS", 30), \
+            patch.object(settings, "RETENTION_ACCOUNT_OVERRIDES", True):
+        assert await purge(batch_size=1, pause=0) == 3
+
+    async with sessionmaker() as session:
+        remaining = set((await session.execute(select(Chat.name))).scalars())
+        assert remaining == {"recent", "empty_new", "short_recent"}
+        assert (await session.execute(select(Conversation))).first() is None
+        assert (await session.execute(select(BranchEdge))).first() is None
+    purged = {chat_id for call in content.delete_many.call_args_list for chat_id in call.args[0]["chat_id"]["$in"]}
+    assert purged == {str(chats["old"].id), str(chats["empty_old"].id), str(chats["short_old"].id)}
+
+
+@pytest.mark.asyncio
+async def test_restamp_recomputes_expiry_from_current_settings(sessionmaker):
+    default = User(email="a@example.com", username="a", hashed_password="x")
+    forever = User(email="b@example.com", username="b", hashed_password="x", retention_days=0)
+    chats = [_chat(default, "a", days_idle=10), _chat(forever, "b", days_idle=10)]
+    async with sessionmaker() as session:
+        session.add_all([default, forever, *chats])
+        await session.commit()
+
+    content, index = AsyncMock(), AsyncMock()
+    with patch("app.db.purge_expired_chats.async_session", sessionmaker), \
+            patch("app.db.purge_expired_chats.chat_content", content), \
+            patch("app.db.purge_expired_chats.chat_archive_index", index), \
+            patch.object(settings, "RETENTION_DAYS", 30), \
+            patch.object(settings, "RETENTION_ACCOUNT_OVERRIDES", True):
+        assert await restamp(batch_size=1) == 2
+
+    stamped = {
+        update._filter["chat_id"]: update._doc["$set"]["expires_at"]
+        for call in content.bulk_write.call_args_list for update in call.args[0]
+    }
+    assert stamped[str(chats[1].id)] is None
+    expected = chats[0].last_message_at + timedelta(days=30)
+    assert abs(stamped[str(chats[0].id)] - expected) < timedelta(seconds=1)
+    assert index.bulk_write.await_count == 2
@@ -0,0 +1,76 @@
+from unittest.mock import patch
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import Settings
+from app.db import postgres
+from app.db.postgres import ReplicaPool
+
+
+@pytest.fixture
+async def replicas(tmp_path):
+    good = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    unreachable = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    pool = ReplicaPool([good, unreachable], interval=1, max_lag=10)
+    yield pool
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_only_healthy_replicas_are_picked(replicas):
+    good, unreachable = replicas.engines
+
+    await replicas.check()
+
+    assert replicas.healthy == [good]
+    assert {replicas.pick() for _ in range(3)} == {good}
+
+    replicas.mark_down(good)
+    assert replicas.pick() is None
+
+
+@pytest.fixture
+def fake_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    with patch("app.db.redis.get_redis", return_value=redis):
+        yield redis
+
+
+async def _bound_engine(user_id):
+    async for session in postgres.get_read_session(user_id):
+        return session.bind
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_a_replica_unless_the_user_just_wrote(replicas, fake_redis, monkeypatch):
+    good, _ = replicas.engines
+    await replicas.check()
+    monkeypatch.setattr(postgres, "replica_pool", replicas)
+    monkeypatch.setattr(postgres, "_local_pins", {})
+    reader, writer = uuid4(), uuid4()
+
+    await postgres.pin_to_primary(writer)
+    # Pins are shared through Redis, so another worker sees them too
+    postgres._local_pins.clear()
+
+    assert await _bound_engine(reader) is good
+    assert await _bound_engine(writer) is postgres.engine
+
+    replicas.mark_down(good)
+    assert await _bound_engine(reader) is postgres.engine
+
+
+def test_read_your_writes_pin_covers_the_replica_lag(monkeypatch):
+    monkeypatch.setenv("POSTGRES_REPLICA_MAX_LAG_SECONDS", "30")
+    monkeypatch.delenv("POSTGRES_READ_YOUR_WRITES_SECONDS", raising=False)
+    assert Settings().POSTGRES_READ_YOUR_WRITES_SECONDS == 30
+
+    monkeypatch.setenv("POSTGRES_READ_YOUR_WRITES_SECONDS", "45")
+    assert Settings().POSTGRES_READ_YOUR_WRITES_SECONDS == 45
+
+    monkeypatch.setenv("POSTGRES_READ_YOUR_WRITES_SECONDS", "5")
+    with pytest.raises(ValueError, match="POSTGRES_READ_YOUR_WRITES_SECONDS"):
+        Settings()
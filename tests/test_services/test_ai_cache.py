@@ -0,0 +1,92 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.services.ai_cache import AIResponseCache, LRU_KEY, cache_key, normalise_question
+
+AI_RESULT = {"response": "Hi there!", "confidence": 0.9, "source": "mock_ai", "processing_time_ms": 100}
+
+
+def test_normalise_question():
+    assert normalise_question("  Hello!! ") == "hello"
+    assert normalise_question("HELLO") == normalise_question("hello?")
+    assert normalise_question("What's   the\tweather?") == "what's the weather"
+
+
+def test_cache_key_depends_on_context():
+    turns = [{"question": "hello", "response": "Hi!"}]
+
+    assert cache_key("Thanks!", None) == cache_key("thanks", {"summary": None, "turns": [], "tokens": 0})
+    assert cache_key("thanks", None) != cache_key("thanks", {"summary": None, "turns": turns})
+
+
+@pytest.fixture
+def fake_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    with patch("app.services.ai_cache.get_redis", return_value=redis):
+        yield redis
+
+
+@pytest.mark.asyncio
+async def test_second_call_is_served_from_cache(fake_redis):
+    cache = AIResponseCache(ttl=60, max_entries=10, l1_max_entries=10)
+    generate = AsyncMock(return_value=AI_RESULT)
+
+    first = await cache.get_or_generate("Hello", None, generate)
+    second = await cache.get_or_generate("hello!", None, generate)
+
+    assert first == second == AI_RESULT
+    generate.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_redis_shares_entries_between_workers(fake_redis):
+    worker_a = AIResponseCache(ttl=60, max_entries=10, l1_max_entries=10)
+    worker_b = AIResponseCache(ttl=60, max_entries=10, l1_max_entries=10)
+    generate = AsyncMock(return_value=AI_RESULT)
+
+    await worker_a.get_or_generate("hello", None, generate)
+    result = await worker_b.get_or_generate("hello", None, generate)
+
+    assert result == AI_RESULT
+    generate.assert_awaited_once()
+    assert await fake_redis.ttl(cache_key("hello")) > 0
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_entries_are_evicted(fake_redis):
+    cache = AIResponseCache(ttl=60, max_entries=2, l1_max_entries=10)
+    generate = AsyncMock(return_value=AI_RESULT)
+
+    for question in ("one", "two", "three"):
+        await cache.get_or_generate(question, None, generate)
+
+    assert await fake_redis.zcard(LRU_KEY) == 2
+    assert not await fake_redis.exists(cache_key("one"))
+    assert await fake_redis.exists(cache_key("three"))
+
+
+@pytest.mark.asyncio
+async def test_l1_is_bounded():
+    cache = AIResponseCache(ttl=60, max_entries=10, l1_max_entries=2)
+    for key in ("a", "b", "c"):
+        cache._l1_set(key, AI_RESULT)
+
+    assert cache._l1_get("a") is None
+    assert cache._l1_get("c") == AI_RESULT
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_falls_back_to_provider():
+    redis = MagicMock()
+    redis.pipeline.side_effect = RedisConnectionError("down")
+    cache = AIResponseCache(ttl=60, max_entries=10, l1_max_entries=10)
+    generate = AsyncMock(return_value=AI_RESULT)
+
+    with patch("app.services.ai_cache.get_redis", return_value=redis):
+        result = await cache.get_or_generate("hello", None, generate)
+
+    assert result == AI_RESULT
+    generate.assert_awaited_once()
@@ -0,0 +1,60 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+import pytest
+
+from app.services.audit import MESSAGE_ADDED, AuditLog
+
+
+@pytest.fixture
+def collection():
+    collection = AsyncMock()
+    with patch("app.services.audit.audit_events", collection):
+        yield collection
+
+
+def _batch_sizes(collection):
+    return [len(call.args[0]) for call in collection.insert_many.call_args_list]
+
+
+@pytest.mark.asyncio
+async def test_events_are_written_in_batches_and_flushed_on_close(collection):
+    log = AuditLog(queue_size=100, batch_size=2, flush_interval=60, enqueue_timeout=1)
+    log.start()
+    chat_id = uuid4()
+
+    for index in range(5):
+        await log.record(MESSAGE_ADDED, chat_id, data={"response_id": f"r{index}"})
+    await asyncio.sleep(0.01)
+
+    # Full batches go out at once; the last event waits for the flush interval
+    assert _batch_sizes(collection) == [2, 2]
+
+    await log.close()
+
+    assert _batch_sizes(collection) == [2, 2, 1]
+    assert collection.insert_many.call_args.args[0][0]["data"] == {"response_id": "r4"}
+
+
+@pytest.mark.asyncio
+async def test_full_queue_makes_callers_wait_then_drops(collection):
+    written = asyncio.Event()
+
+    async def slow_insert(batch, ordered):
+        await written.wait()
+
+    collection.insert_many.side_effect = slow_insert
+    log = AuditLog(queue_size=1, batch_size=1, flush_interval=60, enqueue_timeout=0.05)
+    log.start()
+    chat_id = uuid4()
+
+    await log.record(MESSAGE_ADDED, chat_id)  # taken by the stalled writer
+    await asyncio.sleep(0.01)
+    await log.record(MESSAGE_ADDED, chat_id)  # fills the queue
+    await log.record(MESSAGE_ADDED, chat_id)  # waits, then is dropped
+
+    written.set()
+    await log.close()
+
+    assert _batch_sizes(collection) == [1, 1]
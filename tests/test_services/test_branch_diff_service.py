@@ -0,0 +1,110 @@
+import pytest
+from unittest.mock import patch
+from uuid import uuid4
+
+from app.services.branch_diff_service import BranchDiffService
+
+
+class FakeContentRepository:
+    """In-memory stand-in for the ChatContentRepository lineage methods."""
+
+    def __init__(self):
+        self.documents = {}
+        self.lineage_reads = 0
+        self.range_reads = []
+
+    def add_chat(self, turns, parent=None, fork_turn=None, record_index=True):
+        chat_id = str(uuid4())
+        document = {"chat_id": chat_id, "qa_count": turns}
+        pairs = [{"question": f"q{i}", "response": f"a{i}", "response_id": f"{chat_id}-{i}"} for i in range(turns)]
+        if parent is not None:
+            document["parent_chat_id"] = parent
+            document["parent_response_id"] = f"{parent}-{fork_turn}"
+            if record_index:
+                document["parent_turn_index"] = fork_turn
+        self.documents[chat_id] = dict(document, qa_pairs=pairs)
+        return chat_id
+
+    async def get_lineage(self, chat_ids):
+        self.lineage_reads += 1
+        return {
+            str(chat_id): {k: v for k, v in self.documents[str(chat_id)].items() if k != "qa_pairs"}
+            for chat_id in chat_ids if str(chat_id) in self.documents
+        }
+
+    async def get_turn_indexes(self, chat_ids):
+        return {
+            str(chat_id): {pair["response_id"]: i for i, pair in enumerate(self.documents[str(chat_id)]["qa_pairs"])}
+            for chat_id in chat_ids
+        }
+
+    async def set_parent_turn_index(self, chat_id, index):
+        self.documents[str(chat_id)]["parent_turn_index"] = index
+
+    async def get_turn_ranges(self, ranges):
+        self.range_reads.append(ranges)
+        return {chat_id: self.documents[chat_id]["qa_pairs"][start:end] for chat_id, (start, end) in ranges.items()}
+
+
+@pytest.fixture
+def repo():
+    fake = FakeContentRepository()
+    with patch("app.services.branch_diff_service.ChatContentRepository", fake):
+        yield fake
+
+
+def _turns(side):
+    return [(item["chat_id"], [pair["question"] for pair in item["qa_pairs"]]) for item in side["ranges"]]
+
+
+@pytest.mark.asyncio
+async def test_only_turns_after_the_fork_are_read(repo):
+    root = repo.add_chat(6)
+    left = repo.add_chat(3, parent=root, fork_turn=1, record_index=False)
+    nested = repo.add_chat(2, parent=left, fork_turn=2)
+    right = repo.add_chat(2, parent=root, fork_turn=3)
+
+    diff = await BranchDiffService().diff(nested, right)
+
+    assert diff["fork_chat_id"] == root
+    assert diff["fork_response_id"] == f"{root}-1"
+    assert diff["shared_turns"] == 2
+    assert _turns(diff["left"]) == [(left, ["q1", "q2"]), (nested, ["q1"])]
+    assert _turns(diff["right"]) == [(root, ["q2", "q3"]), (right, ["q1"])]
+    # Both lineages are walked together, one query per level, and the shared
+    # prefix of the root is never read
+    assert repo.lineage_reads == 2
+    assert repo.range_reads == [{root: (2, 4), left: (1, 3), nested: (1, 2), right: (1, 2)}]
+    assert repo.documents[left]["parent_turn_index"] == 1
+
+
+@pytest.mark.asyncio
+async def test_ancestor_diff_returns_only_the_branch_turns(repo):
+    root = repo.add_chat(4)
+    branch = repo.add_chat(3, parent=root, fork_turn=3)
+
+    diff = await BranchDiffService().diff(root, branch)
+
+    assert diff["fork_response_id"] == f"{root}-3"
+    assert diff["shared_turns"] == 4
+    assert diff["left"]["ranges"] == []
+    assert _turns(diff["right"]) == [(branch, ["q1", "q2"])]
+
+
+@pytest.mark.asyncio
+async def test_archived_chats_are_restored_before_diffing(repo):
+    root = repo.add_chat(3)
+    branch = repo.add_chat(2, parent=root, fork_turn=1)
+    archived = {branch: repo.documents.pop(branch)}
+
+    async def restore(chat_id):
+        document = archived.pop(str(chat_id), None)
+        if document is not None:
+            repo.documents[str(chat_id)] = document
+        return document is not None
+
+    with patch("app.services.chat_archive.ChatArchive.restore", side_effect=restore):
+        diff = await BranchDiffService().diff(root, branch)
+
+    assert diff["fork_chat_id"] == root
+    assert _turns(diff["right"]) == [(branch, ["q1"])]
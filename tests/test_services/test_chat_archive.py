@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+import bson
+import pytest
+
+from benchmarks.fakes import accept_bulk_sort
+from app.services.chat_archive import ChatArchive, SegmentStore
+from app.utils.compression import compress_bytes
+
+
+@pytest.mark.asyncio
+async def test_segments_are_appended_and_rolled_over(tmp_path):
+    store = SegmentStore(str(tmp_path), max_bytes=8)
+
+    first = await store.append([b"aaaa", b"bbbb"])
+    second = await store.append([b"cc"])
+
+    # The third record would take the first segment past max_bytes
+    assert [(offset, length) for _, offset, length in first + second] == [(0, 4), (4, 4), (0, 2)]
+    assert first[0][0] == first[1][0] != second[0][0]
+    for location, record in zip(first + second, [b"aaaa", b"bbbb", b"cc"]):
+        assert await store.read(*location) == record
+
+
+@pytest.fixture
+def mongo():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    accept_bulk_sort()
+    database = mongomock_motor.AsyncMongoMockClient()["test"]
+    with patch("app.services.chat_archive.chat_archive_index", database["chat_archive"]), \
+            patch("app.services.chat_archive.chat_content", database["chat_content"]):
+        yield database
+
+
+@pytest.mark.asyncio
+async def test_restore_puts_the_document_back_unchanged(tmp_path):
+    chat_id = uuid4()
+    document = {
+        "_id": bson.ObjectId(),
+        "chat_id": str(chat_id),
+        "qa_pairs": [{"question": b"stored compressed", "response": "a", "timestamp": datetime(2025, 6, 1, 12, 0)}],
+        "qa_count": 1,
+    }
+    store = SegmentStore(str(tmp_path), max_bytes=1024)
+    [(segment, offset, length)] = await store.append([compress_bytes(bson.encode(document))])
+    index, content = AsyncMock(), AsyncMock()
+    index.find_one.return_value = {"_id": str(chat_id), "segment": segment, "offset": offset, "length": length}
+
+    with patch("app.services.chat_archive.chat_archive_index", index), \
+            patch("app.services.chat_archive.chat_content", content):
+        assert await ChatArchive(store).restore(chat_id)
+
+    [restored], _ = content.insert_one.call_args
+    assert restored.pop("restored_at") is not None
+    assert restored == document
+    index.delete_one.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_archive_keeps_documents_changed_after_the_copy(tmp_path, mongo):
+    chat_ids = [uuid4(), uuid4()]
+    await mongo["chat_content"].insert_many([
+        {"chat_id": str(chat_id), "qa_pairs": [], "qa_count": 0, "branch_log": []} for chat_id in chat_ids
+    ])
+    store = SegmentStore(str(tmp_path), max_bytes=1024)
+    append = store.append
+
+    async def set_active_branch_during_copy(records):
+        await mongo["chat_content"].update_one(
+            {"chat_id": str(chat_ids[0])}, {"$set": {"active_branch_id": str(uuid4())}}
+        )
+        return await append(records)
+
+    store.append = set_active_branch_during_copy
+
+    assert await ChatArchive(store).archive(chat_ids) == 1
+    assert [document["chat_id"] async for document in mongo["chat_content"].find()] == [str(chat_ids[0])]
+
+
+@pytest.mark.asyncio
+async def test_recently_restored_chats_are_not_archived_again(tmp_path, mongo):
+    chat_id = uuid4()
+    await mongo["chat_content"].insert_one({"chat_id": str(chat_id), "qa_pairs": [], "qa_count": 0})
+    archive = ChatArchive(SegmentStore(str(tmp_path), max_bytes=1024))
+    assert await archive.archive([chat_id]) == 1
+    assert await archive.restore(chat_id)
+
+    # updated_at is untouched by reads, so the chat still looks idle
+    assert await archive.archive([chat_id], idle_since=datetime.now(timezone.utc) - timedelta(days=30)) == 0
+    assert await archive.archive([chat_id], idle_since=datetime.now(timezone.utc) + timedelta(seconds=1)) == 1
+
+
+@pytest.mark.asyncio
+async def test_load_restores_only_when_content_is_missing():
+    archive = ChatArchive(SegmentStore("unused", max_bytes=1))
+    archive.restore = AsyncMock(return_value=True)
+    access = AsyncMock(side_effect=[None, {"qa_pairs": []}])
+
+    assert await archive.load(uuid4(), access) == {"qa_pairs": []}
+    assert access.await_count == 2
+
+    # A turn index of 0 is a result, not a missing document
+    archive.restore.reset_mock()
+    assert await archive.load(uuid4(), AsyncMock(return_value=0), found=lambda index: index is not None) == 0
+    archive.restore.assert_not_called()
@@ -0,0 +1,51 @@
+import asyncio
+from unittest.mock import patch
+from uuid import uuid4
+
+import orjson
+import pytest
+
+from app.services.chat_events import MESSAGE_ADDED, ChatEventBus
+
+
+@pytest.fixture
+async def bus():
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    bus = ChatEventBus(queue_size=2, heartbeat=1)
+    with patch("app.services.chat_events.get_redis", return_value=redis):
+        yield bus
+        await bus.close()
+
+
+async def _next_event(queue):
+    event = await asyncio.wait_for(queue.get(), 2)
+    return orjson.loads(event) if event is not None else None
+
+
+@pytest.mark.asyncio
+async def test_events_fan_out_over_one_subscription(bus):
+    chat_id, other_chat_id = uuid4(), uuid4()
+
+    async with bus.listen(chat_id) as first, bus.listen(chat_id) as second, bus.listen(other_chat_id):
+        # One subscriber connection per worker, one channel per chat
+        assert len(bus._pubsub.channels) == 2
+
+        await bus.publish(chat_id, MESSAGE_ADDED, {"response_id": "r1"})
+
+        for queue in (first, second):
+            assert await _next_event(queue) == {"type": MESSAGE_ADDED, "chat_id": str(chat_id), "response_id": "r1"}
+
+    assert bus._listeners == {}
+
+
+@pytest.mark.asyncio
+async def test_slow_listener_is_cut_off(bus):
+    chat_id = uuid4()
+
+    async with bus.listen(chat_id) as queue:
+        for index in range(3):
+            await bus.publish(chat_id, MESSAGE_ADDED, {"response_id": f"r{index}"})
+        await asyncio.sleep(0.1)
+
+        assert await _next_event(queue) is None
@@ -3,7 +3,15 @@ from unittest.mock import AsyncMock, MagicMock, patch
 from uuid import uuid4
 from datetime import datetime, timezone
 
-from app.models.chat import Chat, ChatType, Conversation
+from fastapi import HTTPException
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+
+from app.models.chat import BranchEdge, Chat, ChatType, Conversation
+from app.models.user import User
+from app.repositories.chat_repository import ChatRepository
 from app.services.chat_service import ChatService
 
 
@@ -279,52 +287,162 @@ async def test_create_branch(chat_service):
 
 
 @pytest.mark.asyncio
-async def test_get_branches(chat_service):
+async def test_get_branches(chat_service, mock_chat_repo):
     # Setup
     chat_id = uuid4()
-    branch_id1 = uuid4()
-    branch_id2 = uuid4()
-    
-    # Mock branches as Chat objects that would be returned by chat_repo.get_chat
-    mock_branch1 = Chat(id=branch_id1, name="Branch 1", account_id=uuid4(), chat_type=ChatType.BRANCH)
-    mock_branch2 = Chat(id=branch_id2, name="Branch 2", account_id=uuid4(), chat_type=ChatType.BRANCH)
-    
-    # Mock chat content structure that contains branch references
-    mock_chat_content = {
-        "chat_id": str(chat_id),
-        "qa_pairs": [
-            {
-                "question": "Q1",
-                "response": "R1",
-                "response_id": str(uuid4()),
-                "branches": [str(branch_id1)]
-            },
-            {
-                "question": "Q2",
-                "response": "R2",
-                "response_id": str(uuid4()),
-                "branches": [str(branch_id2)]
-            }
-        ]
-    }
-    
+    created_at = datetime.now(timezone.utc)
+
+    # Branches come from the branch_edges index joined to their chats
+    mock_branch1 = Chat(id=uuid4(), name="Branch 1", account_id=uuid4(), chat_type=ChatType.BRANCH)
+    mock_branch2 = Chat(id=uuid4(), name="Branch 2", account_id=uuid4(), chat_type=ChatType.BRANCH)
+    mock_chat_repo.get_branch_edges.return_value = [
+        (BranchEdge(branch_chat_id=mock_branch1.id, parent_chat_id=chat_id, response_id="r1", created_at=created_at), mock_branch1),
+        (BranchEdge(branch_chat_id=mock_branch2.id, parent_chat_id=chat_id, response_id="r2", created_at=created_at), mock_branch2),
+    ]
+
     # Execute
     with patch.object(chat_service, 'get_chat', AsyncMock()):
         with patch('app.services.chat_service.ChatContentRepository') as mock_content_repo:
-            mock_content_repo.get_chat_content = AsyncMock(return_value=mock_chat_content)
-            
-            # For each branch_id in the content, the service will call get_chat
-            with patch.object(chat_service.chat_repo, 'get_chat', AsyncMock()) as mock_get_chat:
-                # Setup sequential returns for multiple calls
-                mock_get_chat.side_effect = [mock_branch1, mock_branch2]
-                
-                result = await chat_service.get_branches(chat_id)
-    
+            result = await chat_service.get_branches(chat_id)
+
     # Assert
-    assert len(result) == 2
-    assert result[0].id == branch_id1
-    assert result[1].id == branch_id2
-    assert mock_get_chat.call_count == 2
+    assert [(branch["branch_id"], branch["parent_response_id"]) for branch in result] == [
+        (mock_branch1.id, "r1"),
+        (mock_branch2.id, "r2"),
+    ]
+    mock_chat_repo.get_branch_edges.assert_called_once_with(chat_id)
+    # MongoDB is not read
+    mock_content_repo.get_chat_content.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_set_active_branch_rejects_foreign_branch(chat_service, mock_chat_repo):
+    mock_chat_repo.has_branch.return_value = False
+
+    with patch.object(chat_service, 'get_chat', AsyncMock()):
+        with patch('app.services.chat_service.ChatContentRepository') as mock_content_repo:
+            mock_content_repo.get_chat_content = AsyncMock(return_value={"qa_pairs": [{"response_id": "r1", "branches": []}]})
+            with pytest.raises(HTTPException) as exc:
+                await chat_service.set_active_branch(uuid4(), uuid4())
+
+    assert exc.value.status_code == 404
+    mock_chat_repo.add_missing_branch_edges.assert_not_called()
+    mock_content_repo.set_active_branch.assert_not_called()
+
+
+@pytest.fixture
+async def replica_and_primary(tmp_path):
+    """Sessions on one SQLite file: the replica read-only, the primary read-write."""
+    path = tmp_path / "chat.db"
+    primary = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    replica = create_async_engine(f"sqlite+aiosqlite:///file:{path}?mode=ro&uri=true")
+    async with primary.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    primary_session = sessionmaker(primary, class_=AsyncSession, expire_on_commit=False)
+    async with AsyncSession(replica, expire_on_commit=False) as replica_session:
+        yield replica_session, primary_session
+    await replica.dispose()
+    await primary.dispose()
+
+
+@pytest.mark.asyncio
+async def test_branches_made_before_branch_edges_are_indexed_from_a_replica_read(replica_and_primary):
+    replica_session, primary_session = replica_and_primary
+    async with primary_session() as session:
+        user = User(email="a@example.com", username="a", hashed_password="x")
+        session.add(user)
+        await session.commit()
+        parent = Chat(account_id=user.id, name="Parent", chat_type=ChatType.PERSONAL)
+        branch = Chat(account_id=user.id, name="Legacy", chat_type=ChatType.BRANCH)
+        session.add_all([parent, branch])
+        await session.commit()
+    content = {"qa_pairs": [{"response_id": "r1", "branches": [str(branch.id)]}]}
+    # get-branches runs on the replica session; it can't take the INSERT
+    chat_service = ChatService(replica_session)
+
+    with patch('app.services.chat_service.async_session', primary_session), \
+            patch.object(chat_service, '_publish', AsyncMock()), \
+            patch.object(chat_service, '_chat_versions', MagicMock(return_value=AsyncMock())), \
+            patch('app.services.chat_service.ChatContentRepository') as mock_content_repo:
+        mock_content_repo.get_chat_content = AsyncMock(return_value=content)
+        mock_content_repo.set_active_branch = AsyncMock(return_value=True)
+        result = await chat_service.get_branches(parent.id)
+        assert await ChatService(replica_session).set_active_branch(parent.id, branch.id)
+
+    assert [(item["branch_id"], item["parent_response_id"]) for item in result] == [(branch.id, "r1")]
+    async with primary_session() as session:
+        assert await ChatRepository(session).has_branch(parent.id, branch.id)
+
+
+@pytest.fixture
+def archived_content():
+    """ChatContentRepository whose documents are missing until chat_archive.restore runs."""
+    restored = set()
+
+    async def restore(chat_id):
+        restored.add(chat_id)
+        return True
+
+    def when_restored(chat_id, value, missing=None):
+        return lambda *args, **kwargs: value if chat_id in restored else missing
+
+    with patch('app.services.chat_service.ChatContentRepository', new_callable=AsyncMock) as mock_content_repo, \
+            patch('app.services.chat_archive.ChatArchive.restore', AsyncMock(side_effect=restore)), \
+            patch.object(ChatService, '_publish', AsyncMock()), \
+            patch.object(ChatService, '_audit', AsyncMock()):
+        yield mock_content_repo, when_restored, restored
+
+
+@pytest.mark.asyncio
+async def test_branching_restores_an_archived_parent(chat_service, mock_chat_repo, archived_content):
+    mock_content_repo, when_restored, restored = archived_content
+    parent = Chat(id=uuid4(), account_id=uuid4(), name="Archived", chat_type=ChatType.PERSONAL)
+    qa_pair = {"question": "Hello", "response": "World", "response_id": "r1"}
+    mock_content_repo.get_qa_pairs_by_response_ids = AsyncMock(
+        side_effect=when_restored(parent.id, {"r1": qa_pair}, missing={})
+    )
+    mock_chat_repo.create_branches.return_value = [Chat(id=uuid4(), account_id=parent.account_id, name="b", chat_type=ChatType.BRANCH)]
+
+    with patch.object(chat_service, '_expires_at', AsyncMock(return_value=None)), \
+            patch.object(chat_service, '_chat_versions', MagicMock(return_value=AsyncMock())):
+        result = await chat_service.create_branches(parent.id, [{"response_id": "r1"}], parent.account_id, parent_chat=parent)
+
+    assert restored == {parent.id}
+    assert [branch["parent_response_id"] for branch in result] == ["r1"]
+
+
+@pytest.mark.asyncio
+async def test_branch_tree_and_active_branch_restore_an_archived_chat(chat_service, mock_chat_repo, archived_content):
+    mock_content_repo, when_restored, restored = archived_content
+    chat = Chat(id=uuid4(), account_id=uuid4(), name="Archived", chat_type=ChatType.PERSONAL)
+    branch_id = uuid4()
+    mock_chat_repo.get_chat.return_value = chat
+    mock_chat_repo.get_branch_edges.return_value = []
+    mock_chat_repo.has_branch.return_value = True
+    mock_content_repo.get_chat_content = AsyncMock(side_effect=when_restored(chat.id, {"qa_pairs": []}))
+    mock_content_repo.set_active_branch = AsyncMock(side_effect=when_restored(chat.id, True, missing=False))
+
+    tree = await chat_service.build_branch_tree(chat.id)
+    restored.clear()
+    with patch.object(chat_service, '_chat_versions', MagicMock(return_value=AsyncMock())):
+        assert await chat_service.set_active_branch(chat.id, branch_id)
+
+    assert tree.id == chat.id and tree.children == []
+    assert restored == {chat.id}
+
+
+@pytest.mark.asyncio
+async def test_branch_tree_of_a_chat_without_content_is_not_found(chat_service, mock_chat_repo):
+    mock_chat_repo.get_branch_edges.return_value = []
+
+    with patch.object(chat_service, 'get_chat', AsyncMock()), \
+            patch('app.services.chat_service.ChatContentRepository') as mock_content_repo, \
+            patch('app.services.chat_archive.ChatArchive.restore', AsyncMock(return_value=False)):
+        mock_content_repo.get_chat_content = AsyncMock(return_value=None)
+        with pytest.raises(HTTPException) as exc:
+            await chat_service.build_branch_tree(uuid4())
+
+    assert exc.value.status_code == 404
 
 
 @pytest.mark.asyncio
@@ -351,4 +469,50 @@ async def test_delete_chat(chat_service, mock_chat_repo):
     
     # Assert
     mock_chat_repo.delete_chat.assert_called_once()
-    assert result is True 
\ No newline at end of file
+    assert result is True 
+
+
+@pytest.mark.asyncio
+async def test_sync_chat_advances_cursor(chat_service):
+    chat_id = uuid4()
+    branch_chat_id = uuid4()
+    changes = {
+        "qa_pairs": [{"question": "Hello", "response": "World", "response_id": "r3"}],
+        "branch_log": [{"response_id": "r1", "branch_chat_id": str(branch_chat_id), "created_at": None}],
+        "active_branch_id": None,
+    }
+
+    with patch('app.services.chat_service.ChatContentRepository', autospec=True) as mock_content_repo:
+        mock_content_repo.get_changes_since = AsyncMock(return_value=changes)
+        result = await chat_service.sync_chat(chat_id, "2.0", limit=10)
+
+    mock_content_repo.get_changes_since.assert_called_once_with(chat_id, 2, 0, 10)
+    assert result["cursor"] == "3.1"
+    assert result["has_more"] is False
+    assert result["branches"][0]["branch_chat_id"] == str(branch_chat_id)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("cursor", ["abc", "1", "1.2.3", "-1.0"])
+async def test_sync_chat_rejects_invalid_cursor(chat_service, cursor):
+    with pytest.raises(HTTPException) as exc_info:
+        await chat_service.sync_chat(uuid4(), cursor, limit=10)
+
+    assert exc_info.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_create_branches_validates_all_responses_before_writing(chat_service, mock_chat_repo):
+    parent = Chat(id=uuid4(), account_id=uuid4(), name="Test Chat", chat_type=ChatType.PERSONAL)
+    qa_pair = {"question": "Hello", "response": "World", "response_id": "r1"}
+
+    with patch('app.services.chat_service.ChatContentRepository', autospec=True) as mock_content_repo:
+        mock_content_repo.get_qa_pairs_by_response_ids = AsyncMock(return_value={"r1": qa_pair})
+        with pytest.raises(HTTPException) as exc_info:
+            await chat_service.create_branches(
+                parent.id, [{"response_id": "r1"}, {"response_id": "r2"}], parent.account_id, parent_chat=parent
+            )
+
+    assert exc_info.value.status_code == 404
+    mock_chat_repo.create_branches.assert_not_called()
+    mock_content_repo.create_branch_contents.assert_not_called()
@@ -0,0 +1,60 @@
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.services.chat_versions import ChatVersionIndex, etag_matches, make_etag
+
+UPDATED_AT = datetime(2025, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def test_etag_matches_weakly():
+    etag = make_etag(7, UPDATED_AT)
+
+    assert etag.startswith('W/"7-')
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", {etag.removeprefix("W/")}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(make_etag(8, UPDATED_AT), etag)
+    assert not etag_matches(None, etag)
+
+
+@pytest.fixture
+def fake_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    with patch("app.services.chat_versions.get_redis", return_value=redis):
+        yield redis
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+async def test_version_changes_only_on_writes(backend, fake_redis):
+    versions = ChatVersionIndex(backend=backend, ttl=60, max_entries=10)
+    chat_id, other_id = uuid4(), uuid4()
+
+    first = await versions.current(chat_id)
+    assert await versions.current(chat_id) == first
+
+    await versions.bump(chat_id, other_id)
+    bumped = await versions.current(chat_id)
+    assert bumped > first
+
+    await versions.forget(chat_id)
+    # A recreated counter restarts from the clock, past any version handed out
+    await asyncio.sleep(0.01)
+    assert await versions.current(chat_id) > bumped
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_disables_conditional_responses():
+    redis = MagicMock()
+    redis.pipeline.side_effect = RedisConnectionError("down")
+    versions = ChatVersionIndex(backend="redis", ttl=60, max_entries=10)
+
+    with patch("app.services.chat_versions.get_redis", return_value=redis):
+        await versions.bump(uuid4())
+        assert await versions.current(uuid4()) is None
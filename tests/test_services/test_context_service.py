@@ -0,0 +1,139 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+from app.services.context_service import ContextService
+
+
+class FakeContentRepository:
+    """In-memory stand-in for the ChatContentRepository context methods."""
+
+    def __init__(self):
+        self.documents = {}
+        self.window_reads = 0
+
+    def add_chat(self, chat_id, turns, **fields):
+        self.documents[str(chat_id)] = dict(
+            fields,
+            qa_pairs=[{"question": q, "response": r, "response_id": f"{chat_id}-{i}"} for i, (q, r) in enumerate(turns)],
+            qa_count=len(turns),
+        )
+
+    async def get_context_window(self, chat_id, limit, end=None):
+        self.window_reads += 1
+        document = self.documents.get(str(chat_id))
+        if document is None:
+            return None
+        pairs = document["qa_pairs"]
+        end = len(pairs) if end is None else end
+        result = {k: v for k, v in document.items() if k != "qa_pairs"}
+        result["qa_pairs"] = pairs[max(0, end - limit):end]
+        return result
+
+    async def get_turn_index(self, chat_id, response_id):
+        pairs = self.documents[str(chat_id)]["qa_pairs"]
+        return next(i for i, pair in enumerate(pairs) if pair["response_id"] == response_id)
+
+    async def set_parent_turn_index(self, chat_id, index):
+        self.documents[str(chat_id)]["parent_turn_index"] = index
+
+    async def update_summary(self, chat_id, summary, summary_upto, previous_upto):
+        self.documents[str(chat_id)].update(summary=summary, summary_upto=summary_upto)
+        return True
+
+
+@pytest.fixture
+def repo():
+    fake = FakeContentRepository()
+    with patch("app.services.context_service.ChatContentRepository", fake):
+        yield fake
+
+
+@pytest.mark.asyncio
+async def test_latest_turns_oldest_first(repo):
+    chat_id = uuid4()
+    repo.add_chat(chat_id, [(f"q{i}", f"a{i}") for i in range(8)])
+
+    context = await ContextService(max_turns=3, token_budget=1000).build_context(chat_id)
+
+    assert [turn["question"] for turn in context["turns"]] == ["q5", "q6", "q7"]
+    assert context["summary"] is None
+    assert repo.window_reads == 1
+
+
+@pytest.mark.asyncio
+async def test_token_budget_limits_turns(repo):
+    chat_id = uuid4()
+    repo.add_chat(chat_id, [("x" * 40, "y" * 40)] * 5)  # 20 tokens per turn
+
+    context = await ContextService(max_turns=10, token_budget=50).build_context(chat_id)
+
+    assert len(context["turns"]) == 2
+    assert context["tokens"] == 40
+
+
+@pytest.mark.asyncio
+async def test_branch_continues_in_parent_before_fork(repo):
+    parent_id, branch_id = uuid4(), uuid4()
+    repo.add_chat(parent_id, [(f"p{i}", f"a{i}") for i in range(6)])
+    # The branch starts with a copy of the fork turn p3
+    repo.add_chat(
+        branch_id,
+        [("p3", "a3"), ("b1", "c1")],
+        parent_chat_id=str(parent_id),
+        parent_response_id=f"{parent_id}-3",
+    )
+
+    context = await ContextService(max_turns=5, token_budget=1000).build_context(branch_id)
+
+    assert [turn["question"] for turn in context["turns"]] == ["p0", "p1", "p2", "p3", "b1"]
+    # The fork position is resolved once and remembered on the branch
+    assert repo.documents[str(branch_id)]["parent_turn_index"] == 3
+
+
+@pytest.mark.asyncio
+async def test_old_turns_are_folded_into_summary(repo):
+    chat_id = uuid4()
+    repo.add_chat(chat_id, [(f"q{i}", f"a{i}") for i in range(15)])
+
+    service = ContextService(max_turns=5, token_budget=1000)
+
+    with patch("app.services.context_service.settings.AI_SUMMARY_BATCH_TURNS", 10), \
+            patch("app.utils.mock_ai.asyncio.sleep", AsyncMock()):
+        # Building the context never waits for the summary's AI call
+        before = await service.build_context(chat_id)
+        await service.refresh_summary(chat_id)
+        context = await service.build_context(chat_id)
+
+    assert before["summary"] is None
+    assert [turn["question"] for turn in context["turns"]] == ["q10", "q11", "q12", "q13", "q14"]
+    assert repo.documents[str(chat_id)]["summary_upto"] == 10
+    assert "q0" in context["summary"] and "q9" in context["summary"]
+
+
+@pytest.mark.asyncio
+async def test_summary_waits_for_a_full_batch(repo):
+    chat_id = uuid4()
+    repo.add_chat(chat_id, [(f"q{i}", f"a{i}") for i in range(8)])
+
+    service = ContextService(max_turns=5, token_budget=1000)
+
+    with patch("app.services.context_service.settings.AI_SUMMARY_BATCH_TURNS", 10):
+        await service.refresh_summary(chat_id)
+        context = await service.build_context(chat_id)
+
+    assert context["summary"] is None
+    assert "summary_upto" not in repo.documents[str(chat_id)]
+
+
+@pytest.mark.asyncio
+async def test_a_failed_summary_refresh_is_logged_not_raised(repo, caplog):
+    chat_id = uuid4()
+    repo.add_chat(chat_id, [(f"q{i}", f"a{i}") for i in range(15)])
+
+    with patch("app.services.context_service.settings.AI_SUMMARY_BATCH_TURNS", 10), \
+            patch("app.utils.mock_ai.generate_summary", AsyncMock(side_effect=RuntimeError("AI down"))):
+        await ContextService(max_turns=5, token_budget=1000).refresh_summary(chat_id)
+
+    assert "summary_upto" not in repo.documents[str(chat_id)]
+    assert "Could not refresh the summary" in caplog.text
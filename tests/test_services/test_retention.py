@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import pytest
+
+from app.services.retention import RetentionPolicy
+
+
+def _session(retention_days):
+    session = AsyncMock()
+    result = MagicMock()
+    result.scalar.return_value = retention_days
+    session.execute.return_value = result
+    return session
+
+
+@pytest.mark.asyncio
+async def test_global_period_applies_without_overrides():
+    session = _session(7)
+    policy = RetentionPolicy(default_days=30, account_overrides=False, cache_seconds=60)
+
+    expires_at = await policy.expires_at(session, uuid4())
+
+    assert expires_at - datetime.now(timezone.utc) > timedelta(days=29)
+    session.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_account_setting_overrides_and_is_cached():
+    session = _session(7)
+    policy = RetentionPolicy(default_days=30, account_overrides=True, cache_seconds=60)
+    account_id = uuid4()
+
+    assert await policy.days_for(session, account_id) == 7
+    assert await policy.days_for(session, account_id) == 7
+    assert session.execute.await_count == 1
+
+    # Accounts without a setting fall back to the global period
+    assert await policy.days_for(_session(None), uuid4()) == 30
+
+
+@pytest.mark.asyncio
+async def test_zero_days_keeps_content():
+    policy = RetentionPolicy(default_days=30, account_overrides=True, cache_seconds=60)
+
+    assert await policy.expires_at(_session(0), uuid4()) is None
+    assert await RetentionPolicy(0, False, 60).expires_at(_session(None), uuid4()) is None
@@ -0,0 +1,37 @@
+from app.utils.compression import (
+    ZSTD_MAGIC,
+    compress_message,
+    compress_text,
+    decompress_message,
+    decompress_text,
+)
+
+
+def test_short_text_is_stored_as_is():
+    assert compress_text("hello", min_bytes=1024) == "hello"
+
+
+def test_long_text_round_trips_through_zstd():
+    text = "Tell me about branching conversations. " * 100
+
+    stored = compress_text(text, min_bytes=1024)
+
+    assert isinstance(stored, bytes) and stored.startswith(ZSTD_MAGIC)
+    assert len(stored) < len(text)
+    assert decompress_text(stored) == text
+
+
+def test_zero_threshold_disables_compression():
+    text = "a" * 10000
+
+    assert compress_text(text, min_bytes=0) == text
+
+
+def test_messages_are_compressed_per_field():
+    message = {"question": "hi", "response": "long answer " * 200, "response_id": "r1"}
+
+    stored = compress_message(dict(message))
+
+    assert stored["question"] == "hi"
+    assert isinstance(stored["response"], bytes)
+    assert decompress_message(stored) == message